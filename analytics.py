@@ -0,0 +1,267 @@
+import datetime
+from decimal import Decimal
+
+from dispatch import parse_address
+
+DIMENSIONS = ('total', 'category', 'product', 'payment', 'district', 'rider')
+
+# SalesRollup measures, in column order
+MEASURES = ('Orders', 'Units', 'Sales', 'CompletedOrders', 'Revenue', 'CancelledOrders')
+
+# Orders rolled up per transaction by backfill_rollups()
+BACKFILL_CHUNK = 2000
+
+_ZERO = Decimal('0.00')
+
+
+def _contribute(rollup, order, items, status, rider, sign=1):
+    """Add (sign=1) or remove (sign=-1) one order's share of every rollup row
+
+    rollup -- {(dimension, day, key): [measures]}, updated in place
+    order  -- (OrderDate, PaymentMethod, TotalAmount, DeliveryAddress)
+    items  -- [(ProductID, Category, Quantity, Price)]
+    """
+    order_date, payment_method, total_amount, address = order
+    day = order_date.date() if isinstance(order_date, datetime.datetime) else order_date
+    completed = status == 'Complete'
+    cancelled = status == 'Cancelled'
+
+    def add(dimension, key, units, sales):
+        row = rollup.setdefault((dimension, day, key), [0, 0, _ZERO, 0, _ZERO, 0])
+        row[0] += sign
+        row[1] += sign * units
+        row[2] += sign * sales
+        if completed:
+            row[3] += sign
+            row[4] += sign * sales
+        if cancelled:
+            row[5] += sign
+
+    # Order-level dimensions count the whole order, delivery charge included
+    units = sum(quantity for _, _, quantity, _ in items)
+    district = parse_address(address)[1]
+    add('total', 'all', units, total_amount)
+    add('payment', payment_method or 'Unknown', units, total_amount)
+    add('district', district.title() if district else 'Unknown', units, total_amount)
+    add('rider', str(rider) if rider else 'unassigned', units, total_amount)
+
+    # Item-level dimensions count the items' own amounts
+    categories = {}
+    for product_id, category, quantity, price in items:
+        add('product', str(product_id), quantity, price * quantity)
+        totals = categories.setdefault(category or 'Uncategorized', [0, _ZERO])
+        totals[0] += quantity
+        totals[1] += price * quantity
+    for category, (quantity, sales) in categories.items():
+        add('category', category, quantity, sales)
+
+
+def rollup_orders(cursor, order_ids):
+    """Bring the rollups up to date with the current state of some orders
+
+    Orders not rolled up yet add their whole contribution; orders whose
+    status or rider changed since move it between rows; others are left
+    alone, so running it twice changes nothing. The orders are locked
+    while they are read, which serializes concurrent runs for the same
+    order. What is taken back out comes from the items and categories
+    recorded in OrderItemRollupState when the order was last rolled up,
+    so later product changes do not skew it. The caller commits. Returns
+    the number of orders applied.
+    """
+    order_ids = sorted(set(order_ids))
+    if not order_ids:
+        return 0
+    placeholders = ', '.join(['%s'] * len(order_ids))
+    cursor.execute(f"""
+        SELECT o.OrderID, o.OrderDate, o.PaymentMethod, o.TotalAmount, o.DeliveryAddress,
+               o.OrderStatus, o.DeliveryManID,
+               s.OrderID IS NOT NULL, s.OrderStatus, s.DeliveryManID
+        FROM `Order` o
+        LEFT JOIN OrderRollupState s ON o.OrderID = s.OrderID
+        WHERE o.OrderID IN ({placeholders})
+        ORDER BY o.OrderID
+        FOR UPDATE
+    """, order_ids)
+    orders = [row for row in cursor.fetchall() if not row[7] or (row[5], row[6]) != (row[8], row[9])]
+    if not orders:
+        return 0
+
+    changed = [row[0] for row in orders]
+    cursor.execute(f"""
+        SELECT oi.OrderID, oi.ProductID, p.Category, oi.Quantity, oi.Price
+        FROM OrderItem oi
+        LEFT JOIN Product p ON oi.ProductID = p.ProductID
+        WHERE oi.OrderID IN ({', '.join(['%s'] * len(changed))})
+    """, changed)
+    items = _by_order(cursor.fetchall())
+
+    # What rolled-up orders added last time, whatever has happened to their
+    # products since
+    rolled_ids = [row[0] for row in orders if row[7]]
+    rolled_items = {}
+    if rolled_ids:
+        cursor.execute(f"""
+            SELECT OrderID, ProductID, Category, Quantity, Price
+            FROM OrderItemRollupState
+            WHERE OrderID IN ({', '.join(['%s'] * len(rolled_ids))})
+        """, rolled_ids)
+        rolled_items = _by_order(cursor.fetchall())
+
+    rollup = {}
+    for order_id, order_date, method, total, address, status, rider, rolled, old_status, old_rider in orders:
+        order = (order_date, method, total, address)
+        if rolled:
+            _contribute(rollup, order, rolled_items.get(order_id, []), old_status, old_rider, sign=-1)
+        _contribute(rollup, order, items.get(order_id, []), status, rider)
+
+    rows = [
+        (dimension, day, key, *measures)
+        for (dimension, day, key), measures in sorted(rollup.items())
+        if any(measures)
+    ]
+    if rows:
+        # Sorted rows: concurrent runs lock shared rows in the same order
+        cursor.executemany(f"""
+            INSERT INTO SalesRollup (Dimension, Day, DimKey, {', '.join(MEASURES)})
+            VALUES (%s, %s, %s, {', '.join(['%s'] * len(MEASURES))})
+            ON DUPLICATE KEY UPDATE {', '.join(f'{column} = {column} + VALUES({column})' for column in MEASURES)}
+        """, rows)
+    cursor.executemany("""
+        INSERT INTO OrderRollupState (OrderID, OrderStatus, DeliveryManID)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE OrderStatus = VALUES(OrderStatus), DeliveryManID = VALUES(DeliveryManID)
+    """, [(row[0], row[5], row[6]) for row in orders])
+    if rolled_ids:
+        cursor.execute(f"""
+            DELETE FROM OrderItemRollupState
+            WHERE OrderID IN ({', '.join(['%s'] * len(rolled_ids))})
+        """, rolled_ids)
+    item_rows = [(order_id, *item) for order_id in changed for item in items.get(order_id, [])]
+    if item_rows:
+        cursor.executemany("""
+            INSERT INTO OrderItemRollupState (OrderID, ProductID, Category, Quantity, Price)
+            VALUES (%s, %s, %s, %s, %s)
+        """, item_rows)
+    return len(orders)
+
+
+def _by_order(rows):
+    """{OrderID: [(ProductID, Category, Quantity, Price)]} from rows starting with OrderID"""
+    items = {}
+    for order_id, *item in rows:
+        items.setdefault(order_id, []).append(tuple(item))
+    return items
+
+
+def backfill_rollups(connection, start=None, end=None, chunk_size=BACKFILL_CHUNK, log=None):
+    """Rebuild the rollups of orders placed between `start` and `end` (inclusive dates)
+
+    The range is cleared in one transaction, then its orders are rolled
+    up again BACKFILL_CHUNK at a time. Orders that change meanwhile are
+    rolled up by their job instead and skipped here. Returns the number
+    of orders rolled up.
+    """
+    conditions, params = [], []
+    if start:
+        conditions.append("o.OrderDate >= %s")
+        params.append(start)
+    if end:
+        conditions.append("o.OrderDate < %s + INTERVAL 1 DAY")
+        params.append(end)
+
+    cursor = connection.cursor()
+    try:
+        day_conditions = [condition.replace('o.OrderDate', 'Day') for condition in conditions]
+        cursor.execute(f"DELETE FROM SalesRollup {'WHERE ' + ' AND '.join(day_conditions) if conditions else ''}",
+                       params)
+        for table in ('OrderItemRollupState', 'OrderRollupState'):
+            if conditions:
+                cursor.execute(f"""
+                    DELETE s FROM {table} s
+                    JOIN `Order` o ON s.OrderID = o.OrderID
+                    WHERE {' AND '.join(conditions)}
+                """, params)
+            else:
+                cursor.execute(f"DELETE FROM {table}")
+        connection.commit()
+
+        total = 0
+        last_id = 0
+        while True:
+            cursor.execute(f"""
+                SELECT o.OrderID
+                FROM `Order` o
+                LEFT JOIN OrderRollupState s ON o.OrderID = s.OrderID
+                WHERE o.OrderID > %s AND s.OrderID IS NULL {''.join(' AND ' + condition for condition in conditions)}
+                ORDER BY o.OrderID
+                LIMIT %s
+            """, [last_id, *params, chunk_size])
+            order_ids = [row[0] for row in cursor.fetchall()]
+            if not order_ids:
+                break
+            total += rollup_orders(cursor, order_ids)
+            connection.commit()
+            last_id = order_ids[-1]
+            if log:
+                log(f"Rolled up {total} order(s), up to #{last_id}")
+        return total
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def _names(cursor, dimension, keys):
+    """Display names for product and rider keys"""
+    ids = sorted({int(key) for key in keys if key.isdigit()})
+    if not ids or dimension not in ('product', 'rider'):
+        return {}
+    table, column, name = (('Product', 'ProductID', 'ProductName') if dimension == 'product'
+                           else ('DeliveryMan', 'DeliveryManID', 'Name'))
+    cursor.execute(f"""
+        SELECT {column}, {name} FROM {table}
+        WHERE {column} IN ({', '.join(['%s'] * len(ids))})
+    """, ids)
+    return {str(key): value for key, value in cursor.fetchall()}
+
+
+def sales_report(cursor, dimension, start, end, by_day=False, limit=None):
+    """Sales between two dates (inclusive) per value of `dimension`, from the rollups
+
+    Without by_day, one row per value, best selling first; with by_day,
+    one row per day and value, in date order. Each row has key, name,
+    the measures in snake_case and, with by_day, day.
+    """
+    if dimension not in DIMENSIONS:
+        raise ValueError(f"Unknown dimension '{dimension}'")
+    sums = ', '.join(f'SUM({column})' for column in MEASURES)
+    group = 'Day, DimKey' if by_day else 'DimKey'
+    order = 'Day, DimKey' if by_day else 'SUM(Sales) DESC, DimKey'
+    cursor.execute(f"""
+        SELECT {group}, {sums}
+        FROM SalesRollup
+        WHERE Dimension = %s AND Day >= %s AND Day <= %s
+        GROUP BY {group}
+        ORDER BY {order}
+        {'LIMIT %s' if limit else ''}
+    """, [dimension, start, end] + ([limit] if limit else []))
+    rows = cursor.fetchall()
+
+    keys = [row[1] if by_day else row[0] for row in rows]
+    names = _names(cursor, dimension, keys)
+    report = []
+    for row in rows:
+        day, key, measures = (row[0], row[1], row[2:]) if by_day else (None, row[0], row[1:])
+        entry = {'key': key, 'name': names.get(key, key)}
+        if by_day:
+            entry['day'] = day.isoformat()
+        for column, value in zip(MEASURES, measures):
+            entry[_snake(column)] = value if isinstance(value, Decimal) else int(value or 0)
+        report.append(entry)
+    return report
+
+
+def _snake(column):
+    return ''.join(f'_{char.lower()}' if char.isupper() and index else char.lower()
+                   for index, char in enumerate(column))
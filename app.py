@@ -1,15 +1,49 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash
+from flask import (Flask, render_template, request, jsonify, session, redirect, url_for, flash, g,
+                   make_response, stream_with_context, before_render_template, template_rendered)
 from flask_cors import CORS
+import click
+import csv
+import hmac
+import logging
+import time
 import MySQLdb
-from datetime import datetime
+from datetime import date, datetime, timedelta, timezone
+from functools import partial, wraps
+from decimal import Decimal
 import os
 from dotenv import load_dotenv
 
+from database.pool import ConnectionPool
+from database.replicas import ReplicaRouter, replica_configs
+from database.migrate import apply_migrations, migration_status
+from cache import TTLCache
+from fastjson import JSONProvider, compress_response, iter_rows, stream_json
+from exports import EXPORTS, FORMATS, parse_date, export_chunks
+from imports import FORMATS as IMPORT_FORMATS, read_rows, import_products
+from search import SearchIndex, INDEXED_COLUMNS
+from leaderboards import WINDOWS as LEADERBOARD_WINDOWS, Leaderboards, load_totals, record_sales, purge_buckets
+from pagination import MAX_PAGE_SIZE, Page, PageRequest, fetch_page, slice_page
+from stats import bump_stats, read_stats, reconcile_stats, revenue_delta
+from inventory import InsufficientStock, reserve_stock, insert_order_items
+from cart import (add_item, set_quantity, remove_item, get_lines, count_items,
+                  get_cart as load_cart, clear_cart, expire_carts)
+from ratings import apply_rating, read_rating, backfill_ratings
+from validators import (CATALOG_SCOPE, product_scope, bump_versions, bump_all_versions,
+                        read_versions, make_etag, last_modified)
+from dispatch import load_dispatch_state, plan_assignments, apply_assignments
+from routing import load_area_graph, load_open_orders, plan_route
+from recommendations import TOP_K as TOP_NEIGHBOURS, load_neighbours, record_purchases, refresh_neighbours
+from delivery_sync import MAX_EVENTS as MAX_SYNC_EVENTS, record_change, sync_events
+from analytics import BACKFILL_CHUNK as BACKFILL_ROLLUP_CHUNK, DIMENSIONS as REPORT_DIMENSIONS, backfill_rollups, rollup_orders, sales_report
+from jobs import enqueue, first_run, queue_stats, retry_dead, purge_done, work, work_pool
+from metrics import MetricsRegistry, RequestStats, InstrumentedConnection, normalize_sql
+
 # Load environment variables
 load_dotenv()
 
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
+app.json = JSONProvider(app)
 CORS(app)
 
 # Database configuration
@@ -21,9 +55,508 @@ DB_CONFIG = {
     'charset': 'utf8mb4'
 }
 
-def get_db():
-    """Get database connection"""
-    return MySQLdb.connect(**DB_CONFIG)
+# Connection pool shared by all requests
+db_pool = ConnectionPool(
+    DB_CONFIG,
+    size=int(os.getenv('MYSQL_POOL_SIZE', 10)),
+    timeout=float(os.getenv('MYSQL_POOL_TIMEOUT', 30)),
+    recycle=float(os.getenv('MYSQL_POOL_RECYCLE', 3600)),
+    ping_interval=float(os.getenv('MYSQL_POOL_PING_INTERVAL', 5))
+)
+
+# Optional read replicas for read-only views (see replica_reads). A replica
+# that lags more than REPLICA_MAX_LAG seconds or fails its health check is
+# skipped, and reads fall back to the primary.
+REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', 5))
+replica_router = ReplicaRouter(
+    replica_configs(os.getenv('MYSQL_REPLICAS', ''), dict(DB_CONFIG, connect_timeout=2)),
+    max_lag=REPLICA_MAX_LAG,
+    check_interval=float(os.getenv('REPLICA_CHECK_INTERVAL', 10)),
+    size=int(os.getenv('MYSQL_POOL_SIZE', 10)),
+    timeout=float(os.getenv('MYSQL_REPLICA_POOL_TIMEOUT', 1)),
+    recycle=float(os.getenv('MYSQL_POOL_RECYCLE', 3600)),
+    ping_interval=float(os.getenv('MYSQL_POOL_PING_INTERVAL', 5))
+)
+
+# After a session writes, its reads stay on the primary this long so it
+# sees its own writes; must exceed REPLICA_MAX_LAG
+READ_YOUR_WRITES_SECONDS = max(float(os.getenv('READ_YOUR_WRITES_SECONDS', 10)), REPLICA_MAX_LAG + 1)
+
+# Keyset sort orders; each must end in a unique column
+PRODUCT_ORDER = [('ProductName', 'ProductName'), ('ProductID', 'ProductID')]
+ORDER_DATE_ORDER = [('o.OrderDate', 'OrderDate'), ('o.OrderID', 'OrderID')]
+CUSTOMER_ORDER = [('c.CreatedAt', 'CreatedAt'), ('c.CustomerID', 'CustomerID')]
+REVIEW_ORDER = [('r.ReviewDate', 'ReviewDate'), ('r.ReviewID', 'ReviewID')]
+
+def get_db(primary=False):
+    """Get the request's pooled database connection
+
+    In a @replica_reads view this is a replica connection when one is
+    usable. primary=True always returns a primary connection, for reads
+    that must not lag: the loaders that fill process-wide caches and the
+    content versions behind ETags.
+    """
+    name = 'db'
+    if primary and g.get('use_replica'):
+        db = g.get('db')
+        if db is not None and not db.closed and not g.get('db_is_replica'):
+            return db
+        name = 'primary_db'
+    
+    db = g.get(name)
+    if db is None or db.closed:
+        replica = replica_router.acquire() if name == 'db' and g.get('use_replica') else None
+        if name == 'db':
+            g.db_is_replica = replica is not None
+        db = replica or db_pool.acquire()
+        stats = g.get('request_stats')
+        if stats is not None:
+            db = InstrumentedConnection(db, stats, record_query)
+        setattr(g, name, db)
+    return db
+
+@app.teardown_appcontext
+def release_db(exception):
+    """Return the request's connections to their pools, even if the route failed"""
+    for name in ('db', 'primary_db'):
+        db = g.pop(name, None)
+        if db is not None:
+            db.close()
+
+@app.before_request
+def start_request_stats():
+    g.request_stats = RequestStats()
+
+def replica_reads(view):
+    """Serve a read-only view from a replica, unless this session wrote recently"""
+    @wraps(view)
+    def wrapper(**kwargs):
+        g.use_replica = session.get('primary_until', 0) < time.time()
+        return view(**kwargs)
+    return wrapper
+
+@app.after_request
+def stick_to_primary(response):
+    """Keep the session's reads on the primary for a while after a write"""
+    if replica_router.replicas and request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+        session['primary_until'] = time.time() + READ_YOUR_WRITES_SECONDS
+    return response
+
+def request_route():
+    return request.url_rule.rule if request.url_rule else '<unmatched>'
+
+@app.after_request
+def record_status(response):
+    """Note the status; streamed responses are recorded once the body is sent"""
+    stats = g.get('request_stats')
+    if stats is not None:
+        stats.status = response.status_code
+        if response.is_streamed:
+            g.pop('request_stats')
+            response.call_on_close(partial(request_metrics.record_request, request_route(), request.method, stats))
+    return response
+
+@app.teardown_request
+def record_request_metrics(exception):
+    """Fold the request's timings into the metrics"""
+    stats = g.pop('request_stats', None)
+    if stats is not None:
+        if exception is not None:
+            stats.status = 500
+        request_metrics.record_request(request_route(), request.method, stats)
+
+@app.after_request
+def compress(response):
+    """gzip/brotli-encode JSON and CSV bodies for clients that accept it"""
+    return compress_response(response, request.accept_encodings)
+
+@app.template_global()
+def page_url(**cursor):
+    """URL of the current page with a different pagination cursor"""
+    args = request.args.to_dict()
+    args.pop('after', None)
+    args.pop('before', None)
+    args.update({key: value for key, value in cursor.items() if value})
+    return url_for(request.endpoint, **dict(request.view_args or {}, **args))
+
+# =====================================================
+# REQUEST METRICS
+# =====================================================
+
+# Per-route latency, query count, SQL time, rows and render time for this
+# process, exposed at /metrics. Statements slower than SLOW_QUERY_SECONDS
+# are logged with their normalized SQL.
+request_metrics = MetricsRegistry()
+SLOW_QUERY_SECONDS = float(os.getenv('SLOW_QUERY_SECONDS', 0.5))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+slow_query_log = logging.getLogger('fashion_mart.slow_query')
+
+def record_query(sql, seconds, rows):
+    """Log statements over the slow query threshold"""
+    if seconds >= SLOW_QUERY_SECONDS:
+        request_metrics.record_slow_query()
+        slow_query_log.warning('%.3fs rows=%s route=%s sql=%s', seconds, rows,
+                               request_route(), normalize_sql(sql))
+
+def start_render(sender, template, context, **extra):
+    stats = g.get('request_stats')
+    if stats is not None:
+        stats.render_started = time.perf_counter()
+
+def finish_render(sender, template, context, **extra):
+    stats = g.get('request_stats')
+    if stats is not None and stats.render_started is not None:
+        stats.templates += 1
+        stats.render_seconds += time.perf_counter() - stats.render_started
+        stats.render_started = None
+
+before_render_template.connect(start_render, app)
+template_rendered.connect(finish_render, app)
+
+# =====================================================
+# CATALOG CACHE
+# =====================================================
+
+# Listings are tagged with every product they contain plus their category
+# filter ('category:*' for unfiltered listings), so a write only evicts the
+# entries it can actually change.
+catalog_cache = TTLCache(
+    ttl=float(os.getenv('CATALOG_CACHE_TTL', 60)),
+    max_entries=int(os.getenv('CATALOG_CACHE_SIZE', 1024))
+)
+
+# Full-text product search; kept current by the admin product APIs and
+# rebuilt periodically to pick up writes made by other worker processes
+search_index = SearchIndex(max_age=float(os.getenv('SEARCH_INDEX_MAX_AGE', 300)))
+SEARCH_RESULT_LIMIT = int(os.getenv('SEARCH_RESULT_LIMIT', 500))
+
+# Best sellers; each process polls the sales counters for changes and
+# rebuilds its boards in full every LEADERBOARD_MAX_AGE seconds
+leaderboards = Leaderboards(
+    max_age=float(os.getenv('LEADERBOARD_MAX_AGE', 600)),
+    poll_interval=float(os.getenv('LEADERBOARD_POLL_INTERVAL', 30))
+)
+
+def load_products(page, category='', search=''):
+    """Get one page of products matching the filters (cached)
+
+    Plain listings are keyset-paginated by (ProductName, ProductID),
+    searches are ordered by relevance and paginated by rank.
+    """
+    if search:
+        return slice_page(load_search_results(category, search), page)
+    
+    def load():
+        query = "SELECT * FROM Product WHERE 1=1"
+        params = []
+        
+        if category:
+            query += " AND Category = %s"
+            params.append(category)
+        
+        cursor = get_db(primary=True).cursor(MySQLdb.cursors.DictCursor)
+        result = fetch_page(cursor, query, params, PRODUCT_ORDER, page)
+        cursor.close()
+        return result
+    
+    def tags(result):
+        return [f"category:{category or '*'}"] + [f"product:{row['ProductID']}" for row in result]
+    
+    return catalog_cache.get_or_load(('products', category, page.cache_key()), load, tags)
+
+def load_product_ids(page, category='', search=''):
+    """Get the ProductIDs of one listing page, in listing order (cached)
+
+    Same pages as load_products(), read from the covering name indexes
+    only, so validating a listing never builds full product rows.
+    """
+    if search:
+        return slice_page(load_search_ids(category, search), page).items
+    
+    def load():
+        query = "SELECT ProductName, ProductID FROM Product WHERE 1=1"
+        params = []
+        
+        if category:
+            query += " AND Category = %s"
+            params.append(category)
+        
+        cursor = get_db(primary=True).cursor(MySQLdb.cursors.DictCursor)
+        result = fetch_page(cursor, query, params, PRODUCT_ORDER, page)
+        cursor.close()
+        return [row['ProductID'] for row in result]
+    
+    return catalog_cache.get_or_load(('product-ids', category, page.cache_key()), load,
+                                     lambda ids: [f"category:{category or '*'}"])
+
+def load_search_ids(category, search):
+    """Get the ids of all products matching a search, best match first (cached)"""
+    def load():
+        ranked_ids = get_search_index().search(search, SEARCH_RESULT_LIMIT)
+        if not ranked_ids or not category:
+            return ranked_ids
+        
+        cursor = get_db(primary=True).cursor()
+        cursor.execute("SELECT ProductID FROM Product WHERE ProductID IN (" + ", ".join(["%s"] * len(ranked_ids))
+                       + ") AND Category = %s", list(ranked_ids) + [category])
+        matching = {row[0] for row in cursor.fetchall()}
+        cursor.close()
+        return [product_id for product_id in ranked_ids if product_id in matching]
+    
+    return catalog_cache.get_or_load(('search-ids', category, search), load,
+                                     lambda ids: [f"category:{category or '*'}"])
+
+def load_search_results(category, search):
+    """Get all products matching a search, best match first (cached)"""
+    def load():
+        ranked_ids = load_search_ids(category, search)
+        if not ranked_ids:
+            return []
+        
+        query = "SELECT * FROM Product WHERE ProductID IN (" + ", ".join(["%s"] * len(ranked_ids)) + ")"
+        
+        cursor = get_db(primary=True).cursor(MySQLdb.cursors.DictCursor)
+        cursor.execute(query, list(ranked_ids))
+        rows = list(cursor.fetchall())
+        cursor.close()
+        
+        rank = {product_id: position for position, product_id in enumerate(ranked_ids)}
+        rows.sort(key=lambda row: rank[row['ProductID']])
+        return rows
+    
+    def tags(rows):
+        return [f"category:{category or '*'}"] + [f"product:{row['ProductID']}" for row in rows]
+    
+    return catalog_cache.get_or_load(('search', category, search), load, tags)
+
+def load_categories():
+    """Get the distinct product categories (cached)"""
+    def load():
+        cursor = get_db(primary=True).cursor(MySQLdb.cursors.DictCursor)
+        cursor.execute("SELECT DISTINCT Category FROM Product ORDER BY Category")
+        categories = [row['Category'] for row in cursor.fetchall()]
+        cursor.close()
+        return categories
+    
+    return catalog_cache.get_or_load(('categories',), load, ['categories'])
+
+def load_product(product_id):
+    """Get a single product row, or None if it does not exist (cached)"""
+    def load():
+        cursor = get_db(primary=True).cursor(MySQLdb.cursors.DictCursor)
+        cursor.execute("SELECT * FROM Product WHERE ProductID = %s", (product_id,))
+        product = cursor.fetchone()
+        cursor.close()
+        return product
+    
+    return catalog_cache.get_or_load(('product', product_id), load, [f'product:{product_id}'])
+
+# Reviews rendered with the product page; the rest load through the review feed
+REVIEW_TOP_N = int(os.getenv('REVIEW_TOP_N', 5))
+
+def format_review(row):
+    """JSON-ready review without viewer-specific fields"""
+    return {
+        'review_id': row['ReviewID'],
+        'rating': row['Rating'],
+        'comment': row['Comment'],
+        'review_date': row['ReviewDate'].strftime('%B %d, %Y at %I:%M %p'),
+        'customer_name': row['Name'],
+        'customer_id': row['CustomerID']
+    }
+
+def load_reviews(product_id, page):
+    """Get one page of a product's reviews, newest first (cached)
+
+    Entries are shared by every viewer, so `is_mine` is added per request
+    by the caller rather than stored.
+    """
+    def load():
+        cursor = get_db(primary=True).cursor(MySQLdb.cursors.DictCursor)
+        result = fetch_page(cursor, """
+            SELECT r.ReviewID, r.Rating, r.Comment, r.ReviewDate, r.CustomerID, c.Name
+            FROM Review r
+            JOIN Customer c ON r.CustomerID = c.CustomerID
+            WHERE r.ProductID = %s
+        """, (product_id,), REVIEW_ORDER, page, descending=True)
+        cursor.close()
+        return Page([format_review(row) for row in result], result.next_cursor, result.prev_cursor)
+    
+    # Tagged with the product: every review write calls invalidate_product()
+    # (the product's rating changes too), which evicts the feed
+    return catalog_cache.get_or_load(('reviews', product_id, page.cache_key()), load, [f'product:{product_id}'])
+
+def load_review_summary(product_id):
+    """Get a product's average rating, review count and star distribution (cached)"""
+    def load():
+        cursor = get_db(primary=True).cursor()
+        summary = read_rating(cursor, product_id)
+        cursor.close()
+        return summary
+    
+    return catalog_cache.get_or_load(('review-summary', product_id), load, [f'product:{product_id}'])
+
+# "Customers also bought" entries shown on the product page
+ALSO_BOUGHT_LIMIT = int(os.getenv('ALSO_BOUGHT_LIMIT', 6))
+
+def load_also_bought(product_id, limit=ALSO_BOUGHT_LIMIT):
+    """Get a product's precomputed co-purchase neighbours (cached)"""
+    def load():
+        cursor = get_db(primary=True).cursor(MySQLdb.cursors.DictCursor)
+        neighbours = load_neighbours(cursor, product_id, limit)
+        cursor.close()
+        return neighbours
+    
+    # `flask recommendations` bumps the product's version when its list
+    # changes, which evicts this entry in every process
+    return catalog_cache.get_or_load(('also-bought', product_id, limit), load, [f'product:{product_id}'])
+
+def mark_own_reviews(reviews):
+    """Copies of cached reviews with `is_mine` set for the current viewer"""
+    viewer = session.get('customer_id')
+    return [dict(review, is_mine=viewer is not None and review['customer_id'] == viewer) for review in reviews]
+
+def get_search_index():
+    """Get the product search index, rebuilding it from the database when stale"""
+    def load_rows():
+        cursor = get_db(primary=True).cursor(MySQLdb.cursors.SSDictCursor)
+        cursor.execute("SELECT " + ", ".join(INDEXED_COLUMNS) + " FROM Product")
+        rows = list(cursor)
+        cursor.close()
+        return rows
+    
+    search_index.refresh(load_rows)
+    return search_index
+
+def get_leaderboards():
+    """Get the best-seller boards, refreshed from the sales counters when due"""
+    def load(since):
+        cursor = get_db(primary=True).cursor(MySQLdb.cursors.DictCursor)
+        totals = load_totals(cursor, since)
+        cursor.close()
+        return totals
+    
+    leaderboards.refresh(load)
+    return leaderboards
+
+def index_product(product_id, data):
+    """Update the search index from admin product API fields"""
+    search_index.upsert(product_id, {
+        'ProductName': data.get('name'),
+        'Category': data.get('category'),
+        'Embroidery': data.get('embroidery_type'),
+        'Description': data.get('description')
+    })
+
+def invalidate_catalog():
+    """Drop every cached listing and product and re-index search; for bulk writes"""
+    catalog_cache.clear()
+    search_index.expire()
+    leaderboards.expire()
+
+def invalidate_product(product_id, category=None, listed=False):
+    """Evict cache entries affected by a committed write to one product
+
+    Pass listed=True when the write can change which listings the product
+    appears in (insert, rename, category change) rather than just its row.
+    """
+    tags = [f'product:{product_id}']
+    if listed:
+        tags += ['categories', 'category:*', f'category:{category}']
+    catalog_cache.invalidate(*tags)
+
+# =====================================================
+# HTTP CACHING
+# =====================================================
+
+# Part of every ETag, so a deploy with changed templates never answers 304
+RELEASE = os.getenv('RELEASE') or str(int(os.path.getmtime(__file__)))
+
+# How long a shared cache (CDN / reverse proxy) may serve anonymous catalog
+# responses before revalidating; browsers always revalidate
+SHARED_CACHE_MAX_AGE = int(os.getenv('SHARED_CACHE_MAX_AGE', 30))
+
+# Last version of each scope this process has served from
+seen_versions = {}
+
+def current_viewer():
+    """Identity of the logged-in user, or None for anonymous requests"""
+    for key in ('customer_id', 'admin_id', 'delivery_man_id'):
+        if key in session:
+            return (key, session[key])
+    return None
+
+def sync_catalog_cache(versions):
+    """Evict cached entries for scopes another process has changed
+
+    The versions live in the database, so they move even when the write
+    happened in a different worker whose evictions never reached ours.
+    """
+    for scope, (version, _) in versions.items():
+        if seen_versions.get(scope, -1) < version:
+            if scope == CATALOG_SCOPE:
+                catalog_cache.invalidate('categories')
+                catalog_cache.invalidate_prefix('category:')
+            else:
+                catalog_cache.invalidate(scope)
+            seen_versions[scope] = max(version, seen_versions.get(scope, -1))
+
+def conditional(scopes, variant=None):
+    """Serve a view with ETag / Last-Modified validators built from content versions
+
+    scopes  -- callable taking the view's arguments and returning the version
+               scopes its body depends on
+    variant -- optional callable taking the view's arguments and returning
+               whatever else the body shows that no version covers; it is
+               part of the ETag, and Last-Modified is left out since it
+               cannot reflect it
+
+    A matching If-None-Match (or, without one, If-Modified-Since) is answered
+    with 304 after a single primary-key lookup, without running the view.
+    Versions are read from the primary, like the cached loaders that build
+    these bodies, and before the body is built, so a concurrent write can
+    only make the tag older than the body, never newer.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            cursor = get_db(primary=True).cursor()
+            versions = read_versions(cursor, scopes(**kwargs))
+            cursor.close()
+            sync_catalog_cache(versions)
+            
+            viewer = current_viewer()
+            extra = variant(**kwargs) if variant else None
+            etag = make_etag(versions, request.full_path, viewer, RELEASE, extra)
+            modified = last_modified(versions) if variant is None else None
+            if modified is not None:
+                modified = modified.replace(tzinfo=timezone.utc, microsecond=0)
+            
+            if request.if_none_match:
+                # Weak comparison: compressed responses carry the tag as W/"..."
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                not_modified = bool(modified and request.if_modified_since and modified <= request.if_modified_since)
+            
+            response = app.response_class(status=304) if not_modified else make_response(view(**kwargs))
+            if response.status_code not in (200, 304):
+                return response
+            
+            response.set_etag(etag)
+            if modified is not None:
+                response.last_modified = modified
+            if viewer is None:
+                response.cache_control.public = True
+                response.cache_control.max_age = 0
+                response.cache_control.s_maxage = SHARED_CACHE_MAX_AGE
+            else:
+                response.cache_control.private = True
+                response.cache_control.no_cache = True
+            # Bodies differ for logged-in users (navigation, is_mine)
+            response.vary.add('Cookie')
+            return response
+        return wrapper
+    return decorator
 
 # =====================================================
 # HOME ROUTES
@@ -32,7 +565,15 @@ def get_db():
 @app.route('/')
 def index():
     """Homepage"""
-    return render_template('index.html')
+    try:
+        boards = get_leaderboards()
+        best_sellers = boards.top('7d', limit=8) or boards.top('all', limit=8)
+    except Exception:
+        # The home page renders without best sellers rather than failing
+        app.logger.exception('Could not load best sellers')
+        best_sellers = []
+    
+    return render_template('index.html', best_sellers=best_sellers)
 
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -51,6 +592,7 @@ def register():
                 data.get('number', ''), data.get('road', ''), data.get('area', ''),
                 data.get('city', ''), data.get('district', '')
             ))
+            bump_stats(cursor, Customers=1)
             
             db.commit()
             cursor.close()
@@ -102,100 +644,143 @@ def logout():
 # PRODUCT ROUTES
 # =====================================================
 
+def listing_scopes():
+    """Version scopes of the requested listing page: the catalog and each product on it
+
+    The catalog version covers which products are listed; stock, price and
+    rating changes only advance the versions of the products they touch.
+    Only the page's ids are loaded.
+    """
+    ids = load_product_ids(PageRequest.from_args(request.args),
+                           request.args.get('category', ''), request.args.get('search', ''))
+    return [CATALOG_SCOPE] + [product_scope(product_id) for product_id in ids]
+
+def listing_best_sellers():
+    """Best sellers heading the requested listing: first pages of plain listings only"""
+    if request.args.get('search') or request.args.get('after') or request.args.get('before'):
+        return []
+    category = request.args.get('category', '')
+    try:
+        boards = get_leaderboards()
+        return boards.top('7d', category, 4) or boards.top('all', category, 4)
+    except Exception:
+        # The listing renders without best sellers rather than failing
+        app.logger.exception('Could not load best sellers')
+        return []
+
 @app.route('/products')
+@replica_reads
+@conditional(listing_scopes, variant=listing_best_sellers)
 def products():
     """Display all products"""
     category = request.args.get('category', '')
     search = request.args.get('search', '')
     
     try:
-        db = get_db()
-        cursor = db.cursor(MySQLdb.cursors.DictCursor)
-        
-        # Build query based on filters
-        query = "SELECT * FROM Product WHERE 1=1"
-        params = []
-        
-        if category:
-            query += " AND Category = %s"
-            params.append(category)
-        
-        if search:
-            query += " AND ProductName LIKE %s"
-            params.append(f'%{search}%')
-        
-        query += " ORDER BY ProductName"
-        
-        cursor.execute(query, params)
-        products = cursor.fetchall()
+        products = load_products(PageRequest.from_args(request.args), category, search)
         
         # Get all categories for filter
-        cursor.execute("SELECT DISTINCT Category FROM Product ORDER BY Category")
-        categories = [row['Category'] for row in cursor.fetchall()]
-        
-        cursor.close()
-        db.close()
+        categories = load_categories()
         
         return render_template('products.html', 
                              products=products, 
                              categories=categories,
                              selected_category=category,
-                             search_term=search)
+                             search_term=search,
+                             best_sellers=listing_best_sellers())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/product/<int:product_id>')
+@replica_reads
+@conditional(lambda product_id: [product_scope(product_id)])
 def product_detail(product_id):
     """Display product details"""
     try:
-        db = get_db()
-        cursor = db.cursor(MySQLdb.cursors.DictCursor)
-        
         # Get product details
-        cursor.execute("SELECT * FROM Product WHERE ProductID = %s", (product_id,))
-        product = cursor.fetchone()
+        product = load_product(product_id)
         
         if not product:
-            cursor.close()
-            db.close()
             return "Product not found", 404
         
-        # Get product reviews
-        cursor.execute("""
-            SELECT r.*, c.Name as CustomerName, c.Username
-            FROM Review r
-            JOIN Customer c ON r.CustomerID = c.CustomerID
-            WHERE r.ProductID = %s
-            ORDER BY r.ReviewDate DESC
-        """, (product_id,))
-        reviews = cursor.fetchall()
-        
-        cursor.close()
-        db.close()
+        # Newest reviews for the initial render; the page loads more on demand
+        reviews = load_reviews(product_id, PageRequest(size=REVIEW_TOP_N))
         
-        return render_template('product_detail.html', product=product, reviews=reviews)
+        return render_template('product_detail.html', product=product,
+                               reviews=mark_own_reviews(reviews),
+                               next_cursor=reviews.next_cursor,
+                               review_top_n=REVIEW_TOP_N,
+                               rating=load_review_summary(product_id),
+                               also_bought=load_also_bought(product_id))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/leaderboards')
+def get_leaderboard():
+    """Best-selling products, overall or in one category
+
+    ?window=all|7d|30d (default 7d), ?category=, ?limit= (up to 20)
+    """
+    window = request.args.get('window', '7d')
+    if window not in LEADERBOARD_WINDOWS:
+        return jsonify({'error': f"Unknown window '{window}'", 'windows': list(LEADERBOARD_WINDOWS)}), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit', 10)), leaderboards.k))
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+    category = request.args.get('category') or None
+    
+    try:
+        boards = get_leaderboards()
+        return jsonify({
+            'window': window,
+            'category': category,
+            'products': boards.top(window, category, limit),
+            'categories': boards.categories(window)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/products/<int:product_id>/also-bought')
+@replica_reads
+@conditional(lambda product_id: [product_scope(product_id)])
+def get_also_bought(product_id):
+    """Products most often bought by the same customers, best first"""
+    try:
+        limit = max(1, min(int(request.args.get('limit', ALSO_BOUGHT_LIMIT)), TOP_NEIGHBOURS))
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+    
+    try:
+        return jsonify({'product_id': product_id, 'products': load_also_bought(product_id, limit)})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/products')
+@replica_reads
+@conditional(listing_scopes)
 def api_products():
     """API endpoint for products"""
     try:
-        db = get_db()
-        cursor = db.cursor(MySQLdb.cursors.DictCursor)
-        
-        cursor.execute("SELECT * FROM Product ORDER BY ProductName")
-        products = cursor.fetchall()
-        
-        cursor.close()
-        db.close()
-        
-        # Convert Decimal to float for JSON serialization
-        for product in products:
-            product['Price'] = float(product['Price'])
-            product['Rating'] = float(product['Rating'])
-        
-        return jsonify(products)
+        page = load_products(
+            PageRequest.from_args(request.args),
+            request.args.get('category', ''),
+            request.args.get('search', '')
+        )
+        
+        # The JSON provider encodes Decimal and datetime columns natively.
+        # The body stays a bare list as before; neighbouring pages are
+        # linked from the Link header
+        response = jsonify(page.items)
+        args = {key: value for key, value in request.args.items() if key not in ('after', 'before')}
+        links = [
+            f'<{url_for("api_products", **args, **{param: cursor})}>; rel="{rel}"'
+            for param, cursor, rel in (('after', page.next_cursor, 'next'), ('before', page.prev_cursor, 'prev'))
+            if cursor
+        ]
+        if links:
+            response.headers['Link'] = ', '.join(links)
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -203,6 +788,9 @@ def api_products():
 # ORDER ROUTES
 # =====================================================
 
+# Abandoned carts older than this are removed by `flask expire-carts`
+CART_TTL_DAYS = int(os.getenv('CART_TTL_DAYS', 30))
+
 @app.route('/cart')
 def cart():
     """Display shopping cart"""
@@ -213,54 +801,38 @@ def cart():
 
 @app.route('/api/cart/add', methods=['POST'])
 def add_to_cart():
-    """Add item to cart (stored in session)"""
+    """Add item to cart (stored server-side, keyed by customer)"""
     if 'customer_id' not in session:
         return jsonify({'error': 'Please login first'}), 401
     
     data = request.json
     product_id = data.get('product_id')
-    quantity = data.get('quantity', 1)
     
     try:
-        db = get_db()
-        cursor = db.cursor(MySQLdb.cursors.DictCursor)
-        
-        # Get product details
-        cursor.execute("SELECT * FROM Product WHERE ProductID = %s", (product_id,))
-        product = cursor.fetchone()
-        
-        cursor.close()
-        db.close()
+        quantity = int(data.get('quantity', 1))
+        if quantity <= 0:
+            return jsonify({'error': 'Quantity must be positive'}), 400
         
+        product = load_product(product_id)
         if not product:
             return jsonify({'error': 'Product not found'}), 404
         
-        if product['Quantity'] < quantity:
-            return jsonify({'error': 'Insufficient stock'}), 400
-        
-        # Initialize cart in session if not exists
-        if 'cart' not in session:
-            session['cart'] = {}
-        
-        # Add or update cart item
-        cart = session['cart']
-        product_id_str = str(product_id)
+        db = get_db()
+        cursor = db.cursor()
         
-        if product_id_str in cart:
-            cart[product_id_str]['quantity'] += quantity
-        else:
-            cart[product_id_str] = {
-                'product_id': product_id,
-                'name': product['ProductName'],
-                'price': float(product['Price']),
-                'quantity': quantity,
-                'image': product['ImageURL']
-            }
+        # Stock is checked against the quantity the cart will hold after this add
+        lines = get_lines(cursor, session['customer_id'])
+        if product['Quantity'] < lines.get(product['ProductID'], 0) + quantity:
+            cursor.close()
+            return jsonify({'error': 'Insufficient stock'}), 400
         
-        session['cart'] = cart
-        session.modified = True
+        add_item(cursor, session['customer_id'], product['ProductID'], quantity)
+        cart_count = count_items(cursor, session['customer_id'])
+        db.commit()
+        cursor.close()
+        db.close()
         
-        return jsonify({'success': True, 'cart_count': len(cart)})
+        return jsonify({'success': True, 'cart_count': cart_count})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -270,8 +842,27 @@ def get_cart():
     if 'customer_id' not in session:
         return jsonify({'error': 'Please login first'}), 401
     
-    cart = session.get('cart', {})
-    return jsonify(cart)
+    try:
+        cursor = get_db().cursor()
+        items = load_cart(cursor, session['customer_id'])
+        cursor.close()
+        return jsonify(items)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/cart/count')
+def get_cart_count():
+    """Number of distinct products in the cart, for the navigation badge"""
+    if 'customer_id' not in session:
+        return jsonify({'count': 0})
+    
+    try:
+        cursor = get_db().cursor()
+        count = count_items(cursor, session['customer_id'])
+        cursor.close()
+        return jsonify({'count': count})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/api/cart/update', methods=['POST'])
 def update_cart():
@@ -280,23 +871,24 @@ def update_cart():
         return jsonify({'error': 'Please login first'}), 401
     
     data = request.json
-    product_id = str(data.get('product_id'))
-    quantity = data.get('quantity', 1)
     
-    cart = session.get('cart', {})
-    
-    if product_id in cart:
-        if quantity <= 0:
-            del cart[product_id]
-        else:
-            cart[product_id]['quantity'] = quantity
+    try:
+        product_id = int(data.get('product_id'))
+        quantity = int(data.get('quantity', 1))
         
-        session['cart'] = cart
-        session.modified = True
+        db = get_db()
+        cursor = db.cursor()
+        updated = set_quantity(cursor, session['customer_id'], product_id, quantity)
+        db.commit()
+        cursor.close()
         
+        if not updated:
+            return jsonify({'error': 'Item not in cart'}), 404
         return jsonify({'success': True})
-    
-    return jsonify({'error': 'Item not in cart'}), 404
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid product or quantity'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/api/cart/remove', methods=['POST'])
 def remove_from_cart():
@@ -305,17 +897,23 @@ def remove_from_cart():
         return jsonify({'error': 'Please login first'}), 401
     
     data = request.json
-    product_id = str(data.get('product_id'))
-    
-    cart = session.get('cart', {})
     
-    if product_id in cart:
-        del cart[product_id]
-        session['cart'] = cart
-        session.modified = True
+    try:
+        product_id = int(data.get('product_id'))
+        
+        db = get_db()
+        cursor = db.cursor()
+        removed = remove_item(cursor, session['customer_id'], product_id)
+        db.commit()
+        cursor.close()
+        
+        if not removed:
+            return jsonify({'error': 'Item not in cart'}), 404
         return jsonify({'success': True})
-    
-    return jsonify({'error': 'Item not in cart'}), 404
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid product'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/checkout')
 def checkout():
@@ -323,12 +921,14 @@ def checkout():
     if 'customer_id' not in session:
         return redirect(url_for('login'))
     
-    cart = session.get('cart', {})
-    if not cart:
+    db = get_db()
+    cursor = db.cursor()
+    cart_count = count_items(cursor, session['customer_id'])
+    cursor.close()
+    if not cart_count:
         return redirect(url_for('products'))
     
     # Get customer details
-    db = get_db()
     cursor = db.cursor(MySQLdb.cursors.DictCursor)
     cursor.execute("SELECT * FROM Customer WHERE CustomerID = %s", (session['customer_id'],))
     current_user = cursor.fetchone()
@@ -343,10 +943,7 @@ def create_order():
     if 'customer_id' not in session:
         return jsonify({'error': 'Please login first'}), 401
     
-    cart = session.get('cart', {})
-    if not cart:
-        return jsonify({'error': 'Cart is empty'}), 400
-    
+    db = None
     try:
         # Get payment method from request
         data = request.get_json() or {}
@@ -364,10 +961,21 @@ def create_order():
         customer = cursor.fetchone()
         delivery_address = f"{customer[0]}, {customer[1]}, {customer[2]}, {customer[3]}. Phone: {customer[4]}"
         
+        lines = get_lines(cursor, session['customer_id'])
+        if not lines:
+            cursor.close()
+            return jsonify({'error': 'Cart is empty'}), 400
+        
+        # Lock, check and decrement stock for every line at current prices
+        try:
+            prices = reserve_stock(cursor, lines)
+        except InsufficientStock as e:
+            db.rollback()
+            return jsonify({'error': 'Insufficient stock', 'items': e.shortages}), 409
+        
         # Calculate total amount
-        cart_items = list(cart.values())
-        subtotal = sum(float(item['price']) * int(item['quantity']) for item in cart_items)
-        delivery_charge = 100.00
+        subtotal = sum(prices[product_id] * quantity for product_id, quantity in lines.items())
+        delivery_charge = Decimal('100.00')
         total_amount = subtotal + delivery_charge
         
         # Create order with payment method and delivery address
@@ -377,34 +985,28 @@ def create_order():
         """, (session['customer_id'], total_amount, payment_method, delivery_address))
         
         order_id = cursor.lastrowid
+        bump_stats(cursor, Orders=1)
         
         # Create order items
-        for item in cart_items:
-            cursor.execute("""
-                INSERT INTO OrderItem (OrderID, ProductID, Quantity, Price)
-                VALUES (%s, %s, %s, %s)
-            """, (order_id, item['product_id'], item['quantity'], item['price']))
-            
-            # Update product quantity
-            cursor.execute("""
-                UPDATE Product 
-                SET Quantity = Quantity - %s, Demand = Demand + %s
-                WHERE ProductID = %s
-            """, (item['quantity'], item['quantity'], item['product_id']))
+        insert_order_items(cursor, order_id, lines, prices)
         
-        # Create delivery record
-        cursor.execute("""
-            INSERT INTO Delivery (OrderID, DeliveryStatus)
-            VALUES (%s, 'Pending')
-        """, (order_id,))
+        # Follow-up work runs on the job workers once the order has committed
+        enqueue(cursor, 'order.create_delivery', {'order_id': order_id})
+        enqueue(cursor, 'order.record_demand', {'order_id': order_id})
+        enqueue(cursor, 'order.record_purchases', {'order_id': order_id})
+        enqueue(cursor, 'order.rollup', {'order_ids': [order_id]})
+        
+        # The cart is emptied in the same transaction that places the order
+        clear_cart(cursor, session['customer_id'])
+        bump_versions(cursor, lines)
         
         db.commit()
         cursor.close()
         db.close()
         
-        # Clear cart
-        session['cart'] = {}
-        session.modified = True
+        # Stock changed for every ordered product
+        for product_id in lines:
+            invalidate_product(product_id)
         
         return jsonify({
             'success': True, 
@@ -416,7 +1018,30 @@ def create_order():
             db.rollback()
         return jsonify({'error': str(e)}), 500
 
+def attach_order_items(cursor, orders):
+    """Load the items of all `orders` in one query and set order['order_items']"""
+    orders = list(orders)
+    if not orders:
+        return orders
+    
+    items_by_order = {order['OrderID']: [] for order in orders}
+    cursor.execute("""
+        SELECT oi.*, p.ProductName, p.ImageURL, p.Category
+        FROM OrderItem oi
+        JOIN Product p ON oi.ProductID = p.ProductID
+        WHERE oi.OrderID IN (""" + ", ".join(["%s"] * len(items_by_order)) + """)
+        ORDER BY oi.OrderID, oi.ProductID
+    """, list(items_by_order))
+    
+    for item in cursor.fetchall():
+        items_by_order[item['OrderID']].append(item)
+    
+    for order in orders:
+        order['order_items'] = items_by_order[order['OrderID']]
+    return orders
+
 @app.route('/orders')
+@replica_reads
 def my_orders():
     """Display customer orders"""
     if 'customer_id' not in session:
@@ -426,26 +1051,16 @@ def my_orders():
         db = get_db()
         cursor = db.cursor(MySQLdb.cursors.DictCursor)
         
-        # Get customer orders
-        cursor.execute("""
-            SELECT o.*, d.DeliveryStatus, d.DeliveryDate
+        # Get one page of customer orders, newest first
+        orders = fetch_page(cursor, """
+            SELECT o.*, COALESCE(d.DeliveryStatus, 'Pending') AS DeliveryStatus, d.DeliveryDate
             FROM `Order` o
             LEFT JOIN Delivery d ON o.OrderID = d.OrderID
             WHERE o.CustomerID = %s
-            ORDER BY o.OrderDate DESC
-        """, (session['customer_id'],))
+        """, (session['customer_id'],), ORDER_DATE_ORDER, PageRequest.from_args(request.args), descending=True)
         
-        orders = list(cursor.fetchall())
-        
-        # Get order items for each order
-        for order in orders:
-            cursor.execute("""
-                SELECT oi.*, p.ProductName, p.ImageURL
-                FROM OrderItem oi
-                JOIN Product p ON oi.ProductID = p.ProductID
-                WHERE oi.OrderID = %s
-            """, (order['OrderID'],))
-            order['order_items'] = list(cursor.fetchall())
+        # Get order items for all orders in one query
+        attach_order_items(cursor, orders)
         
         cursor.close()
         db.close()
@@ -469,7 +1084,7 @@ def order_confirmation(order_id):
         
         # Get order details
         cursor.execute("""
-            SELECT o.*, d.DeliveryStatus, d.DeliveryDate
+            SELECT o.*, COALESCE(d.DeliveryStatus, 'Pending') AS DeliveryStatus, d.DeliveryDate
             FROM `Order` o
             LEFT JOIN Delivery d ON o.OrderID = d.OrderID
             WHERE o.OrderID = %s AND o.CustomerID = %s
@@ -481,14 +1096,7 @@ def order_confirmation(order_id):
             return redirect(url_for('my_orders'))
         
         # Get order items
-        cursor.execute("""
-            SELECT oi.*, p.ProductName, p.ImageURL
-            FROM OrderItem oi
-            JOIN Product p ON oi.ProductID = p.ProductID
-            WHERE oi.OrderID = %s
-        """, (order_id,))
-        
-        order['order_items'] = list(cursor.fetchall())
+        attach_order_items(cursor, [order])
         
         # Get customer details
         cursor.execute("""
@@ -506,6 +1114,7 @@ def order_confirmation(order_id):
         return redirect(url_for('my_orders'))
 
 @app.route('/order/<int:order_id>')
+@replica_reads
 def order_detail(order_id):
     """Display order details"""
     if 'customer_id' not in session:
@@ -517,7 +1126,7 @@ def order_detail(order_id):
         
         # Get order details
         cursor.execute("""
-            SELECT o.*, d.DeliveryStatus, d.DeliveryDate, c.Name, c.Email, c.Number,
+            SELECT o.*, COALESCE(d.DeliveryStatus, 'Pending') AS DeliveryStatus, d.DeliveryDate, c.Name, c.Email, c.Number,
                    c.Road, c.Area, c.City, c.District
             FROM `Order` o
             LEFT JOIN Delivery d ON o.OrderID = d.OrderID
@@ -533,14 +1142,7 @@ def order_detail(order_id):
             return "Order not found", 404
         
         # Get order items
-        cursor.execute("""
-            SELECT oi.*, p.ProductName, p.ImageURL, p.Category
-            FROM OrderItem oi
-            JOIN Product p ON oi.ProductID = p.ProductID
-            WHERE oi.OrderID = %s
-        """, (order_id,))
-        
-        order['order_items'] = list(cursor.fetchall())
+        attach_order_items(cursor, [order])
         
         cursor.close()
         db.close()
@@ -591,95 +1193,148 @@ def add_review():
         if cursor.fetchone():
             return jsonify({'error': 'You have already reviewed this product'}), 400
         
-        # Insert review
+        # Insert review and fold it into the product's rating aggregate
         cursor.execute("""
             INSERT INTO Review (CustomerID, ProductID, Rating, Comment, ReviewDate)
             VALUES (%s, %s, %s, %s, NOW())
         """, (customer_id, product_id, rating, comment))
+        review_id = cursor.lastrowid
+        apply_rating(cursor, product_id, added=rating)
+        bump_versions(cursor, [product_id])
         
         db.commit()
-        review_id = cursor.lastrowid
+        invalidate_product(product_id)
         
         # Get the review with customer name
         cursor.execute("""
-            SELECT r.ReviewID, r.Rating, r.Comment, r.ReviewDate,
-                   c.FirstName, c.LastName
+            SELECT r.ReviewID, r.Rating, r.Comment, r.ReviewDate, c.Name
             FROM Review r
             JOIN Customer c ON r.CustomerID = c.CustomerID
             WHERE r.ReviewID = %s
         """, (review_id,))
         
-        review = cursor.fetchone()
+        review = cursor.fetchone()
+        cursor.close()
+        db.close()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Review submitted successfully',
+            'review': {
+                'review_id': review[0],
+                'rating': review[1],
+                'comment': review[2],
+                'review_date': review[3].strftime('%Y-%m-%d %H:%M:%S'),
+                'customer_name': review[4]
+            }
+        }), 201
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/review/update/<int:review_id>', methods=['POST'])
+def update_review(review_id):
+    """Edit the rating and/or comment of one of the customer's own reviews"""
+    if 'customer_id' not in session:
+        return jsonify({'error': 'Please login first'}), 401
+    
+    db = None
+    try:
+        data = request.get_json() or {}
+        rating = data.get('rating')
+        if rating is not None and not (1 <= int(rating) <= 5):
+            return jsonify({'error': 'Rating must be between 1 and 5'}), 400
+        
+        db = get_db()
+        cursor = db.cursor()
+        cursor.execute("""
+            SELECT ProductID, Rating, Comment FROM Review
+            WHERE ReviewID = %s AND CustomerID = %s
+            FOR UPDATE
+        """, (review_id, session['customer_id']))
+        review = cursor.fetchone()
+        if not review:
+            db.rollback()
+            return jsonify({'error': 'Review not found'}), 404
+        
+        product_id, old_rating, old_comment = review
+        new_rating = int(rating) if rating is not None else old_rating
+        comment = data['comment'].strip() if data.get('comment') is not None else old_comment
+        
+        cursor.execute("""
+            UPDATE Review SET Rating = %s, Comment = %s WHERE ReviewID = %s
+        """, (new_rating, comment, review_id))
+        if new_rating != old_rating:
+            apply_rating(cursor, product_id, added=new_rating, removed=old_rating)
+        bump_versions(cursor, [product_id])
+        
+        db.commit()
         cursor.close()
-        db.close()
-        
-        return jsonify({
-            'success': True,
-            'message': 'Review submitted successfully',
-            'review': {
-                'review_id': review[0],
-                'rating': review[1],
-                'comment': review[2],
-                'review_date': review[3].strftime('%Y-%m-%d %H:%M:%S'),
-                'customer_name': f"{review[4]} {review[5]}"
-            }
-        }), 201
+        invalidate_product(product_id)
         
+        return jsonify({'success': True, 'message': 'Review updated'})
     except Exception as e:
+        if db:
+            db.rollback()
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/reviews/<int:product_id>', methods=['GET'])
-def get_reviews(product_id):
-    """Get all reviews for a product"""
+@app.route('/api/review/delete/<int:review_id>', methods=['POST'])
+def delete_review(review_id):
+    """Delete one of the customer's own reviews"""
+    if 'customer_id' not in session:
+        return jsonify({'error': 'Please login first'}), 401
+    
+    db = None
     try:
         db = get_db()
         cursor = db.cursor()
-        
-        # Get all reviews for the product
-        cursor.execute("""
-            SELECT r.ReviewID, r.Rating, r.Comment, r.ReviewDate,
-                   c.FirstName, c.LastName, c.CustomerID
-            FROM Review r
-            JOIN Customer c ON r.CustomerID = c.CustomerID
-            WHERE r.ProductID = %s
-            ORDER BY r.ReviewDate DESC
-        """, (product_id,))
-        
-        reviews_data = cursor.fetchall()
-        
-        # Get average rating and count
         cursor.execute("""
-            SELECT AVG(Rating) as avg_rating, COUNT(*) as review_count
-            FROM Review
-            WHERE ProductID = %s
-        """, (product_id,))
+            SELECT ProductID, Rating FROM Review
+            WHERE ReviewID = %s AND CustomerID = %s
+            FOR UPDATE
+        """, (review_id, session['customer_id']))
+        review = cursor.fetchone()
+        if not review:
+            db.rollback()
+            return jsonify({'error': 'Review not found'}), 404
         
-        stats = cursor.fetchone()
-        avg_rating = float(stats[0]) if stats[0] else 0
-        review_count = stats[1]
+        product_id, rating = review
+        cursor.execute("DELETE FROM Review WHERE ReviewID = %s", (review_id,))
+        apply_rating(cursor, product_id, removed=rating)
+        bump_versions(cursor, [product_id])
         
+        db.commit()
         cursor.close()
-        db.close()
+        invalidate_product(product_id)
         
-        reviews = []
-        for review in reviews_data:
-            reviews.append({
-                'review_id': review[0],
-                'rating': review[1],
-                'comment': review[2],
-                'review_date': review[3].strftime('%B %d, %Y at %I:%M %p'),
-                'customer_name': f"{review[4]} {review[5]}",
-                'customer_id': review[6],
-                'is_mine': 'customer_id' in session and session['customer_id'] == review[6]
-            })
+        return jsonify({'success': True, 'message': 'Review deleted'})
+    except Exception as e:
+        if db:
+            db.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/reviews/<int:product_id>', methods=['GET'])
+@replica_reads
+@conditional(lambda product_id: [product_scope(product_id)])
+def get_reviews(product_id):
+    """Get one page of reviews for a product, newest first
+
+    ?limit= with ?after= / ?before= cursors pages through the feed;
+    ?top=N returns just the N newest (the product page's initial set).
+    """
+    try:
+        if request.args.get('top'):
+            page = PageRequest(size=max(1, min(int(request.args['top']), MAX_PAGE_SIZE)))
+        else:
+            page = PageRequest.from_args(request.args)
         
-        return jsonify({
-            'success': True,
-            'reviews': reviews,
-            'avg_rating': round(avg_rating, 1),
-            'review_count': review_count
-        }), 200
+        reviews = load_reviews(product_id, page)
+        rating = load_review_summary(product_id)
         
+        return jsonify(dict(success=True, reviews=mark_own_reviews(reviews),
+                            **reviews.cursors(), **rating)), 200
+    except ValueError:
+        return jsonify({'error': 'top must be a number'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -757,15 +1412,8 @@ def delivery_dashboard():
         
         orders = list(cursor.fetchall())
         
-        # Get order items for each order
-        for order in orders:
-            cursor.execute("""
-                SELECT oi.*, p.ProductName, p.ImageURL
-                FROM OrderItem oi
-                JOIN Product p ON oi.ProductID = p.ProductID
-                WHERE oi.OrderID = %s
-            """, (order['OrderID'],))
-            order['order_items'] = list(cursor.fetchall())
+        # Get order items for all orders in one query
+        attach_order_items(cursor, orders)
         
         cursor.close()
         db.close()
@@ -775,6 +1423,53 @@ def delivery_dashboard():
         flash(f'Error: {str(e)}', 'error')
         return redirect(url_for('delivery_login'))
 
+# Route plans are cached under the rider's open orders and their statuses,
+# so a plan is reused until one of them changes, whichever process made
+# the change. The adjacency table is re-read every ROUTE_CACHE_TTL seconds.
+route_cache = TTLCache(
+    ttl=float(os.getenv('ROUTE_CACHE_TTL', 300)),
+    max_entries=int(os.getenv('ROUTE_CACHE_SIZE', 512))
+)
+
+def load_route_plan(delivery_man_id):
+    """Stop-ordered plan of a rider's open orders (cached)"""
+    cursor = get_db().cursor(MySQLdb.cursors.DictCursor)
+    orders, home = load_open_orders(cursor, delivery_man_id)
+    key = ('route', delivery_man_id, home, tuple((order['OrderID'], order['OrderStatus']) for order in orders))
+    plan = route_cache.get(key)
+    if plan is None:
+        graph = route_cache.get_or_load('area-graph', lambda: load_area_graph(cursor))
+        plan = plan_route(orders, home, graph)
+        # Drop the rider's superseded plans
+        route_cache.invalidate(f'rider:{delivery_man_id}')
+        route_cache.set(key, plan, tags=[f'rider:{delivery_man_id}'])
+    cursor.close()
+    return plan
+
+@app.route('/delivery/route')
+def delivery_route():
+    """Delivery man's open orders grouped by area, in visiting order"""
+    if 'delivery_man_id' not in session:
+        return redirect(url_for('delivery_login'))
+    
+    try:
+        plan = load_route_plan(session['delivery_man_id'])
+        return render_template('delivery_route.html', plan=plan)
+    except Exception as e:
+        flash(f'Error: {str(e)}', 'error')
+        return redirect(url_for('delivery_dashboard'))
+
+@app.route('/delivery/api/route')
+def get_delivery_route():
+    """Route plan for the logged-in delivery man"""
+    if 'delivery_man_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        return jsonify(load_route_plan(session['delivery_man_id']))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/delivery/api/update-payment-status', methods=['POST'])
 def update_payment_status():
     """Update payment status when delivery man receives cash"""
@@ -794,7 +1489,7 @@ def update_payment_status():
         
         # Verify order is assigned to this delivery man
         cursor.execute("""
-            SELECT DeliveryManID, OrderStatus FROM `Order` WHERE OrderID = %s
+            SELECT DeliveryManID, OrderStatus, TotalAmount FROM `Order` WHERE OrderID = %s
         """, (order_id,))
         
         result = cursor.fetchone()
@@ -802,6 +1497,7 @@ def update_payment_status():
             return jsonify({'error': 'Unauthorized'}), 403
         
         current_order_status = result[1]
+        total_amount = result[2]
         
         # Update payment status
         cursor.execute("""
@@ -809,6 +1505,7 @@ def update_payment_status():
             SET PaymentStatus = %s
             WHERE OrderID = %s
         """, (payment_status, order_id))
+        record_change(cursor, session['delivery_man_id'], order_id, 'payment', payment_status)
         
         # If order is delivered AND payment is now paid/received, mark as Complete
         if current_order_status == 'Delivered' and payment_status == 'Paid':
@@ -817,6 +1514,8 @@ def update_payment_status():
                 SET OrderStatus = 'Complete'
                 WHERE OrderID = %s
             """, (order_id,))
+            bump_stats(cursor, Revenue=revenue_delta(current_order_status, 'Complete', total_amount))
+            enqueue(cursor, 'order.rollup', {'order_ids': [order_id]})
         
         db.commit()
         cursor.close()
@@ -848,7 +1547,7 @@ def update_order_status():
         
         # Verify order is assigned to this delivery man and get payment info
         cursor.execute("""
-            SELECT DeliveryManID, PaymentStatus, PaymentMethod 
+            SELECT DeliveryManID, PaymentStatus, PaymentMethod, OrderStatus, TotalAmount
             FROM `Order` 
             WHERE OrderID = %s
         """, (order_id,))
@@ -859,6 +1558,9 @@ def update_order_status():
         
         payment_status = result[1]
         payment_method = result[2]
+        previous_status = result[3]
+        total_amount = result[4]
+        final_status = order_status
         
         # Update order status
         cursor.execute("""
@@ -866,6 +1568,7 @@ def update_order_status():
             SET OrderStatus = %s
             WHERE OrderID = %s
         """, (order_status, order_id))
+        record_change(cursor, session['delivery_man_id'], order_id, 'status', order_status)
         
         # If marked as Delivered
         if order_status == 'Delivered':
@@ -876,6 +1579,7 @@ def update_order_status():
                     SET PaymentStatus = 'Paid', OrderStatus = 'Complete'
                     WHERE OrderID = %s
                 """, (order_id,))
+                final_status = 'Complete'
             # For Cash on Delivery with already paid status, mark as Complete
             elif payment_status == 'Paid':
                 cursor.execute("""
@@ -883,14 +1587,23 @@ def update_order_status():
                     SET OrderStatus = 'Complete'
                     WHERE OrderID = %s
                 """, (order_id,))
+                final_status = 'Complete'
         
-        # Also update delivery table
+        bump_stats(cursor, Revenue=revenue_delta(previous_status, final_status, total_amount))
+        if final_status != previous_status:
+            enqueue(cursor, 'order.rollup', {'order_ids': [order_id]})
+        if 'Cancelled' in (previous_status, final_status) and final_status != previous_status:
+            enqueue(cursor, 'order.record_purchases', {'order_id': order_id})
+        
+        # Also update delivery table (the row may not exist yet if the
+        # order.create_delivery job has not run)
         cursor.execute("""
-            UPDATE Delivery 
-            SET DeliveryStatus = %s,
-                DeliveryDate = CASE WHEN %s IN ('Delivered', 'Complete') THEN CURDATE() ELSE DeliveryDate END
-            WHERE OrderID = %s
-        """, (order_status, order_status, order_id))
+            INSERT INTO Delivery (OrderID, DeliveryStatus, DeliveryDate)
+            VALUES (%s, %s, CASE WHEN %s IN ('Delivered', 'Complete') THEN CURDATE() END)
+            ON DUPLICATE KEY UPDATE
+                DeliveryStatus = VALUES(DeliveryStatus),
+                DeliveryDate = COALESCE(VALUES(DeliveryDate), DeliveryDate)
+        """, (order_id, order_status, order_status))
         
         db.commit()
         cursor.close()
@@ -902,6 +1615,44 @@ def update_order_status():
             db.rollback()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/delivery/api/sync', methods=['POST'])
+def sync_delivery_events():
+    """Apply status and payment updates the dashboard queued while offline
+
+    JSON body: {"events": [{"event_id", "order_id", "at", "order_status" or
+    "payment_status"}, ...]}. All events are applied in one transaction;
+    sending the same events again is harmless.
+    """
+    if 'delivery_man_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    events = data.get('events')
+    if not isinstance(events, list) or not events:
+        return jsonify({'error': 'events must be a non-empty list'}), 400
+    if len(events) > MAX_SYNC_EVENTS:
+        return jsonify({'error': f'At most {MAX_SYNC_EVENTS} events per sync'}), 400
+    
+    db = None
+    try:
+        db = get_db()
+        cursor = db.cursor()
+        results = sync_events(cursor, session['delivery_man_id'], events)
+        changed = sorted({result['order_id'] for result in results if result['result'] == 'applied'})
+        if changed:
+            enqueue(cursor, 'order.rollup', {'order_ids': changed})
+        db.commit()
+        cursor.close()
+        
+        counts = {}
+        for result in results:
+            counts[result['result']] = counts.get(result['result'], 0) + 1
+        return jsonify({'success': True, 'results': results, 'counts': counts})
+    except Exception as e:
+        if db:
+            db.rollback()
+        return jsonify({'error': str(e)}), 500
+
 # =====================================================
 # ADMIN ROUTES
 # =====================================================
@@ -957,6 +1708,9 @@ def admin_logout():
     flash('Logged out successfully', 'success')
     return redirect(url_for('admin_login'))
 
+# Dashboard counters older than this are recomputed from the base tables
+STATS_RECONCILE_INTERVAL = float(os.getenv('STATS_RECONCILE_INTERVAL', 3600))
+
 @app.route('/admin/dashboard')
 def admin_dashboard():
     """Main admin dashboard"""
@@ -967,21 +1721,12 @@ def admin_dashboard():
         db = get_db()
         cursor = db.cursor(MySQLdb.cursors.DictCursor)
         
-        # Get statistics
-        cursor.execute("SELECT COUNT(*) as total FROM Customer")
-        total_customers = cursor.fetchone()['total']
-        
-        cursor.execute("SELECT COUNT(*) as total FROM Product")
-        total_products = cursor.fetchone()['total']
-        
-        cursor.execute("SELECT COUNT(*) as total FROM `Order`")
-        total_orders = cursor.fetchone()['total']
-        
-        cursor.execute("SELECT COUNT(*) as total FROM DeliveryMan WHERE Status = 'Active'")
-        total_delivery = cursor.fetchone()['total']
-        
-        cursor.execute("SELECT SUM(TotalAmount) as revenue FROM `Order` WHERE OrderStatus = 'Complete'")
-        total_revenue = cursor.fetchone()['revenue'] or 0
+        # Get statistics from the incrementally maintained counters
+        stats_cursor = db.cursor()
+        counters, reconciled = read_stats(stats_cursor, STATS_RECONCILE_INTERVAL)
+        stats_cursor.close()
+        if reconciled:
+            db.commit()
         
         # Get recent orders
         cursor.execute("""
@@ -997,11 +1742,11 @@ def admin_dashboard():
         db.close()
         
         stats = {
-            'customers': total_customers,
-            'products': total_products,
-            'orders': total_orders,
-            'delivery_men': total_delivery,
-            'revenue': float(total_revenue)
+            'customers': counters['Customers'],
+            'products': counters['Products'],
+            'orders': counters['Orders'],
+            'delivery_men': counters['ActiveDeliveryMen'],
+            'revenue': float(counters['Revenue'])
         }
         
         return render_template('admin_dashboard.html', stats=stats, recent_orders=recent_orders)
@@ -1010,6 +1755,7 @@ def admin_dashboard():
         return redirect(url_for('admin_login'))
 
 @app.route('/admin/orders')
+@replica_reads
 def admin_orders():
     """Admin page to view and assign orders"""
     if 'admin_id' not in session:
@@ -1019,16 +1765,24 @@ def admin_orders():
         db = get_db()
         cursor = db.cursor(MySQLdb.cursors.DictCursor)
         
-        # Get all orders with customer and delivery man info
-        cursor.execute("""
+        # Get one page of orders with customer and delivery man info
+        orders = fetch_page(cursor, """
             SELECT o.*, c.Name as CustomerName, c.Number, d.Name as DeliveryManName
             FROM `Order` o
             JOIN Customer c ON o.CustomerID = c.CustomerID
             LEFT JOIN DeliveryMan d ON o.DeliveryManID = d.DeliveryManID
-            ORDER BY o.OrderDate DESC
-        """)
+            WHERE 1=1
+        """, (), ORDER_DATE_ORDER, PageRequest.from_args(request.args), descending=True)
         
-        orders = list(cursor.fetchall())
+        # Summary counts over all orders, not just this page
+        cursor.execute("""
+            SELECT COUNT(*) as total,
+                   COALESCE(SUM(OrderStatus = 'Pending'), 0) as pending,
+                   COALESCE(SUM(DeliveryManID IS NULL), 0) as unassigned,
+                   COALESCE(SUM(OrderStatus = 'Delivered'), 0) as delivered
+            FROM `Order`
+        """)
+        summary = cursor.fetchone()
         
         # Get all active delivery men
         cursor.execute("""
@@ -1043,11 +1797,12 @@ def admin_orders():
         cursor.close()
         db.close()
         
-        return render_template('admin_orders.html', orders=orders, delivery_men=delivery_men)
+        return render_template('admin_orders.html', orders=orders, summary=summary, delivery_men=delivery_men)
     except Exception as e:
         return f"Error: {str(e)}", 500
 
 @app.route('/admin/customers')
+@replica_reads
 def admin_customers():
     """Admin page to manage customers"""
     if 'admin_id' not in session:
@@ -1057,22 +1812,40 @@ def admin_customers():
         db = get_db()
         cursor = db.cursor(MySQLdb.cursors.DictCursor)
         
+        # Page through customers first so order totals are only computed for this page
+        customers = fetch_page(cursor, "SELECT c.* FROM Customer c WHERE 1=1", (),
+                               CUSTOMER_ORDER, PageRequest.from_args(request.args), descending=True)
+        
+        totals = {}
+        if customers:
+            customer_ids = [customer['CustomerID'] for customer in customers]
+            cursor.execute("""
+                SELECT CustomerID,
+                       COUNT(*) as TotalOrders,
+                       COALESCE(SUM(CASE WHEN OrderStatus = 'Complete' THEN TotalAmount ELSE 0 END), 0) as TotalSpent
+                FROM `Order`
+                WHERE CustomerID IN (""" + ", ".join(["%s"] * len(customer_ids)) + """)
+                GROUP BY CustomerID
+            """, customer_ids)
+            totals = {row['CustomerID']: row for row in cursor.fetchall()}
+        
+        for customer in customers:
+            row = totals.get(customer['CustomerID'], {})
+            customer['TotalOrders'] = row.get('TotalOrders', 0)
+            customer['TotalSpent'] = row.get('TotalSpent', 0)
+        
+        # Summary over all customers, not just this page
         cursor.execute("""
-            SELECT c.*, 
-                   COUNT(DISTINCT o.OrderID) as TotalOrders,
-                   COALESCE(SUM(CASE WHEN o.OrderStatus = 'Complete' THEN o.TotalAmount ELSE 0 END), 0) as TotalSpent
-            FROM Customer c
-            LEFT JOIN `Order` o ON c.CustomerID = o.CustomerID
-            GROUP BY c.CustomerID
-            ORDER BY c.CreatedAt DESC
+            SELECT (SELECT COUNT(*) FROM Customer) as customers,
+                   (SELECT COUNT(DISTINCT CustomerID) FROM `Order`) as active_customers,
+                   (SELECT COALESCE(SUM(TotalAmount), 0) FROM `Order` WHERE OrderStatus = 'Complete') as revenue
         """)
-        
-        customers = list(cursor.fetchall())
+        summary = cursor.fetchone()
         
         cursor.close()
         db.close()
         
-        return render_template('admin_customers.html', customers=customers)
+        return render_template('admin_customers.html', customers=customers, summary=summary)
     except Exception as e:
         return f"Error: {str(e)}", 500
 
@@ -1083,20 +1856,14 @@ def admin_products():
         return redirect(url_for('admin_login'))
     
     try:
-        db = get_db()
-        cursor = db.cursor(MySQLdb.cursors.DictCursor)
-        
-        cursor.execute("SELECT * FROM Product ORDER BY ProductName")
-        products = list(cursor.fetchall())
-        
-        cursor.close()
-        db.close()
+        products = load_products(PageRequest.from_args(request.args))
         
         return render_template('admin_products.html', products=products)
     except Exception as e:
         return f"Error: {str(e)}", 500
 
 @app.route('/admin/delivery')
+@replica_reads
 def admin_delivery():
     """Admin page to manage delivery personnel"""
     if 'admin_id' not in session:
@@ -1149,18 +1916,64 @@ def add_product():
             data.get('image_url'),
             data.get('embroidery_type', 'None')
         ))
+        product_id = cursor.lastrowid
+        bump_stats(cursor, Products=1)
+        bump_versions(cursor, [product_id], catalog=True)
         
         db.commit()
-        product_id = cursor.lastrowid
         cursor.close()
         db.close()
         
+        index_product(product_id, dict(data, embroidery_type=data.get('embroidery_type', 'None')))
+        invalidate_product(product_id, data.get('category'), listed=True)
+        
         return jsonify({'success': True, 'product_id': product_id})
     except Exception as e:
         if db:
             db.rollback()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/admin/api/import/products', methods=['POST'])
+def import_products_api():
+    """Create and update products in bulk from a CSV or NDJSON file
+
+    Send the file as the request body or as a 'file' upload. ?format=csv|ndjson
+    (otherwise taken from the file name or Content-Type), ?dry_run=1 to
+    validate and roll back. Rows with a product_id update that product,
+    rows without one create a product.
+    """
+    if 'admin_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    fmt = request.args.get('format')
+    if not fmt:
+        name = upload.filename if upload else ''
+        ndjson = name.endswith(('.ndjson', '.jsonl')) or request.mimetype in ('application/x-ndjson', 'application/json')
+        fmt = 'ndjson' if ndjson else 'csv'
+    if fmt not in IMPORT_FORMATS:
+        return jsonify({'error': f"Unknown format '{fmt}'", 'formats': list(IMPORT_FORMATS)}), 400
+    try:
+        chunk_size = max(1, min(int(request.args.get('chunk_size', 500)), 5000))
+    except ValueError:
+        return jsonify({'error': 'chunk_size must be a number'}), 400
+    dry_run = request.args.get('dry_run') in ('1', 'true')
+    
+    try:
+        report = import_products(get_db(), read_rows(stream, fmt), chunk_size, dry_run)
+        return jsonify(report)
+    except UnicodeDecodeError:
+        return jsonify({'error': 'File must be UTF-8 encoded'}), 400
+    except csv.Error as e:
+        return jsonify({'error': f'Invalid CSV: {e}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        # Once per import, however far it got: earlier chunks are committed
+        if not dry_run:
+            invalidate_catalog()
+
 @app.route('/admin/api/update-product/<int:product_id>', methods=['POST'])
 def update_product(product_id):
     """Update product"""
@@ -1173,6 +1986,9 @@ def update_product(product_id):
         db = get_db()
         cursor = db.cursor()
         
+        cursor.execute("SELECT ProductName, Category FROM Product WHERE ProductID = %s FOR UPDATE", (product_id,))
+        previous = cursor.fetchone()
+        
         cursor.execute("""
             UPDATE Product 
             SET ProductName = %s, Category = %s, Price = %s, 
@@ -1188,11 +2004,16 @@ def update_product(product_id):
             data.get('embroidery_type'),
             product_id
         ))
+        # Listings only change when the product moves within or between them
+        bump_versions(cursor, [product_id], catalog=previous != (data.get('name'), data.get('category')))
         
         db.commit()
         cursor.close()
         db.close()
         
+        index_product(product_id, data)
+        invalidate_product(product_id, data.get('category'), listed=True)
+        
         return jsonify({'success': True})
     except Exception as e:
         if db:
@@ -1210,11 +2031,19 @@ def delete_product(product_id):
         cursor = db.cursor()
         
         cursor.execute("DELETE FROM Product WHERE ProductID = %s", (product_id,))
+        bump_stats(cursor, Products=-cursor.rowcount)
+        bump_versions(cursor, [product_id], catalog=True)
         
         db.commit()
         cursor.close()
         db.close()
         
+        search_index.remove(product_id)
+        
+        # Every listing containing the product carries its tag; the category list may shrink
+        invalidate_product(product_id)
+        catalog_cache.invalidate('categories')
+        
         return jsonify({'success': True})
     except Exception as e:
         if db:
@@ -1262,9 +2091,10 @@ def add_delivery_person():
             data.get('address', ''),
             data['vehicle_type']
         ))
+        delivery_man_id = cursor.lastrowid
+        bump_stats(cursor, ActiveDeliveryMen=1)
         
         db.commit()
-        delivery_man_id = cursor.lastrowid
         cursor.close()
         db.close()
         
@@ -1294,6 +2124,7 @@ def assign_delivery():
             SET DeliveryManID = %s
             WHERE OrderID = %s
         """, (delivery_man_id, order_id))
+        enqueue(cursor, 'order.rollup', {'order_ids': [order_id]})
         
         db.commit()
         cursor.close()
@@ -1305,6 +2136,50 @@ def assign_delivery():
             db.rollback()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/admin/api/auto-assign', methods=['POST'])
+def auto_assign():
+    """Assign every unassigned Pending order to an Active rider in one batch
+
+    JSON body: {"dry_run": true} returns the plan without writing it;
+    optional "limit" only considers that many of the oldest orders
+    """
+    if 'admin_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    dry_run = bool(data.get('dry_run'))
+    try:
+        limit = int(data['limit']) if data.get('limit') else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'limit must be a number'}), 400
+    
+    db = None
+    try:
+        db = get_db()
+        cursor = db.cursor()
+        started = time.perf_counter()
+        
+        orders, riders = load_dispatch_state(cursor, limit)
+        plan = plan_assignments(orders, riders)
+        result = plan.to_dict()
+        result['dry_run'] = dry_run
+        if not dry_run:
+            # Orders assigned by hand since the plan was read are skipped
+            result['assigned'] = apply_assignments(cursor, plan.assignments)
+            result['skipped'] = len(plan.assignments) - result['assigned']
+            if result['assigned']:
+                # Skipped orders are left as they are by the rollup
+                enqueue(cursor, 'order.rollup', {'order_ids': [order_id for order_id, _ in plan.assignments]})
+            db.commit()
+        cursor.close()
+        
+        result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return jsonify(result)
+    except Exception as e:
+        if db:
+            db.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/admin/api/customer/<int:customer_id>')
 def get_customer_details(customer_id):
     """Get customer details"""
@@ -1337,6 +2212,17 @@ def get_customer_details(customer_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/admin/api/delivery-route/<int:delivery_man_id>')
+def get_delivery_man_route(delivery_man_id):
+    """Route plan of any delivery man"""
+    if 'admin_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        return jsonify(load_route_plan(delivery_man_id))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/admin/api/delivery-orders/<int:delivery_man_id>')
 def get_delivery_orders(delivery_man_id):
     """Get orders assigned to a delivery man"""
@@ -1354,7 +2240,10 @@ def get_delivery_orders(delivery_man_id):
         if not delivery_man:
             return jsonify({'error': 'Delivery man not found'}), 404
         
-        # Get orders
+        cursor.close()
+        
+        # Stream the orders straight from a server-side cursor
+        cursor = db.cursor(MySQLdb.cursors.SSDictCursor)
         cursor.execute("""
             SELECT o.OrderID, o.TotalAmount, o.OrderStatus, o.PaymentStatus, 
                    o.OrderDate, c.Name as CustomerName
@@ -1364,18 +2253,394 @@ def get_delivery_orders(delivery_man_id):
             ORDER BY o.OrderDate DESC
         """, (delivery_man_id,))
         
-        orders = list(cursor.fetchall())
+        body = stream_json(iter_rows(cursor), 'orders', {'delivery_man_name': delivery_man['Name']})
+        return app.response_class(stream_with_context(body), mimetype='application/json')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/admin/api/export/<dataset>')
+@replica_reads
+def admin_export(dataset):
+    """Stream a full export of orders, order items, customers or products
+
+    ?format=csv|ndjson, optional ?start= / ?end= dates (YYYY-MM-DD, inclusive)
+    """
+    if 'admin_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    fmt = request.args.get('format', 'csv')
+    if dataset not in EXPORTS:
+        return jsonify({'error': f"Unknown export '{dataset}'", 'exports': sorted(EXPORTS)}), 404
+    if fmt not in FORMATS:
+        return jsonify({'error': f"Unknown format '{fmt}'", 'formats': sorted(FORMATS)}), 400
+    try:
+        start = parse_date(request.args.get('start'))
+        end = parse_date(request.args.get('end'))
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    
+    try:
+        body = export_chunks(get_db(), dataset, fmt, start, end)
         
+        response = app.response_class(stream_with_context(body), mimetype=FORMATS[fmt])
+        filename = f"{dataset}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{fmt}"
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response.cache_control.no_store = True
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Days covered by a sales report when no start date is given
+REPORT_DEFAULT_DAYS = int(os.getenv('REPORT_DEFAULT_DAYS', 30))
+
+@app.route('/admin/api/reports/sales')
+@replica_reads
+def admin_sales_report():
+    """Sales between two dates per category, product, payment method, district or rider
+
+    ?dimension= (default category), ?start= / ?end= dates (YYYY-MM-DD,
+    inclusive, default the last REPORT_DEFAULT_DAYS days), ?interval=day
+    for one row per day, ?limit=. Answered from the daily rollups.
+    """
+    if 'admin_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    dimension = request.args.get('dimension', 'category')
+    if dimension not in REPORT_DIMENSIONS:
+        return jsonify({'error': f"Unknown dimension '{dimension}'", 'dimensions': list(REPORT_DIMENSIONS)}), 400
+    interval = request.args.get('interval')
+    if interval not in (None, 'day'):
+        return jsonify({'error': 'interval must be day'}), 400
+    try:
+        end = parse_date(request.args.get('end')) or date.today()
+        start = parse_date(request.args.get('start')) or end - timedelta(days=REPORT_DEFAULT_DAYS - 1)
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    if start > end:
+        return jsonify({'error': 'start must not be after end'}), 400
+    try:
+        limit = int(request.args['limit']) if request.args.get('limit') else None
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+    
+    try:
+        cursor = get_db().cursor()
+        started = time.perf_counter()
+        rows = sales_report(cursor, dimension, start, end, by_day=interval == 'day', limit=limit)
+        totals = sales_report(cursor, 'total', start, end)
         cursor.close()
-        db.close()
         
         return jsonify({
-            'delivery_man_name': delivery_man['Name'],
-            'orders': orders
+            'dimension': dimension,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'interval': interval,
+            'rows': rows,
+            'totals': totals[0] if totals else None,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/admin/api/cache-stats')
+def cache_stats():
+    """Catalog cache hit/miss counters"""
+    if 'admin_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    return jsonify({'catalog': catalog_cache.stats()})
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics for this process (admin session or METRICS_TOKEN bearer)"""
+    token = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if 'admin_id' not in session and not (METRICS_TOKEN and hmac.compare_digest(token, METRICS_TOKEN)):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    pool = db_pool.stats()
+    cache = catalog_cache.stats()
+    gauges = {
+        'db_pool_connections_open': ('Open pooled connections', pool['open']),
+        'db_pool_connections_in_use': ('Pooled connections checked out', pool['in_use']),
+        'catalog_cache_entries': ('Catalog cache entries', cache['entries']),
+        'catalog_cache_hits': ('Catalog cache hits since start', cache['hits']),
+        'catalog_cache_misses': ('Catalog cache misses since start', cache['misses']),
+        'db_replicas_configured': ('Read replicas configured', len(replica_router.replicas)),
+        'db_replicas_healthy': ('Read replicas in rotation', sum(replica['healthy'] for replica in replica_router.status())),
+    }
+    response = app.response_class(request_metrics.render(gauges), mimetype='text/plain')
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    response.cache_control.no_store = True
+    return response
+
+@app.route('/admin/api/job-stats')
+def job_stats():
+    """Background job queue depth"""
+    if 'admin_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        cursor = get_db().cursor()
+        stats = queue_stats(cursor)
+        cursor.close()
+        return jsonify(stats)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# =====================================================
+# BACKGROUND JOBS
+# =====================================================
+
+def create_delivery_record(cursor, payload):
+    """Job: create the Pending delivery row for a new order"""
+    # IGNORE: a status update may already have created it
+    cursor.execute("""
+        INSERT IGNORE INTO Delivery (OrderID, DeliveryStatus)
+        VALUES (%s, 'Pending')
+    """, (payload['order_id'],))
+
+def record_order_demand(cursor, payload):
+    """Job: add an order's quantities to each product's Demand and today's sales counters"""
+    if not first_run(cursor, 'order.record_demand', payload['order_id']):
+        return
+    cursor.execute("""
+        UPDATE Product p
+        JOIN OrderItem oi ON p.ProductID = oi.ProductID
+        SET p.Demand = p.Demand + oi.Quantity
+        WHERE oi.OrderID = %s
+    """, (payload['order_id'],))
+    record_sales(cursor, payload['order_id'])
+    
+    cursor.execute("SELECT ProductID FROM OrderItem WHERE OrderID = %s", (payload['order_id'],))
+    bump_versions(cursor, [row[0] for row in cursor.fetchall()])
+
+def record_order_purchases(cursor, payload):
+    """Job: count an order in the purchase matrix behind "customers also bought", or take a cancelled one out"""
+    record_purchases(cursor, payload['order_id'])
+
+def rollup_order_sales(cursor, payload):
+    """Job: move orders' contributions in the sales rollups to their current status and rider"""
+    rollup_orders(cursor, payload['order_ids'])
+
+JOB_HANDLERS = {
+    'order.create_delivery': create_delivery_record,
+    'order.record_demand': record_order_demand,
+    'order.record_purchases': record_order_purchases,
+    'order.rollup': rollup_order_sales,
+}
+
+# Workers open their own connections rather than sharing the web pool
+connect_worker_db = partial(MySQLdb.connect, **DB_CONFIG)
+
+# =====================================================
+# MAINTENANCE COMMANDS
+# =====================================================
+
+@app.cli.command('migrate')
+@click.option('--status', is_flag=True, help='List migrations without applying them')
+def migrate_command(status):
+    """Apply pending schema migrations from database/migrations"""
+    db = get_db()
+    if status:
+        for migration, state in migration_status(db):
+            print(f"{migration.version:04d}_{migration.name}: {state}")
+        return
+    
+    applied = apply_migrations(db)
+    print(f"Applied {len(applied)} migration(s)")
+
+@app.cli.command('reconcile-stats')
+def reconcile_stats_command():
+    """Recompute the dashboard counters from the base tables"""
+    db = get_db()
+    cursor = db.cursor()
+    values = reconcile_stats(cursor)
+    db.commit()
+    cursor.close()
+    
+    for column, value in values.items():
+        print(f"{column}: {value}")
+
+@app.cli.command('expire-carts')
+@click.option('--days', type=int, default=None, help='Maximum cart age (default: CART_TTL_DAYS)')
+def expire_carts_command(days):
+    """Delete carts that have not been touched for a number of days"""
+    if days is None:
+        days = CART_TTL_DAYS
+    
+    db = get_db()
+    cursor = db.cursor()
+    removed = expire_carts(cursor, days)
+    db.commit()
+    cursor.close()
+    
+    print(f"Removed {removed} cart(s) older than {days} day(s)")
+
+@app.cli.command('backfill-ratings')
+@click.option('--batch-size', type=int, default=500, help='Products per transaction')
+def backfill_ratings_command(batch_size):
+    """Rebuild the product rating aggregates and Product.Rating from all reviews"""
+    db = get_db()
+    processed = backfill_ratings(db, batch_size)
+    
+    cursor = db.cursor()
+    bump_all_versions(cursor)
+    db.commit()
+    cursor.close()
+    catalog_cache.clear()
+    print(f"Backfilled {processed} product(s)")
+
+@app.cli.command('recommendations')
+@click.option('--full', is_flag=True, help='Recompute every product, not only those marked stale')
+@click.option('--top-k', type=click.IntRange(1, 255), default=TOP_NEIGHBOURS, help='Neighbours stored per product')
+def recommendations_command(full, top_k):
+    """Refresh the "customers also bought" lists (run from cron)"""
+    refreshed = refresh_neighbours(get_db(), full, top_k, log=print)
+    print(f"Refreshed {refreshed} product(s)")
+
+@app.cli.command('leaderboards')
+@click.option('--window', type=click.Choice(list(LEADERBOARD_WINDOWS)), default='7d', help='Sales window')
+@click.option('--category', default=None, help='Only this category')
+@click.option('--purge', is_flag=True, help='Delete sales counters older than the longest window')
+def leaderboards_command(window, category, purge):
+    """Print the best sellers; optionally purge expired sales counters (run daily)"""
+    if purge:
+        db = get_db()
+        cursor = db.cursor()
+        removed = purge_buckets(cursor)
+        db.commit()
+        cursor.close()
+        print(f"Purged {removed} expired sales counter(s)")
+    
+    for product in get_leaderboards().top(window, category):
+        print(f"{product['Rank']:>3}. {product['ProductName']} ({product['Category']}): {product['Units']} sold")
+
+@app.cli.command('backfill-rollups')
+@click.option('--start', default=None, help='First order day to rebuild (YYYY-MM-DD)')
+@click.option('--end', default=None, help='Last order day to rebuild (YYYY-MM-DD)')
+@click.option('--chunk-size', type=click.IntRange(1), default=BACKFILL_ROLLUP_CHUNK, help='Orders per transaction')
+def backfill_rollups_command(start, end, chunk_size):
+    """Rebuild the daily sales rollups from the orders (all days by default)"""
+    try:
+        start, end = parse_date(start), parse_date(end)
+    except ValueError:
+        raise click.BadParameter('dates must be YYYY-MM-DD')
+    
+    rolled = backfill_rollups(get_db(), start, end, chunk_size, log=print)
+    print(f"Rolled up {rolled} order(s)")
+
+@app.cli.command('sales-report')
+@click.argument('dimension', type=click.Choice(REPORT_DIMENSIONS), default='category')
+@click.option('--start', default=None, help='First day to include (YYYY-MM-DD)')
+@click.option('--end', default=None, help='Last day to include (YYYY-MM-DD, default today)')
+@click.option('--limit', type=click.IntRange(1), default=None, help='Rows to print')
+def sales_report_command(dimension, start, end, limit):
+    """Print sales per category, product, payment method, district or rider"""
+    try:
+        end = parse_date(end) or date.today()
+        start = parse_date(start) or end - timedelta(days=REPORT_DEFAULT_DAYS - 1)
+    except ValueError:
+        raise click.BadParameter('dates must be YYYY-MM-DD')
+    
+    cursor = get_db().cursor()
+    rows = sales_report(cursor, dimension, start, end, limit=limit)
+    cursor.close()
+    print(f"Sales by {dimension}, {start} to {end}")
+    for row in rows:
+        print(f"  {row['name']}: {row['orders']} order(s), {row['units']} unit(s), "
+              f"{row['sales']} sales, {row['revenue']} revenue, {row['cancelled_orders']} cancelled")
+
+@app.cli.command('export')
+@click.argument('dataset', type=click.Choice(sorted(EXPORTS)))
+@click.option('--format', 'fmt', type=click.Choice(sorted(FORMATS)), default='csv', help='Output format')
+@click.option('--start', default=None, help='First day to include (YYYY-MM-DD)')
+@click.option('--end', default=None, help='Last day to include (YYYY-MM-DD)')
+@click.option('--output', '-o', type=click.File('wb'), default='-', help='Output file (default: stdout)')
+def export_command(dataset, fmt, start, end, output):
+    """Stream an orders, order-items, customers or products export"""
+    try:
+        start, end = parse_date(start), parse_date(end)
+    except ValueError:
+        raise click.BadParameter('dates must be YYYY-MM-DD')
+    
+    for chunk in export_chunks(get_db(), dataset, fmt, start, end):
+        output.write(chunk)
+
+@app.cli.command('worker')
+@click.option('--processes', type=int, default=int(os.getenv('JOB_WORKER_PROCESSES', 2)), help='Worker processes to run')
+@click.option('--once', is_flag=True, help='Drain the queue in this process and exit')
+def worker_command(processes, once):
+    """Run background job workers"""
+    if once:
+        work(connect_worker_db, JOB_HANDLERS, once=True)
+        return
+    
+    print(f"Starting {processes} job worker(s)")
+    work_pool(connect_worker_db, JOB_HANDLERS, processes,
+              poll_interval=float(os.getenv('JOB_POLL_INTERVAL', 1)))
+
+@app.cli.command('jobs')
+@click.option('--retry-dead', 'retry', is_flag=True, help='Re-queue dead-lettered jobs')
+@click.option('--purge', type=int, default=None, help='Delete finished jobs older than this many days')
+def jobs_command(retry, purge):
+    """Show background job queue depth; optionally retry dead jobs or purge old ones"""
+    db = get_db()
+    cursor = db.cursor()
+    if retry:
+        print(f"Re-queued {retry_dead(cursor)} dead job(s)")
+    if purge is not None:
+        print(f"Purged {purge_done(cursor, purge)} finished job(s)")
+    db.commit()
+    
+    for status, value in queue_stats(cursor).items():
+        print(f"{status}: {value}")
+    cursor.close()
+
+@app.cli.command('import-products')
+@click.argument('source', type=click.File('rb'))
+@click.option('--format', 'fmt', type=click.Choice(IMPORT_FORMATS), default=None,
+              help='Input format (default: from the file extension)')
+@click.option('--chunk-size', type=int, default=500, help='Rows per transaction')
+@click.option('--dry-run', is_flag=True, help='Validate and roll back every chunk')
+def import_products_command(source, fmt, chunk_size, dry_run):
+    """Create and update products from a CSV or NDJSON file ('-' for stdin)"""
+    if fmt is None:
+        fmt = 'ndjson' if source.name.endswith(('.ndjson', '.jsonl')) else 'csv'
+    
+    report = import_products(get_db(), read_rows(source, fmt), chunk_size, dry_run, log=print)
+    for error in report['errors']:
+        print(f"Line {error['line']}: {error['error']}")
+    print(f"{'Dry run: ' if dry_run else ''}{report['rows']} row(s): {report['inserted']} inserted, "
+          f"{report['updated']} updated, {report['failed']} failed")
+    # The CLI runs in its own process; web workers pick the changes up
+    # through the content versions and the search index max age
+
+@app.cli.command('assign-orders')
+@click.option('--dry-run', is_flag=True, help='Show the plan without assigning anything')
+@click.option('--limit', type=int, default=None, help='Only consider this many of the oldest orders')
+def assign_orders_command(dry_run, limit):
+    """Assign unassigned Pending orders to Active riders in one batch"""
+    db = get_db()
+    cursor = db.cursor()
+    orders, riders = load_dispatch_state(cursor, limit)
+    plan = plan_assignments(orders, riders)
+    
+    for rider in plan.riders:
+        if rider.assigned:
+            print(f"Rider {rider.rider_id}: +{len(rider.assigned)} order(s), {rider.load}/{rider.capacity} open")
+    if plan.unassigned:
+        print(f"{len(plan.unassigned)} order(s) left unassigned: every rider is at capacity")
+    
+    if dry_run:
+        print(f"Dry run: would assign {len(plan.assignments)} order(s)")
+    else:
+        assigned = apply_assignments(cursor, plan.assignments)
+        if assigned:
+            enqueue(cursor, 'order.rollup', {'order_ids': [order_id for order_id, _ in plan.assignments]})
+        db.commit()
+        print(f"Assigned {assigned} order(s)")
+    cursor.close()
+
 # =====================================================
 # RUN APPLICATION
 # =====================================================
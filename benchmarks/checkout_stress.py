@@ -0,0 +1,112 @@
+"""Concurrent checkout stress test
+
+Seeds one product with limited stock and a set of customers, then has
+every customer check out concurrently through the Flask test client.
+Verifies that the product is never oversold and reports throughput.
+
+Run against a disposable database (it inserts customers and orders):
+
+    MYSQL_DB=fashion_mart_bench python benchmarks/checkout_stress.py --customers 200 --stock 50
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, get_db  # noqa: E402
+
+
+def seed(stock, customers):
+    """Create the contested product and the customers; returns (product_id, customer_ids)"""
+    tag = uuid.uuid4().hex[:8]
+    with app.app_context():
+        db = get_db()
+        cursor = db.cursor()
+        cursor.execute("""
+            INSERT INTO Product (ProductName, Category, Price, Quantity, Description)
+            VALUES (%s, 'Benchmark', 1000.00, %s, 'Checkout stress test product')
+        """, (f'Stress Product {tag}', stock))
+        product_id = cursor.lastrowid
+
+        customer_ids = []
+        for i in range(customers):
+            cursor.execute("""
+                INSERT INTO Customer (Username, Password, Name, Email, Road, Area, City, District)
+                VALUES (%s, 'x', %s, %s, 'Road 1', 'Dhanmondi', 'Dhaka', 'Dhaka')
+            """, (f'stress_{tag}_{i}', f'Stress {i}', f'stress_{tag}_{i}@example.com'))
+            customer_ids.append(cursor.lastrowid)
+
+        db.commit()
+        cursor.close()
+    return product_id, customer_ids
+
+
+def checkout(customer_id, product_id, quantity, results):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['customer_id'] = customer_id
+
+    response = client.post('/api/cart/add', json={'product_id': product_id, 'quantity': quantity})
+    if response.status_code == 400:
+        # Stock already gone before checkout; the add-to-cart pre-check refused it
+        results.append((409, 0.0))
+        return
+
+    started = time.perf_counter()
+    response = client.post('/api/order/create', json={'payment_method': 'Cash on Delivery'})
+    results.append((response.status_code, time.perf_counter() - started))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--customers', type=int, default=100, help='concurrent checkouts')
+    parser.add_argument('--stock', type=int, default=25, help='units of the contested product')
+    parser.add_argument('--quantity', type=int, default=1, help='units per checkout')
+    args = parser.parse_args()
+
+    product_id, customer_ids = seed(args.stock, args.customers)
+
+    results = []
+    threads = [
+        threading.Thread(target=checkout, args=(customer_id, product_id, args.quantity, results))
+        for customer_id in customer_ids
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        cursor = get_db().cursor()
+        cursor.execute("SELECT Quantity FROM Product WHERE ProductID = %s", (product_id,))
+        remaining = cursor.fetchone()[0]
+        cursor.execute("SELECT COALESCE(SUM(Quantity), 0) FROM OrderItem WHERE ProductID = %s", (product_id,))
+        sold = int(cursor.fetchone()[0])
+        cursor.close()
+
+    succeeded = sum(1 for status, _ in results if status == 200)
+    rejected = sum(1 for status, _ in results if status == 409)
+    errors = len(results) - succeeded - rejected
+    expected = min(args.customers, args.stock // args.quantity)
+    latencies = sorted(latency for status, latency in results if latency)
+
+    print(f"checkouts: {len(results)}  succeeded: {succeeded}  out of stock: {rejected}  errors: {errors}")
+    print(f"stock: {args.stock}  sold: {sold}  remaining: {remaining}")
+    print(f"throughput: {len(results) / elapsed:.1f} checkouts/s over {elapsed:.2f}s")
+    if latencies:
+        print(f"latency p50: {latencies[len(latencies) // 2] * 1000:.1f} ms  "
+              f"max: {latencies[-1] * 1000:.1f} ms")
+
+    ok = remaining >= 0 and sold + remaining == args.stock and succeeded == expected and errors == 0
+    print('PASS: no overselling' if ok else 'FAIL')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
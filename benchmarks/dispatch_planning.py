@@ -0,0 +1,79 @@
+"""Batch rider assignment benchmark
+
+Times dispatch.plan_assignments() on synthetic unassigned orders spread
+over Dhaka-style areas and a fleet of riders with mixed vehicles and
+existing workloads, and reports how evenly the load ends up spread and
+how often orders landed with a rider already working their area. No
+database needed.
+
+    python benchmarks/dispatch_planning.py --orders 1000 --orders 5000 --riders 60
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dispatch  # noqa: E402
+
+AREAS = ['Dhanmondi', 'Gulshan', 'Banani', 'Mirpur', 'Uttara', 'Mohammadpur', 'Motijheel', 'Badda',
+         'Bashundhara', 'Khilgaon', 'Tejgaon', 'Farmgate', 'Lalbagh', 'Rampura', 'Shyamoli', 'Wari']
+DISTRICTS = ['Dhaka', 'Dhaka', 'Dhaka', 'Gazipur', 'Narayanganj']
+
+
+def make_orders(count, rng):
+    orders = []
+    for order_id in range(1, count + 1):
+        address = f"Road {rng.randrange(1, 30)}, {rng.choice(AREAS)}, Dhaka, {rng.choice(DISTRICTS)}. Phone: 017"
+        orders.append((order_id, *dispatch.parse_address(address)))
+    return orders
+
+
+def make_riders(count, rng):
+    vehicles = list(dispatch.VEHICLE_CAPACITY)
+    return [
+        dispatch.Rider(rider_id, rng.choice(vehicles), rng.randrange(0, 6), f"{rng.choice(AREAS)}, Dhaka")
+        for rider_id in range(1, count + 1)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, action='append', help='orders per batch (repeatable)')
+    parser.add_argument('--riders', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for count in args.orders or [1000, 5000]:
+        rng = random.Random(count)
+        orders = make_orders(count, rng)
+        # Planning mutates riders, so every run gets a fresh fleet
+        fleets = [make_riders(args.riders, random.Random(1)) for _ in range(args.repeat)]
+        best = min(timeit.repeat(lambda: dispatch.plan_assignments(orders, fleets.pop()),
+                                 number=1, repeat=args.repeat))
+
+        riders = make_riders(args.riders, random.Random(1))
+        home_areas = {rider.rider_id: set(rider.areas) for rider in riders}
+        plan = dispatch.plan_assignments(orders, riders)
+        ratios = sorted(rider.ratio for rider in riders)
+        area_of = {order_id: area for order_id, area, _ in orders}
+        per_rider_areas = Counter()
+        for order_id, rider_id in plan.assignments:
+            per_rider_areas[rider_id, area_of[order_id]] += 1
+        areas_per_rider = Counter(rider_id for rider_id, _ in per_rider_areas)
+
+        print(f"\n{count} orders, {args.riders} riders")
+        print(f"  plan time (best of {args.repeat})   {best * 1000:8.2f} ms")
+        print(f"  assigned / left unassigned    {len(plan.assignments):>6} / {len(plan.unassigned)}")
+        print(f"  load/capacity min, median, max  {ratios[0]:.2f}, {ratios[len(ratios) // 2]:.2f}, {ratios[-1]:.2f}")
+        print(f"  distinct areas per rider (avg)  {sum(areas_per_rider.values()) / max(1, len(areas_per_rider)):.1f}"
+              f"  (of {len(AREAS)})")
+        at_home = sum(area_of[order_id] in home_areas[rider_id] for order_id, rider_id in plan.assignments)
+        print(f"  orders in the rider's home area {at_home / max(1, len(plan.assignments)):.0%}")
+
+
+if __name__ == '__main__':
+    main()
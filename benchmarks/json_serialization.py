@@ -0,0 +1,92 @@
+"""JSON response serialization benchmark
+
+Compares the previous /api/products path (copy every row to convert
+Decimal columns to float, then jsonify with Flask's default provider)
+against the fastjson provider, with the standard library and with orjson
+when it is installed, plus incremental streaming and gzip. Uses synthetic
+product rows shaped like MySQLdb DictCursor output; no database needed.
+
+    python benchmarks/json_serialization.py --rows 100 --rows 10000
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+import fastjson  # noqa: E402
+
+
+def make_rows(count):
+    created = datetime(2024, 1, 1, 9, 30)
+    return [
+        {
+            'ProductID': i,
+            'ProductName': f'Product {i}',
+            'Category': ('Saree', 'Punjabi', 'Kurti', 'Shirt')[i % 4],
+            'Price': Decimal('1234.50') + i,
+            'Quantity': i % 50,
+            'Demand': i % 7,
+            'Rating': Decimal('4.25'),
+            'Embroidery': 'Hand Embroidered',
+            'Description': 'Beautiful fabric with traditional embroidery work. ' * 2,
+            'ImageURL': f'https://example.com/images/{i}.jpg',
+            'CreatedAt': created + timedelta(minutes=i),
+        }
+        for i in range(count)
+    ]
+
+
+def stdlib_dumps(obj):
+    return json.dumps(obj, default=fastjson.default, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, action='append', help='rows per response (repeatable)')
+    parser.add_argument('--repeat', type=int, default=5, help='timing repetitions (best is reported)')
+    args = parser.parse_args()
+
+    old_app = Flask('old')
+    old_app.json = DefaultJSONProvider(old_app)
+
+    def previous(rows):
+        products = [dict(row, Price=float(row['Price']), Rating=float(row['Rating'])) for row in rows]
+        return old_app.json.dumps(products, separators=(',', ':')).encode()
+
+    candidates = [
+        ('previous (convert loop + default provider)', previous),
+        ('fastjson, stdlib encoder', stdlib_dumps),
+    ]
+    if fastjson.orjson is not None:
+        candidates.append(('fastjson, orjson', fastjson.dumps))
+    candidates.append(('fastjson streamed', lambda rows: b''.join(fastjson.stream_json(iter(rows), 'products'))))
+
+    for count in args.rows or [100, 10000]:
+        rows = make_rows(count)
+        number = max(1, 20000 // count)
+        print(f"\n{count} rows ({number} calls per timing, best of {args.repeat})")
+
+        baseline = None
+        for name, encode in candidates:
+            body = encode(rows)
+            best = min(timeit.repeat(lambda: encode(rows), number=number, repeat=args.repeat)) / number
+            baseline = baseline or best
+            print(f"  {name:<45} {best * 1000:8.2f} ms  {len(body) / 1024:8.1f} KiB  x{baseline / best:.1f}")
+
+        body = fastjson.dumps({'products': rows})
+        best = min(timeit.repeat(lambda: gzip.compress(body, 6), number=number, repeat=args.repeat)) / number
+        print(f"  {'gzip level 6 of the body':<45} {best * 1000:8.2f} ms  "
+              f"{len(gzip.compress(body, 6)) / 1024:8.1f} KiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Co-purchase recommendation benchmark
+
+Times a full recompute of the "customers also bought" lists with
+recommendations.PurchaseMatrix on synthetic baskets, where a few popular
+products and category-like clusters make the co-purchase matrix skewed
+like real sales. Uses NumPy/SciPy when installed; --python forces the
+pure-Python path for comparison. No database needed.
+
+    python benchmarks/recommendations.py --customers 50000 --products 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import recommendations  # noqa: E402
+
+
+def make_pairs(customers, products, rng):
+    """(customer, product) pairs: baskets of 1-8 products, mostly from one cluster"""
+    clusters = [list(range(start, min(start + 50, products + 1))) for start in range(1, products + 1, 50)]
+    popular = list(range(1, max(2, products // 100) + 1))
+    pairs = set()
+    for customer_id in range(1, customers + 1):
+        cluster = rng.choice(clusters)
+        for _ in range(rng.randrange(1, 9)):
+            pool = popular if rng.random() < 0.2 else cluster
+            pairs.add((customer_id, rng.choice(pool)))
+    return sorted(pairs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--customers', type=int, default=20000)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--top-k', type=int, default=recommendations.TOP_K)
+    parser.add_argument('--python', action='store_true', help='ignore NumPy/SciPy even if installed')
+    args = parser.parse_args()
+
+    if args.python:
+        recommendations.sparse = None
+    engine = 'numpy/scipy' if recommendations.sparse is not None else 'pure python'
+
+    pairs = make_pairs(args.customers, args.products, random.Random(5))
+    started = time.perf_counter()
+    matrix = recommendations.PurchaseMatrix(pairs)
+    built = time.perf_counter() - started
+
+    listed = 0
+    started = time.perf_counter()
+    for start in range(0, len(matrix.products), recommendations.BLOCK_PRODUCTS):
+        block = matrix.products[start:start + recommendations.BLOCK_PRODUCTS]
+        listed += sum(len(items) for items in matrix.neighbours(block, args.top_k).values())
+    computed = time.perf_counter() - started
+
+    print(f"\n{args.customers} customers, {len(matrix.products)} products, {len(pairs)} purchases ({engine})")
+    print(f"  build matrix                {built * 1000:10.1f} ms")
+    print(f"  top-{args.top_k} for every product    {computed * 1000:10.1f} ms")
+    print(f"  neighbour rows              {listed:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+"""Route-level load and latency benchmark
+
+Seeds a catalog, customers, riders and order history, then drives mixed
+traffic through the Flask test client from concurrent threads: catalog
+browsing, product pages, cart + checkout, rider status updates and admin
+dashboards. Reports throughput and p50/p95/p99 latency per route and saves
+the results as JSON, so two commits can be compared.
+
+Run against a disposable database (it inserts rows and places orders):
+
+    MYSQL_DB=fashion_mart_bench python benchmarks/route_load.py --clients 16 --duration 30
+    python benchmarks/route_load.py --compare benchmarks/results/<earlier>.json ...
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, get_db  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+CATEGORIES = ['Saree', 'Punjabi', 'Kurti', 'Shirt', 'Lehenga', 'Panjabi Set']
+WORDS = ['silk', 'cotton', 'embroidered', 'festive', 'classic', 'printed', 'linen', 'designer']
+
+
+def seed(products, customers, riders, orders, seed_value):
+    """Insert benchmark rows; returns the ids the traffic mix needs"""
+    rng = random.Random(seed_value)
+    tag = uuid.uuid4().hex[:8]
+    with app.app_context():
+        db = get_db()
+        cursor = db.cursor()
+
+        cursor.execute("SELECT COALESCE(MAX(ProductID), 0) FROM Product")
+        first_product = cursor.fetchone()[0] + 1
+        cursor.executemany("""
+            INSERT INTO Product (ProductName, Category, Price, Quantity, Embroidery, Description)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, [
+            (f"{' '.join(rng.sample(WORDS, 2)).title()} {rng.choice(CATEGORIES)} {tag}-{i}",
+             rng.choice(CATEGORIES), rng.randrange(500, 9000), 10 ** 6, 'Machine Embroidered',
+             f"Benchmark product {i}: {' '.join(rng.sample(WORDS, 4))}")
+            for i in range(products)
+        ])
+        cursor.execute("SELECT ProductID FROM Product WHERE ProductID >= %s", (first_product,))
+        product_ids = [row[0] for row in cursor.fetchall()]
+
+        cursor.executemany("""
+            INSERT INTO Customer (Username, Password, Name, Email, Road, Area, City, District)
+            VALUES (%s, 'x', %s, %s, 'Road 1', 'Dhanmondi', 'Dhaka', 'Dhaka')
+        """, [(f'load_{tag}_{i}', f'Load {i}', f'load_{tag}_{i}@example.com') for i in range(customers)])
+        cursor.execute("SELECT CustomerID FROM Customer WHERE Username LIKE %s", (f'load_{tag}_%',))
+        customer_ids = [row[0] for row in cursor.fetchall()]
+
+        cursor.executemany("""
+            INSERT INTO DeliveryMan (Username, Password, Name, Email, Phone)
+            VALUES (%s, 'x', %s, %s, '01700000000')
+        """, [(f'rider_{tag}_{i}', f'Rider {i}', f'rider_{tag}_{i}@example.com') for i in range(riders)])
+        cursor.execute("SELECT DeliveryManID FROM DeliveryMan WHERE Username LIKE %s", (f'rider_{tag}_%',))
+        rider_ids = [row[0] for row in cursor.fetchall()]
+
+        # Order history, each order assigned to a rider
+        assignments = defaultdict(list)
+        for _ in range(orders):
+            rider_id = rng.choice(rider_ids)
+            cursor.execute("""
+                INSERT INTO `Order` (CustomerID, DeliveryManID, TotalAmount, OrderStatus, DeliveryAddress)
+                VALUES (%s, %s, %s, 'Pending', 'Road 1, Dhanmondi, Dhaka')
+            """, (rng.choice(customer_ids), rider_id, rng.randrange(500, 20000)))
+            order_id = cursor.lastrowid
+            lines = rng.sample(product_ids, min(3, len(product_ids)))
+            cursor.executemany("""
+                INSERT INTO OrderItem (OrderID, ProductID, Quantity, Price) VALUES (%s, %s, 1, 1000)
+            """, [(order_id, product_id) for product_id in lines])
+            assignments[rider_id].append(order_id)
+
+        db.commit()
+        cursor.close()
+
+    return {
+        'product_ids': product_ids,
+        'customer_ids': customer_ids,
+        'assignments': {rider_id: ids for rider_id, ids in assignments.items() if ids},
+    }
+
+
+def client_for(role, ident):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        if role == 'customer':
+            session['customer_id'] = ident
+            session['name'] = 'Load'
+        elif role == 'rider':
+            session['delivery_man_id'] = ident
+            session['delivery_man_name'] = 'Rider'
+        elif role == 'admin':
+            session['admin_id'] = 1
+            session['admin_name'] = 'Load Admin'
+            session['admin_role'] = 'Admin'
+    return client
+
+
+# Each action returns (route label, response); labels are URL rules so
+# every product id shares one row in the report
+
+def browse_products(client, data, rng):
+    args = rng.choice([{}, {'category': rng.choice(CATEGORIES)}, {'search': rng.choice(WORDS)}])
+    response = client.get('/products', query_string=args)
+    return '/products', response
+
+
+def api_products(client, data, rng):
+    return '/api/products', client.get('/api/products', query_string={'limit': 50})
+
+
+def view_product(client, data, rng):
+    return '/product/<id>', client.get(f"/product/{rng.choice(data['product_ids'])}")
+
+
+def product_reviews(client, data, rng):
+    return '/api/reviews/<id>', client.get(f"/api/reviews/{rng.choice(data['product_ids'])}")
+
+
+def checkout(client, data, rng):
+    response = client.post('/api/cart/add', json={'product_id': rng.choice(data['product_ids']), 'quantity': 1})
+    if response.status_code != 200:
+        return '/api/cart/add', response
+    return '/api/order/create', client.post('/api/order/create', json={'payment_method': 'Cash on Delivery'})
+
+
+def add_to_cart(client, data, rng):
+    return '/api/cart/add', client.post('/api/cart/add', json={'product_id': rng.choice(data['product_ids']), 'quantity': 1})
+
+
+def rider_update(client, data, rng):
+    order_id = rng.choice(data['assignments'][client.ident])
+    return '/delivery/api/update-order-status', client.post(
+        '/delivery/api/update-order-status', json={'order_id': order_id, 'order_status': 'Out for Delivery'})
+
+
+def rider_dashboard(client, data, rng):
+    return '/delivery/dashboard', client.get('/delivery/dashboard')
+
+
+def admin_page(client, data, rng):
+    path = rng.choice(['/admin/dashboard', '/admin/orders', '/admin/customers', '/admin/products'])
+    return path, client.get(path)
+
+
+# role -> (share of clients, [(action, weight)])
+TRAFFIC_MIX = {
+    'anonymous': (0.45, [(browse_products, 4), (view_product, 5), (api_products, 2), (product_reviews, 2)]),
+    'customer': (0.35, [(browse_products, 3), (view_product, 4), (add_to_cart, 2), (checkout, 1)]),
+    'rider': (0.10, [(rider_dashboard, 1), (rider_update, 2)]),
+    'admin': (0.10, [(admin_page, 1)]),
+}
+
+
+def make_clients(count, data, rng):
+    # One client per role first, so small runs still cover every route
+    roles = list(TRAFFIC_MIX)[:count]
+    for role, (share, _) in TRAFFIC_MIX.items():
+        roles += [role] * max(0, round(count * share) - 1)
+    roles = roles[:count]
+
+    clients = []
+    for role in roles:
+        if role == 'customer':
+            ident = rng.choice(data['customer_ids'])
+        elif role == 'rider':
+            ident = rng.choice(list(data['assignments']))
+        else:
+            ident = None
+        client = client_for(role, ident)
+        client.role, client.ident = role, ident
+        clients.append(client)
+    return clients
+
+
+def run_client(client, data, deadline, seed_value, samples):
+    rng = random.Random(seed_value)
+    actions, weights = zip(*TRAFFIC_MIX[client.role][1])
+    while time.perf_counter() < deadline:
+        action = rng.choices(actions, weights)[0]
+        started = time.perf_counter()
+        try:
+            route, response = action(client, data, rng)
+            status = response.status_code
+            response.close()
+        except Exception:
+            route, status = action.__name__, 'exception'
+        samples.append((route, status, time.perf_counter() - started))
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    by_route = defaultdict(list)
+    errors = defaultdict(int)
+    for route, status, latency in samples:
+        by_route[route].append(latency)
+        if status == 'exception' or status >= 500:
+            errors[route] += 1
+
+    routes = {}
+    for route, latencies in sorted(by_route.items()):
+        latencies.sort()
+        routes[route] = {
+            'requests': len(latencies),
+            'errors': errors[route],
+            'throughput': len(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'max_ms': latencies[-1] * 1000,
+        }
+    total = sorted(latency for _, _, latency in samples)
+    return routes, {
+        'requests': len(samples),
+        'errors': sum(errors.values()),
+        'throughput': len(samples) / elapsed,
+        'p50_ms': percentile(total, 0.50) * 1000,
+        'p95_ms': percentile(total, 0.95) * 1000,
+        'p99_ms': percentile(total, 0.99) * 1000,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_report(routes, total, baseline=None):
+    header = f"{'route':<36} {'reqs':>7} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    if baseline:
+        header += f" {'p95 vs base':>12}"
+    print(header)
+    for route, row in list(routes.items()) + [('TOTAL', total)]:
+        line = (f"{route:<36} {row['requests']:>7} {row['errors']:>5} {row['throughput']:>8.1f} "
+                f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f}")
+        if baseline:
+            base = baseline['total'] if route == 'TOTAL' else baseline['routes'].get(route)
+            if base and base['p95_ms']:
+                line += f" {(row['p95_ms'] / base['p95_ms'] - 1) * 100:>+11.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of measured traffic')
+    parser.add_argument('--warmup', type=float, default=3, help='seconds of unmeasured traffic first')
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--customers', type=int, default=200)
+    parser.add_argument('--riders', type=int, default=10)
+    parser.add_argument('--orders', type=int, default=2000, help='orders of history to seed')
+    parser.add_argument('--seed', type=int, default=42, help='random seed for data and traffic')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/route_load-<commit>-<time>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare p95 latency against')
+    args = parser.parse_args()
+    if args.duration <= 0:
+        parser.error('--duration must be greater than 0')
+    if args.warmup < 0:
+        parser.error('--warmup must not be negative')
+
+    print(f"Seeding {args.products} products, {args.customers} customers, {args.riders} riders, "
+          f"{args.orders} orders")
+    data = seed(args.products, args.customers, args.riders, args.orders, args.seed)
+    clients = make_clients(args.clients, data, random.Random(args.seed))
+
+    samples = []
+    for phase, seconds in (('warmup', args.warmup), ('measure', args.duration)):
+        if not seconds:
+            continue
+        samples = []
+        deadline = time.perf_counter() + seconds
+        threads = [
+            threading.Thread(target=run_client, args=(client, data, deadline, args.seed + i, samples))
+            for i, client in enumerate(clients)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+    routes, total = summarize(samples, elapsed)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(routes, total, baseline)
+
+    commit = git_commit()
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"route_load-{commit}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'commit': commit,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'args': vars(args),
+            'elapsed_s': elapsed,
+            'routes': routes,
+            'total': total,
+        }, f, indent=2)
+    print(f"\nResults saved to {output}")
+    sys.exit(1 if total['errors'] else 0)
+
+
+if __name__ == '__main__':
+    main()
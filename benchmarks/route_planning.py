@@ -0,0 +1,102 @@
+"""Rider route planning benchmark
+
+Times routing.plan_route() for riders holding 100+ open orders spread over
+a synthetic city: a grid of areas where neighbouring areas are 5-15
+minutes apart, split over a few districts. Compares the planned travel
+time with visiting areas in order-date order (what the dashboard list
+implies) and reports the cost of a cached lookup. No database needed.
+
+    python benchmarks/route_planning.py --stops 100 --stops 500 --areas 64
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import routing  # noqa: E402
+from cache import TTLCache  # noqa: E402
+from dispatch import order_location  # noqa: E402
+
+
+def make_city(area_count, rng):
+    """Grid adjacency edges and the (area, district) of every area"""
+    side = math.ceil(math.sqrt(area_count))
+    areas = [f'Area {i}' for i in range(area_count)]
+    districts = {area: f'District {(i % side) * 2 // side}' for i, area in enumerate(areas)}
+    edges = []
+    for i, area in enumerate(areas):
+        row, col = divmod(i, side)
+        for neighbour in (i + 1 if col + 1 < side else None, i + side):
+            if neighbour is not None and neighbour < area_count:
+                edges.append((area, areas[neighbour], rng.randrange(5, 16)))
+    return edges, areas, districts
+
+
+def make_orders(count, areas, districts, rng):
+    orders = []
+    for order_id in range(1, count + 1):
+        area = rng.choice(areas)
+        orders.append({
+            'OrderID': order_id,
+            'OrderStatus': 'Pending',
+            'TotalAmount': 1000,
+            'PaymentMethod': 'Cash on Delivery',
+            'PaymentStatus': 'Pending',
+            'DeliveryAddress': f"Road {rng.randrange(1, 40)}, {area}, Dhaka, {districts[area]}. Phone: 017",
+            'Name': f'Customer {order_id}',
+            'Number': '017',
+            'Road': None, 'Area': area, 'City': 'Dhaka', 'District': districts[area],
+        })
+    return orders
+
+
+def date_order_minutes(orders, home, graph):
+    total = 0
+    previous = home
+    for order in orders:
+        location = order_location(order['DeliveryAddress'], order['Area'], order['District'])
+        total += graph.minutes(previous, location)
+        previous = location
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--stops', type=int, action='append', help='open orders per rider (repeatable)')
+    parser.add_argument('--areas', type=int, default=64)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    edges, areas, districts = make_city(args.areas, rng)
+    home = order_location(f'{areas[0]}, {districts[areas[0]]}', None, None)
+
+    for count in args.stops or [100, 250, 500]:
+        orders = make_orders(count, areas, districts, rng)
+        # A fresh graph each run, so shortest paths are not reused between timings
+        best = min(timeit.repeat(lambda: routing.plan_route(orders, home, routing.AreaGraph(edges)),
+                                 number=1, repeat=args.repeat))
+
+        graph = routing.AreaGraph(edges)
+        plan = routing.plan_route(orders, home, graph)
+        unplanned = date_order_minutes(orders, home, graph)
+
+        cache = TTLCache()
+        key = ('route', 1, home, tuple((order['OrderID'], order['OrderStatus']) for order in orders))
+        cache.set(key, plan)
+        cached = min(timeit.repeat(lambda: cache.get(key), number=1000, repeat=args.repeat)) / 1000
+
+        print(f"\n{count} open orders, {args.areas} areas")
+        print(f"  plan time (best of {args.repeat})       {best * 1000:8.2f} ms")
+        print(f"  cached plan lookup           {cached * 1e6:8.2f} us  (key over {count} orders)")
+        print(f"  stops (areas visited)        {len(plan['stops']):>8}")
+        print(f"  travel minutes, planned      {plan['total_minutes']:>8}")
+        print(f"  travel minutes, date order   {unplanned:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe in-process cache bounded by entry age and entry count
+
+    Entries can carry tags so that a write can invalidate exactly the
+    entries that depend on it (for example every listing that contains a
+    given product) without flushing the whole cache.
+    """
+
+    def __init__(self, ttl=60, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tags = {}  # tag -> set of keys
+        self._generation = 0  # bumped by every invalidation
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """Return a live cached value, or `default` on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, tags=(), ttl=None):
+        """Store a value, evicting the least recently used entries when full"""
+        with self._lock:
+            self._store(key, value, tags, ttl)
+
+    def get_or_load(self, key, loader, tags=None):
+        """Return the cached value for `key`, calling `loader()` on a miss
+
+        `tags` may be a callable that derives the tags from the loaded value.
+        If anything is invalidated while the loader runs, its value may
+        predate that write: it is returned but not cached.
+        """
+        missing = object()
+        with self._lock:
+            generation = self._generation
+        value = self.get(key, missing)
+        if value is missing:
+            value = loader()
+            entry_tags = tags(value) if callable(tags) else (tags or ())
+            with self._lock:
+                if self._generation == generation:
+                    self._store(key, value, entry_tags)
+        return value
+
+    def delete(self, key):
+        with self._lock:
+            self._generation += 1
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate(self, *tags):
+        """Drop every entry carrying any of the given tags"""
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+
+    def invalidate_prefix(self, prefix):
+        """Drop every entry carrying a tag that starts with `prefix`"""
+        with self._lock:
+            self._generation += 1
+            for tag in [tag for tag in self._tags if tag.startswith(prefix)]:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _store(self, key, value, tags=(), ttl=None):
+        # Caller must hold the lock
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        tags = frozenset(tags)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (expires_at, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        # Caller must hold the lock
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
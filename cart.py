@@ -0,0 +1,97 @@
+def _touch(cursor, customer_id):
+    # Create the cart or refresh its last-activity time
+    cursor.execute("""
+        INSERT INTO Cart (CustomerID) VALUES (%s)
+        ON DUPLICATE KEY UPDATE UpdatedAt = CURRENT_TIMESTAMP
+    """, (customer_id,))
+
+
+def add_item(cursor, customer_id, product_id, quantity):
+    """Add `quantity` units of a product, on top of any already in the cart"""
+    _touch(cursor, customer_id)
+    cursor.execute("""
+        INSERT INTO CartItem (CustomerID, ProductID, Quantity)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE Quantity = Quantity + VALUES(Quantity)
+    """, (customer_id, product_id, quantity))
+
+
+def set_quantity(cursor, customer_id, product_id, quantity):
+    """Set a line's quantity (removing it if <= 0); False if it was not in the cart"""
+    if quantity <= 0:
+        return remove_item(cursor, customer_id, product_id)
+
+    cursor.execute("""
+        SELECT 1 FROM CartItem WHERE CustomerID = %s AND ProductID = %s
+    """, (customer_id, product_id))
+    if cursor.fetchone() is None:
+        return False
+
+    _touch(cursor, customer_id)
+    cursor.execute("""
+        UPDATE CartItem SET Quantity = %s
+        WHERE CustomerID = %s AND ProductID = %s
+    """, (quantity, customer_id, product_id))
+    return True
+
+
+def remove_item(cursor, customer_id, product_id):
+    """Remove a line; False if it was not in the cart"""
+    cursor.execute("""
+        DELETE FROM CartItem WHERE CustomerID = %s AND ProductID = %s
+    """, (customer_id, product_id))
+    if cursor.rowcount == 0:
+        return False
+    _touch(cursor, customer_id)
+    return True
+
+
+def get_lines(cursor, customer_id):
+    """Compact cart contents: {product_id: quantity}"""
+    cursor.execute("""
+        SELECT ProductID, Quantity FROM CartItem WHERE CustomerID = %s
+    """, (customer_id,))
+    return {row[0]: row[1] for row in cursor.fetchall()}
+
+
+def count_items(cursor, customer_id):
+    """Number of distinct products in the cart (an index-only range count)"""
+    cursor.execute("SELECT COUNT(*) FROM CartItem WHERE CustomerID = %s", (customer_id,))
+    return cursor.fetchone()[0]
+
+
+def get_cart(cursor, customer_id):
+    """Cart lines with display fields, hydrated in a single join
+
+    Same shape the cart pages have always used:
+    {"<product_id>": {product_id, name, price, quantity, image}}
+    """
+    cursor.execute("""
+        SELECT ci.ProductID, ci.Quantity, p.ProductName, p.Price, p.ImageURL
+        FROM CartItem ci
+        JOIN Product p ON ci.ProductID = p.ProductID
+        WHERE ci.CustomerID = %s
+        ORDER BY ci.ProductID
+    """, (customer_id,))
+    return {
+        str(row[0]): {
+            'product_id': row[0],
+            'name': row[2],
+            'price': float(row[3]),
+            'quantity': row[1],
+            'image': row[4]
+        }
+        for row in cursor.fetchall()
+    }
+
+
+def clear_cart(cursor, customer_id):
+    cursor.execute("DELETE FROM Cart WHERE CustomerID = %s", (customer_id,))
+
+
+def expire_carts(cursor, max_age_days):
+    """Delete carts untouched for `max_age_days`; returns how many were removed"""
+    cursor.execute("""
+        DELETE FROM Cart WHERE UpdatedAt < NOW() - INTERVAL %s DAY
+    """, (max_age_days,))
+    return cursor.rowcount
@@ -1,5 +1,11 @@
 import MySQLdb
 
+try:
+    from database.migrate import apply_migrations
+except ImportError:
+    # Run as a script: python database/db_config.py
+    from migrate import apply_migrations
+
 def get_db_connection():
     """Create and return a database connection"""
     connection = MySQLdb.connect(
@@ -35,6 +41,9 @@ def init_db():
         
         connection.commit()
         cursor.close()
+        
+        # Bring the fresh schema up to the latest migration (indexes etc.)
+        apply_migrations(connection)
         connection.close()
         
         print("Database initialized successfully!")
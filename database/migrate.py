@@ -0,0 +1,184 @@
+import hashlib
+import os
+import re
+
+import MySQLdb
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+MIGRATION_FILE_RE = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+# MySQL errors meaning a statement already took effect (duplicate table or
+# column). Tolerating them lets a migration that failed half-way be re-run,
+# since DDL cannot be rolled back. Duplicate indexes (1061) are not among
+# them: an ALTER adding several indexes fails as a whole on the first one
+# that exists, so existing indexes are left out of the statement instead
+# (see without_existing_indexes).
+ALREADY_APPLIED_ERRORS = {1050, 1060}
+
+ALTER_TABLE_RE = re.compile(r'^ALTER\s+TABLE\s+`?(\w+)`?\s+(.*)$', re.IGNORECASE | re.DOTALL)
+ADD_INDEX_RE = re.compile(r'^ADD\s+(?:UNIQUE\s+)?(?:INDEX|KEY)\s+`?(\w+)`?', re.IGNORECASE)
+ALTER_OPTION_RE = re.compile(r'^(?:ALGORITHM|LOCK)\s*=', re.IGNORECASE)
+
+
+class Migration:
+    """One numbered .sql file in the migrations directory"""
+
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+
+    @property
+    def sql(self):
+        with open(self.path, 'r') as f:
+            return f.read()
+
+    @property
+    def checksum(self):
+        return hashlib.sha256(self.sql.encode()).hexdigest()
+
+    def statements(self):
+        """Split the file into statements, dropping comment lines"""
+        lines = [line for line in self.sql.splitlines() if not line.strip().startswith('--')]
+        return [statement.strip() for statement in '\n'.join(lines).split(';') if statement.strip()]
+
+
+def split_clauses(text):
+    """Split the clauses of an ALTER TABLE on commas outside parentheses"""
+    clauses, depth, start = [], 0, 0
+    for position, char in enumerate(text):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            clauses.append(text[start:position].strip())
+            start = position + 1
+    clauses.append(text[start:].strip())
+    return [clause for clause in clauses if clause]
+
+
+def existing_indexes(cursor, table):
+    cursor.execute("""
+        SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    return {row[0].lower() for row in cursor.fetchall()}
+
+
+def without_existing_indexes(cursor, statement):
+    """`statement` minus ADD INDEX clauses for indexes that already exist
+
+    Returns (statement or None if nothing is left to do, skipped index names).
+    """
+    match = ALTER_TABLE_RE.match(statement)
+    if not match:
+        return statement, []
+    table, clauses = match.group(1), split_clauses(match.group(2))
+    added = [ADD_INDEX_RE.match(clause) for clause in clauses]
+    if not any(added):
+        return statement, []
+
+    existing = existing_indexes(cursor, table)
+    skipped = [index.group(1) for index in added if index and index.group(1).lower() in existing]
+    if not skipped:
+        return statement, []
+    kept = [clause for clause, index in zip(clauses, added) if not (index and index.group(1).lower() in existing)]
+    if all(ALTER_OPTION_RE.match(clause) for clause in kept):
+        return None, skipped
+    return f"ALTER TABLE `{table}` {', '.join(kept)}", skipped
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """All migrations in the directory, ordered by version"""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = MIGRATION_FILE_RE.match(filename)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    migrations.sort(key=lambda migration: migration.version)
+
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError('Duplicate migration version numbers in ' + directory)
+    return migrations
+
+
+def ensure_migration_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS SchemaMigration (
+            Version INT PRIMARY KEY,
+            Name VARCHAR(100) NOT NULL,
+            Checksum CHAR(64) NOT NULL,
+            AppliedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def applied_migrations(cursor):
+    """Map of applied version -> checksum recorded when it ran"""
+    ensure_migration_table(cursor)
+    cursor.execute("SELECT Version, Checksum FROM SchemaMigration")
+    return {row[0]: row[1] for row in cursor.fetchall()}
+
+
+def migration_status(connection, directory=MIGRATIONS_DIR):
+    """(migration, state) pairs where state is 'applied', 'pending' or 'modified'"""
+    cursor = connection.cursor()
+    applied = applied_migrations(cursor)
+    cursor.close()
+
+    status = []
+    for migration in load_migrations(directory):
+        if migration.version not in applied:
+            state = 'pending'
+        elif applied[migration.version] != migration.checksum:
+            state = 'modified'
+        else:
+            state = 'applied'
+        status.append((migration, state))
+    return status
+
+
+def apply_migrations(connection, directory=MIGRATIONS_DIR, log=print):
+    """Apply pending migrations in version order; returns the versions applied
+
+    Migrations are forward-only: there is no rollback, a fix is a new
+    migration. Each one is recorded as soon as all its statements succeed.
+    """
+    cursor = connection.cursor()
+    applied = applied_migrations(cursor)
+    connection.commit()
+
+    newly_applied = []
+    for migration in load_migrations(directory):
+        if migration.version in applied:
+            if applied[migration.version] != migration.checksum:
+                log(f"Warning: migration {migration.version:04d}_{migration.name} changed after it was applied")
+            continue
+
+        log(f"Applying {migration.version:04d}_{migration.name}")
+        for statement in migration.statements():
+            statement, skipped = without_existing_indexes(cursor, statement)
+            for index in skipped:
+                log(f"  skipped index {index} (already exists)")
+            if statement is None:
+                continue
+            try:
+                cursor.execute(statement)
+            except MySQLdb.DatabaseError as e:
+                if e.args and e.args[0] in ALREADY_APPLIED_ERRORS:
+                    log(f"  skipped (already applied): {e.args[-1]}")
+                    continue
+                raise
+
+        cursor.execute("""
+            INSERT INTO SchemaMigration (Version, Name, Checksum)
+            VALUES (%s, %s, %s)
+        """, (migration.version, migration.name, migration.checksum))
+        connection.commit()
+        newly_applied.append(migration.version)
+
+    cursor.close()
+    return newly_applied
@@ -0,0 +1,12 @@
+-- Dashboard counters (see stats.py); already present in databases created from schema.sql
+CREATE TABLE IF NOT EXISTS StoreStats (
+    StatsID TINYINT PRIMARY KEY,
+    Customers INT NOT NULL DEFAULT 0,
+    Products INT NOT NULL DEFAULT 0,
+    Orders INT NOT NULL DEFAULT 0,
+    ActiveDeliveryMen INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    ReconciledAt TIMESTAMP NULL DEFAULT NULL
+);
+
+INSERT IGNORE INTO StoreStats (StatsID) VALUES (1);
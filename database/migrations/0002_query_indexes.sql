@@ -0,0 +1,34 @@
+-- Composite indexes matched to the queries in app.py. Each ALTER builds
+-- its indexes in place without blocking reads or writes on the table.
+
+-- Orders: my_orders (CustomerID, keyset on OrderDate/OrderID), delivery
+-- dashboards (DeliveryManID by OrderDate), admin_orders / recent orders
+-- (keyset on OrderDate/OrderID) and completed-revenue sums (covering)
+ALTER TABLE `Order`
+    ADD INDEX idx_order_customer_date (CustomerID, OrderDate, OrderID),
+    ADD INDEX idx_order_deliveryman_date (DeliveryManID, OrderDate, OrderID),
+    ADD INDEX idx_order_date (OrderDate, OrderID),
+    ADD INDEX idx_order_status_amount (OrderStatus, TotalAmount),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+-- Reviews: per-product listing newest first, and the one-review-per-customer check
+ALTER TABLE Review
+    ADD INDEX idx_review_product_date (ProductID, ReviewDate, ReviewID),
+    ADD INDEX idx_review_customer_product (CustomerID, ProductID),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+-- Products: category listings and the unfiltered listing, both keyset on (ProductName, ProductID)
+ALTER TABLE Product
+    ADD INDEX idx_product_category_name (Category, ProductName, ProductID),
+    ADD INDEX idx_product_name (ProductName, ProductID),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+-- Customers: admin_customers keyset on (CreatedAt, CustomerID)
+ALTER TABLE Customer
+    ADD INDEX idx_customer_created (CreatedAt, CustomerID),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+-- Delivery men: active riders by name (admin_orders assignment list, login)
+ALTER TABLE DeliveryMan
+    ADD INDEX idx_deliveryman_status_name (Status, Name),
+    ALGORITHM=INPLACE, LOCK=NONE;
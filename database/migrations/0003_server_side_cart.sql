@@ -0,0 +1,17 @@
+-- Server-side carts (see cart.py). Cart holds one row per customer with an
+-- active cart so abandoned carts can be expired by age; items cascade.
+CREATE TABLE IF NOT EXISTS Cart (
+    CustomerID INT PRIMARY KEY,
+    UpdatedAt TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_cart_updated (UpdatedAt),
+    FOREIGN KEY (CustomerID) REFERENCES Customer(CustomerID) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS CartItem (
+    CustomerID INT NOT NULL,
+    ProductID INT NOT NULL,
+    Quantity INT NOT NULL,
+    PRIMARY KEY (CustomerID, ProductID),
+    FOREIGN KEY (CustomerID) REFERENCES Cart(CustomerID) ON DELETE CASCADE,
+    FOREIGN KEY (ProductID) REFERENCES Product(ProductID) ON DELETE CASCADE
+);
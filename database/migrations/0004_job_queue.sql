@@ -0,0 +1,18 @@
+-- Durable outbox for work that runs after a request commits (see jobs.py).
+-- Jobs are enqueued in the same transaction as the write that causes them.
+CREATE TABLE IF NOT EXISTS Job (
+    JobID BIGINT PRIMARY KEY AUTO_INCREMENT,
+    Kind VARCHAR(50) NOT NULL,
+    Payload TEXT NOT NULL,
+    Status ENUM('Pending', 'Running', 'Done', 'Dead') NOT NULL DEFAULT 'Pending',
+    Attempts INT NOT NULL DEFAULT 0,
+    MaxAttempts INT NOT NULL DEFAULT 5,
+    RunAt DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    LockedBy VARCHAR(100),
+    LockedAt DATETIME,
+    LastError TEXT,
+    CreatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CompletedAt DATETIME,
+    INDEX idx_job_queue (Status, RunAt, JobID),
+    INDEX idx_job_locked (Status, LockedAt)
+);
@@ -0,0 +1,25 @@
+-- Per-product rating aggregates maintained on every review write (see ratings.py).
+-- The existing reviews are folded in once here; `flask backfill-ratings` recomputes
+-- them in batches if they ever drift (e.g. after customers are deleted).
+CREATE TABLE IF NOT EXISTS ProductRating (
+    ProductID INT PRIMARY KEY,
+    RatingSum INT NOT NULL DEFAULT 0,
+    RatingCount INT NOT NULL DEFAULT 0,
+    Stars1 INT NOT NULL DEFAULT 0,
+    Stars2 INT NOT NULL DEFAULT 0,
+    Stars3 INT NOT NULL DEFAULT 0,
+    Stars4 INT NOT NULL DEFAULT 0,
+    Stars5 INT NOT NULL DEFAULT 0,
+    UpdatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (ProductID) REFERENCES Product(ProductID) ON DELETE CASCADE
+);
+
+INSERT IGNORE INTO ProductRating (ProductID, RatingSum, RatingCount, Stars1, Stars2, Stars3, Stars4, Stars5)
+SELECT ProductID, SUM(Rating), COUNT(*),
+       SUM(Rating = 1), SUM(Rating = 2), SUM(Rating = 3), SUM(Rating = 4), SUM(Rating = 5)
+FROM Review
+GROUP BY ProductID;
+
+UPDATE Product p
+JOIN ProductRating pr ON p.ProductID = pr.ProductID
+SET p.Rating = CASE WHEN pr.RatingCount > 0 THEN ROUND(pr.RatingSum / pr.RatingCount, 2) ELSE 0 END;
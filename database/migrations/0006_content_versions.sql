@@ -0,0 +1,9 @@
+-- Change counters behind the HTTP validators (ETag / Last-Modified, see validators.py).
+-- Scope is 'catalog' or 'product:<ProductID>'; a missing row means version 0.
+CREATE TABLE IF NOT EXISTS ContentVersion (
+    Scope VARCHAR(64) PRIMARY KEY,
+    Version BIGINT NOT NULL DEFAULT 0,
+    ModifiedAt TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT IGNORE INTO ContentVersion (Scope, Version) VALUES ('catalog', 1);
@@ -0,0 +1,46 @@
+-- Travel time between neighbouring delivery areas, used to order the stops of a
+-- rider's run (see routing.py). One row per pair, in either direction; pairs
+-- that are not neighbours are reached through the shortest chain of rows.
+-- Edit the rows to match the areas served; plans pick changes up within
+-- ROUTE_CACHE_TTL seconds.
+CREATE TABLE IF NOT EXISTS AreaAdjacency (
+    AreaA VARCHAR(100) NOT NULL,
+    AreaB VARCHAR(100) NOT NULL,
+    Minutes INT NOT NULL,
+    PRIMARY KEY (AreaA, AreaB)
+);
+
+INSERT IGNORE INTO AreaAdjacency (AreaA, AreaB, Minutes) VALUES
+('Dhanmondi', 'Mohammadpur', 10),
+('Dhanmondi', 'New Market', 8),
+('Dhanmondi', 'Farmgate', 12),
+('Dhanmondi', 'Lalbagh', 15),
+('New Market', 'Azimpur', 5),
+('Azimpur', 'Lalbagh', 6),
+('Lalbagh', 'Wari', 15),
+('Wari', 'Motijheel', 10),
+('Motijheel', 'Khilgaon', 12),
+('Motijheel', 'Farmgate', 15),
+('Khilgaon', 'Rampura', 10),
+('Rampura', 'Badda', 10),
+('Badda', 'Gulshan', 12),
+('Badda', 'Bashundhara', 12),
+('Gulshan', 'Banani', 6),
+('Gulshan', 'Baridhara', 8),
+('Baridhara', 'Bashundhara', 10),
+('Banani', 'Mohakhali', 8),
+('Mohakhali', 'Tejgaon', 8),
+('Tejgaon', 'Farmgate', 6),
+('Farmgate', 'Agargaon', 10),
+('Mohammadpur', 'Shyamoli', 8),
+('Shyamoli', 'Agargaon', 8),
+('Shyamoli', 'Kallyanpur', 6),
+('Kallyanpur', 'Mirpur', 10),
+('Agargaon', 'Mirpur', 12),
+('Mirpur', 'Pallabi', 8),
+('Mirpur', 'Kafrul', 10),
+('Kafrul', 'Banani', 12),
+('Pallabi', 'Uttara', 20),
+('Banani', 'Khilkhet', 15),
+('Khilkhet', 'Uttara', 12),
+('Bashundhara', 'Khilkhet', 10);
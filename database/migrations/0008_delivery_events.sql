@@ -0,0 +1,17 @@
+-- Status and payment events synced from the delivery dashboard (see
+-- delivery_sync.py). EventID is generated by the rider's device, so a batch
+-- that is sent again after a dropped response is recognised and not applied
+-- twice. OccurredAt is when the rider tapped the button, not when it synced.
+CREATE TABLE IF NOT EXISTS DeliveryEvent (
+    DeliveryManID INT NOT NULL,
+    EventID VARCHAR(64) NOT NULL,
+    OrderID INT NOT NULL,
+    Kind ENUM('status', 'payment') NOT NULL,
+    Value VARCHAR(20) NOT NULL,
+    OccurredAt DATETIME(3) NOT NULL,
+    Result VARCHAR(20) NOT NULL,
+    SyncedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (DeliveryManID, EventID),
+    INDEX idx_delivery_event_order (OrderID, Kind, OccurredAt),
+    FOREIGN KEY (OrderID) REFERENCES `Order`(OrderID) ON DELETE CASCADE
+);
@@ -0,0 +1,36 @@
+-- Precomputed "customers also bought" lists (see recommendations.py). Each
+-- product keeps its top-K most similar products by co-purchase, so the
+-- product page reads one short primary-key range.
+CREATE TABLE IF NOT EXISTS ProductNeighbour (
+    ProductID INT NOT NULL,
+    Position TINYINT UNSIGNED NOT NULL,
+    NeighbourID INT NOT NULL,
+    Score FLOAT NOT NULL,
+    CoPurchases INT NOT NULL,
+    ComputedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (ProductID, Position),
+    FOREIGN KEY (ProductID) REFERENCES Product(ProductID) ON DELETE CASCADE,
+    FOREIGN KEY (NeighbourID) REFERENCES Product(ProductID) ON DELETE CASCADE
+);
+
+-- Products whose neighbour lists are out of date because a buyer's basket
+-- changed; `flask recommendations` recomputes them and clears the marks.
+CREATE TABLE IF NOT EXISTS RecommendationStale (
+    ProductID INT PRIMARY KEY,
+    MarkedAt TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    FOREIGN KEY (ProductID) REFERENCES Product(ProductID) ON DELETE CASCADE
+);
+
+-- Ranking (CustomerID, ProductID, Quantity) is the purchase matrix the
+-- lists are computed from. It is filled from past orders here and kept
+-- current by the order.record_purchases job.
+INSERT INTO Ranking (CustomerID, ProductID, Quantity)
+SELECT o.CustomerID, oi.ProductID, SUM(oi.Quantity)
+FROM OrderItem oi
+JOIN `Order` o ON oi.OrderID = o.OrderID
+WHERE o.OrderStatus <> 'Cancelled'
+GROUP BY o.CustomerID, oi.ProductID
+ON DUPLICATE KEY UPDATE Quantity = VALUES(Quantity);
+
+INSERT IGNORE INTO RecommendationStale (ProductID)
+SELECT DISTINCT ProductID FROM Ranking;
@@ -0,0 +1,23 @@
+-- Units sold per product per day, behind the rolling best-seller boards (see
+-- leaderboards.py). The order.record_demand job adds each order to its day's
+-- row together with Product.Demand; UpdatedAt lets web processes re-read
+-- only the products that sold since they last looked. Rows older than the
+-- longest window are removed by `flask leaderboards --purge`.
+CREATE TABLE IF NOT EXISTS SalesBucket (
+    Day DATE NOT NULL,
+    ProductID INT NOT NULL,
+    Units INT NOT NULL DEFAULT 0,
+    UpdatedAt TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    PRIMARY KEY (Day, ProductID),
+    INDEX idx_sales_bucket_updated (UpdatedAt),
+    INDEX idx_sales_bucket_product (ProductID, Day),
+    FOREIGN KEY (ProductID) REFERENCES Product(ProductID) ON DELETE CASCADE
+);
+
+INSERT INTO SalesBucket (Day, ProductID, Units)
+SELECT DATE(o.OrderDate), oi.ProductID, SUM(oi.Quantity)
+FROM OrderItem oi
+JOIN `Order` o ON oi.OrderID = o.OrderID
+WHERE o.OrderDate >= CURDATE() - INTERVAL 30 DAY
+GROUP BY DATE(o.OrderDate), oi.ProductID
+ON DUPLICATE KEY UPDATE Units = VALUES(Units);
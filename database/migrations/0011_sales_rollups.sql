@@ -0,0 +1,27 @@
+-- Daily sales rollups for the admin reports (see analytics.py). One row per
+-- order day and dimension value: Dimension is 'total' (DimKey 'all'),
+-- 'category', 'product' (ProductID), 'payment' (method), 'district' or
+-- 'rider' (DeliveryManID, or 'unassigned'). Rows are kept current by the
+-- order.rollup job; fill them for existing orders with
+-- `flask backfill-rollups`.
+CREATE TABLE IF NOT EXISTS SalesRollup (
+    Dimension VARCHAR(20) NOT NULL,
+    Day DATE NOT NULL,
+    DimKey VARCHAR(100) NOT NULL,
+    Orders INT NOT NULL DEFAULT 0,
+    Units INT NOT NULL DEFAULT 0,
+    Sales DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    CompletedOrders INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    CancelledOrders INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (Dimension, Day, DimKey)
+);
+
+-- The status and rider each order was last rolled up with, so a transition
+-- moves exactly its own contribution between rollup rows
+CREATE TABLE IF NOT EXISTS OrderRollupState (
+    OrderID INT PRIMARY KEY,
+    OrderStatus VARCHAR(20),
+    DeliveryManID INT,
+    FOREIGN KEY (OrderID) REFERENCES `Order`(OrderID) ON DELETE CASCADE
+);
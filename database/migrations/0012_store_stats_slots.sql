@@ -0,0 +1,15 @@
+-- Dashboard counter deltas spread over STATS_SLOTS rows (see stats.py), so
+-- concurrent checkouts update different rows instead of all queueing on the
+-- single StoreStats row. Reads add the slots to StoreStats; reconciling
+-- folds them back in and zeroes them.
+CREATE TABLE IF NOT EXISTS StoreStatsSlot (
+    Slot TINYINT PRIMARY KEY,
+    Customers INT NOT NULL DEFAULT 0,
+    Products INT NOT NULL DEFAULT 0,
+    Orders INT NOT NULL DEFAULT 0,
+    ActiveDeliveryMen INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(14, 2) NOT NULL DEFAULT 0.00
+);
+
+INSERT IGNORE INTO StoreStatsSlot (Slot) VALUES
+(0), (1), (2), (3), (4), (5), (6), (7), (8), (9), (10), (11), (12), (13), (14), (15);
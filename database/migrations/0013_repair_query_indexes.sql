@@ -0,0 +1,29 @@
+-- Re-adds the indexes of 0002. Before the migration runner checked for
+-- existing indexes, one that already existed made its whole ALTER be
+-- skipped, so the other indexes of that ALTER could be missing even though
+-- 0002 is recorded as applied. Indexes that exist are left out here.
+
+ALTER TABLE `Order`
+    ADD INDEX idx_order_customer_date (CustomerID, OrderDate, OrderID),
+    ADD INDEX idx_order_deliveryman_date (DeliveryManID, OrderDate, OrderID),
+    ADD INDEX idx_order_date (OrderDate, OrderID),
+    ADD INDEX idx_order_status_amount (OrderStatus, TotalAmount),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE Review
+    ADD INDEX idx_review_product_date (ProductID, ReviewDate, ReviewID),
+    ADD INDEX idx_review_customer_product (CustomerID, ProductID),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE Product
+    ADD INDEX idx_product_category_name (Category, ProductName, ProductID),
+    ADD INDEX idx_product_name (ProductName, ProductID),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE Customer
+    ADD INDEX idx_customer_created (CreatedAt, CustomerID),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE DeliveryMan
+    ADD INDEX idx_deliveryman_status_name (Status, Name),
+    ALGORITHM=INPLACE, LOCK=NONE;
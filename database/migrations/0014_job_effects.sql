@@ -0,0 +1,11 @@
+-- Markers of job effects that must not be applied twice (see
+-- jobs.first_run). A job can run more than once: requeue_stale() hands a
+-- job back to the queue when its worker looks dead, and that worker may
+-- still finish. Each marker commits with the writes it guards.
+CREATE TABLE IF NOT EXISTS JobEffect (
+    Kind VARCHAR(50) NOT NULL,
+    EffectKey VARCHAR(100) NOT NULL,
+    CreatedAt TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (Kind, EffectKey),
+    INDEX idx_job_effect_created (CreatedAt)
+);
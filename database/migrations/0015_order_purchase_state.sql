@@ -0,0 +1,40 @@
+-- Orders counted in the Ranking purchase matrix (see
+-- recommendations.record_purchases). An order is counted unless it is
+-- cancelled; the row makes the order.record_purchases job safe to run
+-- twice and lets a cancellation take back exactly what was added.
+CREATE TABLE IF NOT EXISTS OrderPurchaseState (
+    OrderID INT PRIMARY KEY,
+    RecordedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (OrderID) REFERENCES `Order`(OrderID) ON DELETE CASCADE
+);
+
+-- Recount Ranking from the orders, as 0009 did: the job could add an order
+-- twice, and never took cancelled orders back out. Pairs without orders
+-- (sample data) are left alone.
+UPDATE Ranking r
+SET r.Quantity = (
+    SELECT COALESCE(SUM(oi.Quantity), 0)
+    FROM OrderItem oi
+    JOIN `Order` o ON oi.OrderID = o.OrderID
+    WHERE o.CustomerID = r.CustomerID AND oi.ProductID = r.ProductID AND o.OrderStatus <> 'Cancelled'
+)
+WHERE EXISTS (
+    SELECT 1
+    FROM OrderItem oi
+    JOIN `Order` o ON oi.OrderID = o.OrderID
+    WHERE o.CustomerID = r.CustomerID AND oi.ProductID = r.ProductID
+);
+
+INSERT INTO Ranking (CustomerID, ProductID, Quantity)
+SELECT o.CustomerID, oi.ProductID, SUM(oi.Quantity)
+FROM OrderItem oi
+JOIN `Order` o ON oi.OrderID = o.OrderID
+WHERE o.OrderStatus <> 'Cancelled'
+GROUP BY o.CustomerID, oi.ProductID
+ON DUPLICATE KEY UPDATE Quantity = VALUES(Quantity);
+
+INSERT IGNORE INTO OrderPurchaseState (OrderID)
+SELECT OrderID FROM `Order` WHERE OrderStatus <> 'Cancelled';
+
+INSERT IGNORE INTO RecommendationStale (ProductID)
+SELECT DISTINCT ProductID FROM Ranking;
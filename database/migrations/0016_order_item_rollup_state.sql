@@ -0,0 +1,21 @@
+-- The items, with their category at the time, each order was last rolled up
+-- with (see analytics.rollup_orders). Taking an order's share back out uses
+-- these rows rather than the current Product, so recategorised or deleted
+-- products subtract exactly what was added.
+CREATE TABLE IF NOT EXISTS OrderItemRollupState (
+    OrderID INT NOT NULL,
+    ProductID INT NOT NULL,
+    Category VARCHAR(50),
+    Quantity INT NOT NULL,
+    Price DECIMAL(10, 2) NOT NULL,
+    PRIMARY KEY (OrderID, ProductID),
+    FOREIGN KEY (OrderID) REFERENCES OrderRollupState(OrderID) ON DELETE CASCADE
+);
+
+-- Orders rolled up before this migration: the current categories are the
+-- best record of what they added
+INSERT IGNORE INTO OrderItemRollupState (OrderID, ProductID, Category, Quantity, Price)
+SELECT oi.OrderID, oi.ProductID, p.Category, oi.Quantity, oi.Price
+FROM OrderRollupState s
+JOIN OrderItem oi ON s.OrderID = oi.OrderID
+LEFT JOIN Product p ON oi.ProductID = p.ProductID;
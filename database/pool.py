@@ -0,0 +1,148 @@
+import threading
+import time
+
+import MySQLdb
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the wait timeout"""
+
+
+class PooledConnection:
+    """Connection checked out of a ConnectionPool
+
+    Behaves like a normal MySQLdb connection, except that close() hands the
+    connection back to the pool instead of dropping it.
+    """
+
+    def __init__(self, pool, connection, created_at):
+        self._pool = pool
+        self._connection = connection
+        self._created_at = created_at
+
+    @property
+    def closed(self):
+        return self._connection is None
+
+    def close(self):
+        """Return the connection to the pool (safe to call more than once)"""
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            self._pool.release(connection, self._created_at)
+
+    def __getattr__(self, name):
+        if self._connection is None:
+            raise MySQLdb.InterfaceError('Connection already returned to the pool')
+        return getattr(self._connection, name)
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of MySQLdb connections
+
+    size          -- maximum number of open connections
+    timeout       -- seconds to wait for a free connection before PoolTimeout
+    recycle       -- seconds after which a connection is closed and reopened
+    ping_interval -- connections idle longer than this are pinged on checkout
+    """
+
+    def __init__(self, connect_args, size=10, timeout=30, recycle=3600, ping_interval=5):
+        self.connect_args = dict(connect_args)
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+
+        self._cond = threading.Condition()
+        self._idle = []  # (connection, created_at, last_used) - used as a LIFO stack
+        self._opened = 0
+
+    def acquire(self):
+        """Check out a healthy connection, waiting up to `timeout` seconds"""
+        deadline = time.monotonic() + self.timeout
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._opened < self.size:
+                    self._opened += 1
+                    entry = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f'No database connection available after {self.timeout}s')
+                self._cond.wait(remaining)
+
+        # Validate or open the connection outside the lock
+        try:
+            if entry is not None:
+                connection, created_at, last_used = entry
+                now = time.monotonic()
+                if now - created_at > self.recycle:
+                    self._discard(connection)
+                    entry = None
+                elif now - last_used > self.ping_interval:
+                    try:
+                        connection.ping()
+                    except MySQLdb.Error:
+                        self._discard(connection)
+                        entry = None
+
+            if entry is None:
+                connection = MySQLdb.connect(**self.connect_args)
+                created_at = time.monotonic()
+        except Exception:
+            # Give the slot back so waiters are not starved by a failed connect
+            with self._cond:
+                self._opened -= 1
+                self._cond.notify()
+            raise
+
+        return PooledConnection(self, connection, created_at)
+
+    def release(self, connection, created_at):
+        """Return a connection, discarding it if it is broken or expired"""
+        reusable = time.monotonic() - created_at <= self.recycle
+        if reusable:
+            try:
+                # Never hand out a connection with an open transaction
+                connection.rollback()
+            except MySQLdb.Error:
+                reusable = False
+
+        if not reusable:
+            self._discard(connection)
+
+        with self._cond:
+            if reusable:
+                self._idle.append((connection, created_at, time.monotonic()))
+            else:
+                self._opened -= 1
+            self._cond.notify()
+
+    def dispose(self):
+        """Close every idle connection (checked-out ones close on release)"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._opened -= len(idle)
+            self._cond.notify_all()
+        for connection, _, _ in idle:
+            self._discard(connection)
+
+    def stats(self):
+        """Snapshot of pool usage"""
+        with self._cond:
+            return {
+                'size': self.size,
+                'open': self._opened,
+                'idle': len(self._idle),
+                'in_use': self._opened - len(self._idle),
+            }
+
+    @staticmethod
+    def _discard(connection):
+        try:
+            connection.close()
+        except MySQLdb.Error:
+            pass
@@ -140,6 +140,17 @@ CREATE TABLE Ranking (
     FOREIGN KEY (ProductID) REFERENCES Product(ProductID) ON DELETE CASCADE
 );
 
+-- Table: StoreStats (single row of dashboard counters, kept current by the app)
+CREATE TABLE StoreStats (
+    StatsID TINYINT PRIMARY KEY,
+    Customers INT NOT NULL DEFAULT 0,
+    Products INT NOT NULL DEFAULT 0,
+    Orders INT NOT NULL DEFAULT 0,
+    ActiveDeliveryMen INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    ReconciledAt TIMESTAMP NULL DEFAULT NULL
+);
+
 -- Insert sample data for testing
 
 -- Sample Admin
@@ -213,3 +224,6 @@ INSERT INTO Ranking (CustomerID, ProductID, Quantity) VALUES
 (1, 1, 5),
 (1, 5, 5),
 (2, 2, 4);
+
+-- Dashboard counters (filled in by the first reconciliation)
+INSERT INTO StoreStats (StatsID) VALUES (1);
@@ -0,0 +1,240 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from stats import bump_stats, revenue_delta
+
+# Events accepted per sync request
+MAX_EVENTS = 200
+
+# Values a rider may set, as on the single-order endpoints' buttons
+STATUS_VALUES = ('Pending', 'Delivered')
+PAYMENT_VALUES = ('Pending', 'Paid')
+
+# Paid before delivery, so delivering completes the order
+PREPAID_METHODS = ('Online Payment', 'Bank Transfer')
+
+# How far in the future a device clock may be before its events are refused
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+
+class EventConflict(ValueError):
+    """The order has moved on (e.g. cancelled by an admin) since the rider queued the event"""
+
+
+def parse_event(raw, now):
+    """Normalized event from one dashboard queue entry. Raises ValueError
+
+    raw -- {"event_id", "order_id", "at", and one of "order_status" or
+            "payment_status"}; "at" is epoch milliseconds or an ISO 8601
+            time, taken as UTC without an offset
+    now -- current UTC time (naive)
+    """
+    if not isinstance(raw, dict):
+        raise ValueError('Each event must be an object')
+
+    event_id = raw.get('event_id')
+    if not isinstance(event_id, str) or not 0 < len(event_id) <= 64:
+        raise ValueError('event_id must be a string of 1-64 characters')
+    try:
+        order_id = int(raw.get('order_id'))
+    except (TypeError, ValueError):
+        raise ValueError('order_id must be a number') from None
+
+    if ('order_status' in raw) == ('payment_status' in raw):
+        raise ValueError('Send exactly one of order_status and payment_status')
+    if 'order_status' in raw:
+        kind, value, allowed = 'status', raw['order_status'], STATUS_VALUES
+    else:
+        kind, value, allowed = 'payment', raw['payment_status'], PAYMENT_VALUES
+    if value not in allowed:
+        raise ValueError(f"{kind} must be one of {', '.join(allowed)}")
+
+    at = _parse_time(raw.get('at'))
+    if at > now + MAX_CLOCK_SKEW:
+        raise ValueError('at is in the future')
+    return {'event_id': event_id, 'order_id': order_id, 'kind': kind, 'value': value, 'at': at}
+
+
+def _parse_time(value):
+    try:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            at = datetime.fromtimestamp(value / 1000, timezone.utc)
+        else:
+            at = datetime.fromisoformat(value)
+    except (TypeError, ValueError, OverflowError, OSError):
+        raise ValueError('at must be epoch milliseconds or an ISO 8601 time') from None
+    if at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    # DeliveryEvent.OccurredAt keeps milliseconds
+    return at.replace(microsecond=at.microsecond // 1000 * 1000)
+
+
+def _apply(order, kind, value):
+    """Apply one event to an order's state, with the single-order endpoints' rules"""
+    if order['status'] == 'Cancelled':
+        raise EventConflict('Order was cancelled')
+
+    if kind == 'status':
+        if order['status'] == 'Complete':
+            if value != 'Delivered':
+                raise EventConflict('Order is already complete')
+            return
+        order['status'] = order['delivery_status'] = value
+        if value == 'Delivered':
+            if order['method'] in PREPAID_METHODS:
+                order['payment'], order['status'] = 'Paid', 'Complete'
+            elif order['payment'] == 'Paid':
+                order['status'] = 'Complete'
+    else:
+        if order['status'] == 'Complete' and value != 'Paid':
+            raise EventConflict('Order is already complete')
+        order['payment'] = value
+        if order['status'] == 'Delivered' and value == 'Paid':
+            order['status'] = 'Complete'
+
+
+def record_change(cursor, rider_id, order_id, kind, value):
+    """Record a change made on a single-order endpoint as an applied event
+
+    Events queued offline that happened before it are then stale when they
+    sync, as if the change had been synced itself. The caller commits.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    cursor.execute("""
+        INSERT INTO DeliveryEvent (DeliveryManID, EventID, OrderID, Kind, Value, OccurredAt, Result)
+        VALUES (%s, %s, %s, %s, %s, %s, 'applied')
+    """, (rider_id, f'server-{uuid.uuid4().hex}', order_id, kind, value,
+          now.replace(microsecond=now.microsecond // 1000 * 1000)))
+
+
+def sync_events(cursor, rider_id, events):
+    """Apply a rider's queued status/payment events; returns one result per event
+
+    Events are applied in the order they happened ("at"), whatever order
+    they arrive in, with a fixed number of statements for the whole batch:
+    a lookup of already-synced event ids, the orders locked in OrderID
+    order, one UPDATE for every changed order, one Delivery upsert, one
+    DeliveryEvent insert and the revenue counter. The caller commits.
+
+    Each result has event_id and result: 'applied'; 'duplicate' (synced
+    before, with the earlier outcome as 'original'); 'stale' (an event of
+    the same kind that happened later was applied already, by a sync or
+    on a single-order endpoint); 'conflict' or
+    'rejected' (with an 'error'). Results for known orders include the
+    order's status and payment status after the batch.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    results = [None] * len(events)
+    fresh = []
+    batch_ids = set()
+    for index, raw in enumerate(events):
+        try:
+            event = parse_event(raw, now)
+        except ValueError as e:
+            event_id = raw.get('event_id') if isinstance(raw, dict) else None
+            results[index] = {'event_id': event_id, 'result': 'rejected', 'error': str(e)}
+            continue
+        if event['event_id'] in batch_ids:
+            results[index] = {'event_id': event['event_id'], 'result': 'duplicate', 'original': None}
+            continue
+        batch_ids.add(event['event_id'])
+        fresh.append((index, event))
+    if not fresh:
+        return results
+
+    event_ids = sorted(batch_ids)
+    cursor.execute(f"""
+        SELECT EventID, Result FROM DeliveryEvent
+        WHERE DeliveryManID = %s AND EventID IN ({', '.join(['%s'] * len(event_ids))})
+    """, [rider_id, *event_ids])
+    synced = dict(cursor.fetchall())
+
+    order_ids = sorted({event['order_id'] for _, event in fresh})
+    cursor.execute(f"""
+        SELECT o.OrderID, o.DeliveryManID, o.OrderStatus, o.PaymentStatus, o.PaymentMethod, o.TotalAmount,
+               (SELECT MAX(e.OccurredAt) FROM DeliveryEvent e
+                WHERE e.OrderID = o.OrderID AND e.Kind = 'status' AND e.Result = 'applied'),
+               (SELECT MAX(e.OccurredAt) FROM DeliveryEvent e
+                WHERE e.OrderID = o.OrderID AND e.Kind = 'payment' AND e.Result = 'applied')
+        FROM `Order` o
+        WHERE o.OrderID IN ({', '.join(['%s'] * len(order_ids))})
+        ORDER BY o.OrderID
+        FOR UPDATE
+    """, order_ids)
+    orders = {}
+    for order_id, owner, status, payment, method, total, last_status, last_payment in cursor.fetchall():
+        if owner == rider_id:
+            orders[order_id] = {
+                'status': status, 'payment': payment, 'method': method, 'total': total,
+                'delivery_status': None, 'last': {'status': last_status, 'payment': last_payment},
+                'initial': (status, payment),
+            }
+
+    recorded = []
+    for index, event in sorted(fresh, key=lambda item: (item[1]['at'], item[0])):
+        result = {'event_id': event['event_id'], 'order_id': event['order_id']}
+        results[index] = result
+        order = orders.get(event['order_id'])
+        if event['event_id'] in synced:
+            result.update(result='duplicate', original=synced[event['event_id']])
+            continue
+        if order is None:
+            result.update(result='rejected', error='Order is not assigned to you')
+            continue
+
+        last = order['last'][event['kind']]
+        if last is not None and event['at'] < last:
+            result['result'] = 'stale'
+        else:
+            try:
+                _apply(order, event['kind'], event['value'])
+                result['result'] = 'applied'
+                order['last'][event['kind']] = event['at']
+            except EventConflict as e:
+                result.update(result='conflict', error=str(e))
+        recorded.append((rider_id, event['event_id'], event['order_id'], event['kind'],
+                         event['value'], event['at'], result['result']))
+
+    changed = sorted(order_id for order_id, order in orders.items()
+                     if (order['status'], order['payment']) != order['initial'])
+    if changed:
+        cases = ' '.join(['WHEN %s THEN %s'] * len(changed))
+        cursor.execute(f"""
+            UPDATE `Order`
+            SET OrderStatus = CASE OrderID {cases} END,
+                PaymentStatus = CASE OrderID {cases} END
+            WHERE OrderID IN ({', '.join(['%s'] * len(changed))})
+        """, [
+            *(value for order_id in changed for value in (order_id, orders[order_id]['status'])),
+            *(value for order_id in changed for value in (order_id, orders[order_id]['payment'])),
+            *changed,
+        ])
+        bump_stats(cursor, Revenue=sum(
+            revenue_delta(orders[order_id]['initial'][0], orders[order_id]['status'], orders[order_id]['total'])
+            for order_id in changed
+        ))
+
+    deliveries = [(order_id, order['delivery_status'], order['delivery_status'])
+                  for order_id, order in sorted(orders.items()) if order['delivery_status']]
+    if deliveries:
+        # The row may not exist yet if the order.create_delivery job has not run
+        cursor.executemany("""
+            INSERT INTO Delivery (OrderID, DeliveryStatus, DeliveryDate)
+            VALUES (%s, %s, CASE WHEN %s IN ('Delivered', 'Complete') THEN CURDATE() END)
+            ON DUPLICATE KEY UPDATE
+                DeliveryStatus = VALUES(DeliveryStatus),
+                DeliveryDate = COALESCE(VALUES(DeliveryDate), DeliveryDate)
+        """, deliveries)
+
+    if recorded:
+        cursor.executemany("""
+            INSERT INTO DeliveryEvent (DeliveryManID, EventID, OrderID, Kind, Value, OccurredAt, Result)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, recorded)
+
+    for result in results:
+        order = orders.get(result.get('order_id'))
+        if order is not None:
+            result['order_status'] = order['status']
+            result['payment_status'] = order['payment']
+    return results
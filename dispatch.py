@@ -0,0 +1,254 @@
+import heapq
+import re
+
+# Most open orders a rider is given, by vehicle
+VEHICLE_CAPACITY = {'Bicycle': 8, 'Motorcycle': 15, 'Car': 25, 'Van': 40}
+DEFAULT_CAPACITY = 10
+
+# Orders in these states no longer count towards a rider's workload
+CLOSED_STATUSES = ('Delivered', 'Complete', 'Cancelled')
+
+# A rider already working an order's area (or district) is preferred while
+# their load, as a fraction of capacity, is within this much of the least
+# loaded rider's; beyond that the order goes to the least loaded rider
+AFFINITY_SLACK = 0.5
+
+_PHONE_SUFFIX_RE = re.compile(r'\.\s*Phone:.*$', re.IGNORECASE | re.DOTALL)
+
+
+def parse_address(address):
+    """(area, district) from a 'Road, Area, City, District. Phone: ...' address
+
+    Shorter addresses are read from the right ('Area, City' gives the
+    area and uses the city as district). Parts are lower-cased; missing
+    ones are None.
+    """
+    parts = [part.strip().lower() for part in _PHONE_SUFFIX_RE.sub('', address or '').split(',')]
+    parts = [part for part in parts if part]
+    if not parts:
+        return None, None
+    if len(parts) >= 4:
+        return parts[1], parts[3]
+    if len(parts) >= 2:
+        return parts[-2], parts[-1]
+    return parts[0], None
+
+
+def _normalize(value):
+    return value.strip().lower() if value and value.strip() else None
+
+
+class Rider:
+    """A rider's capacity, workload and the areas they are working"""
+
+    __slots__ = ('rider_id', 'capacity', 'load', 'assigned', 'areas', 'districts')
+
+    def __init__(self, rider_id, vehicle_type, open_orders, home_address):
+        self.rider_id = rider_id
+        self.capacity = VEHICLE_CAPACITY.get(vehicle_type, DEFAULT_CAPACITY)
+        self.load = open_orders
+        self.assigned = []
+        area, district = parse_address(home_address)
+        self.areas = {area} - {None}
+        self.districts = {district} - {None}
+
+    @property
+    def ratio(self):
+        return self.load / self.capacity
+
+
+class Plan:
+    """Outcome of plan_assignments()"""
+
+    def __init__(self, assignments, unassigned, riders):
+        self.assignments = assignments  # [(order_id, rider_id)] in order age
+        self.unassigned = unassigned  # order ids no rider had room for
+        self.riders = riders
+
+    def to_dict(self):
+        return {
+            'assigned': len(self.assignments),
+            'unassigned': self.unassigned,
+            'assignments': [
+                {'order_id': order_id, 'delivery_man_id': rider_id} for order_id, rider_id in self.assignments
+            ],
+            'riders': [
+                {
+                    'delivery_man_id': rider.rider_id,
+                    'new_orders': len(rider.assigned),
+                    'open_orders': rider.load,
+                    'capacity': rider.capacity,
+                }
+                for rider in self.riders if rider.assigned
+            ],
+        }
+
+
+class _LoadHeap:
+    """Riders with spare capacity, least loaded first
+
+    Loads only grow, so an entry can only be stale by being too low: it
+    surfaces early, and is then re-queued under the rider's current load
+    (or dropped once the rider is full). A rider's load can change without
+    touching every heap it sits in.
+    """
+
+    def __init__(self):
+        self._heap = []
+
+    def push(self, rider):
+        if rider.load < rider.capacity:
+            heapq.heappush(self._heap, (rider.ratio, rider.load, rider.rider_id, rider))
+
+    def peek(self):
+        while self._heap:
+            _, load, _, rider = self._heap[0]
+            if load == rider.load:
+                return rider
+            heapq.heappop(self._heap)
+            self.push(rider)
+        return None
+
+
+def plan_assignments(orders, riders):
+    """Assign orders to riders, balancing load against area affinity
+
+    orders -- [(order_id, area, district)], oldest first
+    riders -- [Rider]
+
+    Each order goes to the least loaded rider already working its area,
+    else its district, unless that rider is more than AFFINITY_SLACK
+    busier than the least loaded rider overall. Riders are never filled
+    past their vehicle's capacity. Runs in O((orders + riders) log riders).
+    """
+    overall = _LoadHeap()
+    by_area = {}
+    by_district = {}
+
+    def index(rider, areas, districts):
+        for area in areas:
+            by_area.setdefault(area, _LoadHeap()).push(rider)
+        for district in districts:
+            by_district.setdefault(district, _LoadHeap()).push(rider)
+
+    for rider in riders:
+        overall.push(rider)
+        index(rider, rider.areas, rider.districts)
+
+    assignments = []
+    unassigned = []
+    for order_id, area, district in orders:
+        best = overall.peek()
+        if best is None:
+            unassigned.append(order_id)
+            continue
+
+        chosen = best
+        for heaps, key in ((by_area, area), (by_district, district)):
+            candidate = heaps[key].peek() if key in heaps else None
+            if candidate is not None and candidate.ratio <= best.ratio + AFFINITY_SLACK:
+                chosen = candidate
+                break
+
+        chosen.load += 1
+        chosen.assigned.append(order_id)
+        assignments.append((order_id, chosen.rider_id))
+
+        new_areas = {area} - chosen.areas - {None}
+        new_districts = {district} - chosen.districts - {None}
+        chosen.areas |= new_areas
+        chosen.districts |= new_districts
+        index(chosen, new_areas, new_districts)
+
+    return Plan(assignments, unassigned, riders)
+
+
+def load_dispatch_state(cursor, limit=None):
+    """Unassigned Pending orders (oldest first) and Active riders with their workload
+
+    Returns (orders, riders) in the shapes plan_assignments() takes.
+    """
+    closed = ', '.join(['%s'] * len(CLOSED_STATUSES))
+
+    cursor.execute(f"""
+        SELECT d.DeliveryManID, d.VehicleType, d.Address, COUNT(o.OrderID)
+        FROM DeliveryMan d
+        LEFT JOIN `Order` o ON o.DeliveryManID = d.DeliveryManID AND o.OrderStatus NOT IN ({closed})
+        WHERE d.Status = 'Active'
+        GROUP BY d.DeliveryManID, d.VehicleType, d.Address
+    """, CLOSED_STATUSES)
+    riders = {row[0]: Rider(row[0], row[1], row[3], row[2]) for row in cursor.fetchall()}
+
+    # Areas riders are already working, so new orders cluster onto their runs
+    cursor.execute(f"""
+        SELECT DISTINCT o.DeliveryManID, o.DeliveryAddress, c.Area, c.District
+        FROM `Order` o
+        JOIN Customer c ON o.CustomerID = c.CustomerID
+        WHERE o.DeliveryManID IS NOT NULL AND o.OrderStatus NOT IN ({closed})
+    """, CLOSED_STATUSES)
+    for rider_id, address, customer_area, customer_district in cursor.fetchall():
+        rider = riders.get(rider_id)
+        if rider is not None:
+            area, district = order_location(address, customer_area, customer_district)
+            rider.areas |= {area} - {None}
+            rider.districts |= {district} - {None}
+
+    query = """
+        SELECT o.OrderID, o.DeliveryAddress, c.Area, c.District
+        FROM `Order` o
+        JOIN Customer c ON o.CustomerID = c.CustomerID
+        WHERE o.DeliveryManID IS NULL AND o.OrderStatus = 'Pending'
+        ORDER BY o.OrderDate, o.OrderID
+    """
+    params = []
+    if limit:
+        query += " LIMIT %s"
+        params.append(limit)
+    cursor.execute(query, params)
+    orders = [
+        (row[0], *order_location(row[1], row[2], row[3]))
+        for row in cursor.fetchall()
+    ]
+    return orders, list(riders.values())
+
+
+def order_location(address, customer_area, customer_district):
+    """(area, district) of an order, lower-cased
+
+    The address on the order is where it goes; the customer's profile
+    fills in anything it lacks.
+    """
+    area, district = parse_address(address)
+    return area or _normalize(customer_area), district or _normalize(customer_district)
+
+
+def apply_assignments(cursor, assignments):
+    """Write a plan with one UPDATE; returns the number of orders assigned
+
+    Orders assigned (or moved out of Pending) since the plan was made are
+    left alone, so the count can be lower than len(assignments).
+    """
+    if not assignments:
+        return 0
+
+    by_rider = {}
+    for order_id, rider_id in assignments:
+        by_rider.setdefault(rider_id, []).append(order_id)
+
+    # One IN list per rider: MySQL binary-searches constant IN lists, so
+    # each row costs O(riders log orders) rather than a scan of every WHEN
+    cases = []
+    params = []
+    for rider_id, order_ids in by_rider.items():
+        cases.append(f"WHEN OrderID IN ({', '.join(['%s'] * len(order_ids))}) THEN %s")
+        params.extend(order_ids)
+        params.append(rider_id)
+
+    order_ids = [order_id for order_id, _ in assignments]
+    cursor.execute(f"""
+        UPDATE `Order`
+        SET DeliveryManID = CASE {' '.join(cases)} END
+        WHERE OrderID IN ({', '.join(['%s'] * len(order_ids))})
+          AND DeliveryManID IS NULL AND OrderStatus = 'Pending'
+    """, params + order_ids)
+    return cursor.rowcount
@@ -0,0 +1,195 @@
+import csv
+import io
+from datetime import date, datetime, timedelta
+
+import MySQLdb
+
+from fastjson import dumps, iter_rows
+
+# name -> (SELECT ending in a WHERE clause, date column for range filters, ORDER BY,
+#          OrderID column to narrow to the date range's orders, or None)
+# Each ORDER BY follows an index of the first table read, so MySQL streams
+# rows in order without buffering them for a sort.
+EXPORTS = {
+    'orders': ("""
+        SELECT o.OrderID, o.OrderDate, o.CustomerID, o.DeliveryManID, o.OrderStatus,
+               o.PaymentMethod, o.PaymentStatus, o.TotalAmount, o.DeliveryAddress
+        FROM `Order` o
+        WHERE 1=1
+    """, 'o.OrderDate', 'o.OrderDate, o.OrderID', None),
+    # Read in OrderItem primary key order (OrderIDs follow placement order);
+    # STRAIGHT_JOIN keeps OrderItem first so the ORDER BY needs no sort
+    'order-items': ("""
+        SELECT STRAIGHT_JOIN oi.OrderID, o.OrderDate, oi.ProductID, p.ProductName, oi.Quantity, oi.Price,
+               oi.Quantity * oi.Price AS LineTotal
+        FROM OrderItem oi
+        JOIN `Order` o ON o.OrderID = oi.OrderID
+        JOIN Product p ON p.ProductID = oi.ProductID
+        WHERE 1=1
+    """, 'o.OrderDate', 'oi.OrderID, oi.ProductID', 'oi.OrderID'),
+    # Same TotalOrders / TotalSpent as the admin customers page; correlated
+    # subqueries keep the outer scan streaming instead of grouping a join
+    'customers': ("""
+        SELECT c.CustomerID, c.Username, c.Name, c.Email, c.Number, c.Road, c.Area, c.City,
+               c.District, c.RewardPoint, c.CreatedAt,
+               (SELECT COUNT(*) FROM `Order` o WHERE o.CustomerID = c.CustomerID) AS TotalOrders,
+               (SELECT COALESCE(SUM(o.TotalAmount), 0) FROM `Order` o
+                WHERE o.CustomerID = c.CustomerID AND o.OrderStatus = 'Complete') AS TotalSpent
+        FROM Customer c
+        WHERE 1=1
+    """, 'c.CreatedAt', 'c.CreatedAt, c.CustomerID', None),
+    'products': ("""
+        SELECT p.ProductID, p.ProductName, p.Category, p.Price, p.Quantity, p.Demand, p.Rating,
+               p.Embroidery, p.Description, p.ImageURL, p.CreatedAt
+        FROM Product p
+        WHERE 1=1
+    """, 'p.CreatedAt', 'p.ProductID', None),
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Rows encoded per yielded chunk
+CHUNK_ROWS = 1000
+
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD filter value; None if empty. Raises ValueError"""
+    if not value:
+        return None
+    return date.fromisoformat(value)
+
+
+def open_export(connection, name, start=None, end=None):
+    """Run an export query on an unbuffered cursor; returns (columns, row iterator)
+
+    start/end are inclusive dates. Rows are read from the server as they
+    are consumed, so memory use does not grow with the size of the export.
+    The iterator closes the cursor and restores the session's
+    net_write_timeout when it is exhausted or closed.
+    """
+    query, date_column, order, id_column = EXPORTS[name]
+    params = []
+    if start:
+        query += f" AND {date_column} >= %s"
+        params.append(start)
+    if end:
+        query += f" AND {date_column} < %s"
+        params.append(end + timedelta(days=1))
+    if id_column and (start or end):
+        # The date filter applies to a joined table; bound the scan of the
+        # first one by the OrderIDs of the range instead of reading it all
+        low, high = _order_id_range(connection, start, end)
+        query += f" AND {id_column} BETWEEN %s AND %s"
+        params.extend([low, high])
+    query += f" ORDER BY {order}"
+
+    cursor = connection.cursor(MySQLdb.cursors.SSCursor)
+    # A slow client stalls the read; give it longer than the 60s default
+    # before the server drops the connection mid-export. The connection is
+    # pooled, so the previous value is put back once the export is done.
+    cursor.execute("SELECT @@SESSION.net_write_timeout")
+    previous = cursor.fetchone()[0]
+    cursor.execute("SET SESSION net_write_timeout = 3600")
+    try:
+        cursor.execute(query, params)
+    except Exception:
+        cursor.close()
+        _set_write_timeout(connection, previous)
+        raise
+    columns = [column[0] for column in cursor.description]
+    return columns, _restoring(connection, iter_rows(cursor, CHUNK_ROWS), previous)
+
+
+def _order_id_range(connection, start=None, end=None):
+    """Lowest and highest OrderID placed between `start` and `end` (inclusive dates)"""
+    conditions, params = [], []
+    if start:
+        conditions.append("OrderDate >= %s")
+        params.append(start)
+    if end:
+        conditions.append("OrderDate < %s")
+        params.append(end + timedelta(days=1))
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SELECT MIN(OrderID), MAX(OrderID) FROM `Order` WHERE {' AND '.join(conditions)}",
+                       params)
+        low, high = cursor.fetchone()
+    finally:
+        cursor.close()
+    # An empty range matches nothing
+    return (low, high) if low is not None else (0, -1)
+
+
+def _set_write_timeout(connection, seconds):
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SET SESSION net_write_timeout = %s", (seconds,))
+    finally:
+        cursor.close()
+
+
+def _restoring(connection, rows, previous):
+    # Closing the rows drains the server-side cursor, so the connection is
+    # free again for the SET
+    try:
+        yield from rows
+    finally:
+        rows.close()
+        _set_write_timeout(connection, previous)
+
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return value
+
+
+def csv_chunks(columns, rows):
+    """Encode rows as CSV with a header line, CHUNK_ROWS rows per chunk"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+
+    count = 0
+    for row in rows:
+        writer.writerow([_csv_value(value) for value in row])
+        count += 1
+        if count % CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def ndjson_chunks(columns, rows):
+    """Encode rows as newline-delimited JSON objects, CHUNK_ROWS rows per chunk"""
+    batch = []
+    for row in rows:
+        batch.append(dumps(dict(zip(columns, row))))
+        if len(batch) >= CHUNK_ROWS:
+            yield b'\n'.join(batch) + b'\n'
+            batch = []
+    if batch:
+        yield b'\n'.join(batch) + b'\n'
+
+
+def export_chunks(connection, name, fmt, start=None, end=None):
+    """Encoded chunks of an export in `fmt` ('csv' or 'ndjson')
+
+    The query runs before this returns, so errors surface before a
+    response starts streaming.
+    """
+    columns, rows = open_export(connection, name, start, end)
+    encode = csv_chunks if fmt == 'csv' else ndjson_chunks
+    return _closing(encode(columns, rows), rows)
+
+
+def _closing(chunks, rows):
+    # Release the server-side cursor even if the client goes away mid-stream
+    try:
+        yield from chunks
+    finally:
+        rows.close()
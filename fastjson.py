@@ -0,0 +1,186 @@
+import json
+import zlib
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+
+# Optional accelerators: orjson for encoding, brotli for compression.
+# Without them the standard library is used and the output is identical.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/csv'}
+
+# Bodies smaller than this are not worth the compression overhead
+MIN_COMPRESS_SIZE = 1024
+
+
+_DAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+def _http_date(value):
+    # Same output as werkzeug's http_date() (naive values are taken as UTC),
+    # without its generic conversion path; it runs once per date column
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    elif value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return (f'{_DAYS[value.weekday()]}, {value.day:02d} {_MONTHS[value.month - 1]} {value.year:04d} '
+            f'{value.hour:02d}:{value.minute:02d}:{value.second:02d} GMT')
+
+
+def default(o):
+    """Encode the types MySQLdb returns that JSON has no native form for
+
+    Decimal becomes a number; dates use the HTTP date format Flask has
+    always produced for them.
+    """
+    if isinstance(o, Decimal):
+        return float(o)
+    if isinstance(o, date):
+        return _http_date(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj):
+        """Serialize to compact UTF-8 JSON bytes"""
+        return orjson.dumps(obj, default=default, option=_ORJSON_OPTIONS)
+
+    loads = orjson.loads
+else:
+    _encoder = json.JSONEncoder(default=default, separators=(',', ':'), ensure_ascii=False)
+
+    def dumps(obj):
+        """Serialize to compact UTF-8 JSON bytes"""
+        return _encoder.encode(obj).encode()
+
+    loads = json.loads
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask JSON provider using dumps() above, so jsonify() needs no per-row conversion"""
+
+    default = staticmethod(default)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
+
+
+def iter_rows(cursor, batch_size=500):
+    """Rows of an executed (ideally server-side) cursor, closing it when exhausted"""
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        cursor.close()
+
+
+def stream_json(rows, key, fields=None, batch_size=500):
+    """Yield the JSON object {**fields, key: [rows...]} in chunks of `batch_size` rows
+
+    The array is encoded incrementally, so memory stays flat however many
+    rows the iterable produces.
+    """
+    head = dumps(fields or {})[:-1]
+    yield head + (b',' if fields else b'') + dumps(key) + b':['
+
+    batch = []
+    separator = b''
+    for row in rows:
+        batch.append(dumps(row))
+        if len(batch) >= batch_size:
+            yield separator + b','.join(batch)
+            separator = b','
+            batch = []
+    if batch:
+        yield separator + b','.join(batch)
+    yield b']}'
+
+
+def choose_encoding(accept_encodings):
+    """Best content coding both sides support: 'br', 'gzip' or None"""
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compressor(encoding):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=5)
+        return compressor.process, compressor.finish
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+
+def compress_chunks(chunks, encoding):
+    compress, finish = _compressor(encoding)
+    try:
+        for chunk in chunks:
+            data = compress(chunk)
+            if data:
+                yield data
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def compress_response(response, accept_encodings):
+    """Compress a successful JSON/CSV response if the client accepts it
+
+    Streamed bodies are compressed chunk by chunk as they are produced.
+    """
+    if (response.status_code != 200 or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_chunks(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return response
+        compress, finish = _compressor(encoding)
+        response.set_data(compress(data) + finish())
+
+    response.headers['Content-Encoding'] = encoding
+    # The compressed bytes differ from the identity ones, so the tag can
+    # only vouch for semantic equivalence from here on
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,264 @@
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+
+import MySQLdb
+
+from fastjson import loads
+from stats import bump_stats
+from validators import bump_versions
+
+FORMATS = ('csv', 'ndjson')
+
+# Valid rows written per transaction
+CHUNK_ROWS = 500
+
+# Row errors listed in a report; later ones are only counted
+MAX_REPORTED_ERRORS = 1000
+
+# Import field -> Product column. Field names follow the admin product API;
+# the column names of a products export are accepted too, so an export can
+# be edited and loaded back.
+FIELDS = {
+    'product_id': 'ProductID',
+    'name': 'ProductName',
+    'category': 'Category',
+    'price': 'Price',
+    'stock': 'Quantity',
+    'embroidery_type': 'Embroidery',
+    'description': 'Description',
+    'image_url': 'ImageURL',
+}
+ALIASES = {column: field for field, column in FIELDS.items()}
+# Export columns maintained by the store itself; ignored on import
+READ_ONLY_COLUMNS = {'Demand', 'Rating', 'CreatedAt'}
+
+MAX_LENGTHS = {'name': 150, 'category': 50, 'embroidery_type': 50, 'image_url': 255}
+MAX_PRICE = Decimal('99999999.99')  # DECIMAL(10, 2)
+
+# Values for new products when the file leaves a field out
+INSERT_DEFAULTS = {'category': None, 'stock': 0, 'embroidery_type': 'None', 'description': None, 'image_url': None}
+INSERT_FIELDS = ('name', 'category', 'price', 'stock', 'embroidery_type', 'description', 'image_url')
+
+
+class RowError(ValueError):
+    """A row that cannot be imported; the message goes into the report"""
+
+
+def read_rows(stream, fmt):
+    """Yield (line number, raw dict or RowError) from a binary CSV/NDJSON stream
+
+    Rows are decoded one at a time, so the file is never held in memory.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            row = loads(line)
+        except ValueError as e:
+            yield line_number, RowError(f'Invalid JSON: {e}')
+            continue
+        if not isinstance(row, dict):
+            yield line_number, RowError('Each line must be a JSON object')
+            continue
+        yield line_number, row
+
+
+def validate_row(raw):
+    """Normalized {field: value} for one input row. Raises RowError
+
+    Empty values count as absent: an update leaves that column alone and
+    an insert uses its default. Rows without product_id create a product
+    and need a name and price.
+    """
+    row = {}
+    for key, value in raw.items():
+        if key is None or key in READ_ONLY_COLUMNS:
+            continue
+        field = ALIASES.get(key, key)
+        if field not in FIELDS:
+            raise RowError(f"Unknown field '{key}'")
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == '':
+            continue
+        row[field] = _parse_field(field, value)
+
+    if 'product_id' not in row:
+        missing = [field for field in ('name', 'price') if field not in row]
+        if missing:
+            raise RowError(f"New products need {' and '.join(missing)}")
+    elif len(row) == 1:
+        raise RowError('Nothing to update')
+    return row
+
+
+def _parse_field(field, value):
+    if field in ('product_id', 'stock'):
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            raise RowError(f'{field} must be a whole number') from None
+        if isinstance(value, float) and value != number:
+            raise RowError(f'{field} must be a whole number')
+        if number < (1 if field == 'product_id' else 0):
+            raise RowError(f'{field} must be {"positive" if field == "product_id" else "zero or more"}')
+        return number
+
+    if field == 'price':
+        try:
+            price = Decimal(str(value))
+        except InvalidOperation:
+            raise RowError('price must be a number') from None
+        if not price.is_finite() or price < 0 or price > MAX_PRICE:
+            raise RowError(f'price must be between 0 and {MAX_PRICE}')
+        return price.quantize(Decimal('0.01'))
+
+    value = str(value)
+    limit = MAX_LENGTHS.get(field)
+    if limit and len(value) > limit:
+        raise RowError(f'{field} is longer than {limit} characters')
+    return value
+
+
+def _write_chunk(cursor, rows):
+    """Insert and update one chunk of validated rows; returns (inserted, updated ids, errors)
+
+    rows -- [(line number, fields)]
+    """
+    product_ids = sorted({fields['product_id'] for _, fields in rows if 'product_id' in fields})
+    existing = set()
+    if product_ids:
+        # Lock the rows being updated, in ProductID order like checkout does
+        cursor.execute(f"""
+            SELECT ProductID FROM Product
+            WHERE ProductID IN ({', '.join(['%s'] * len(product_ids))})
+            ORDER BY ProductID
+            FOR UPDATE
+        """, product_ids)
+        existing = {row[0] for row in cursor.fetchall()}
+
+    inserts = []
+    updates = {}  # updated fields -> rows, one statement per shape
+    errors = []
+    for line_number, fields in rows:
+        product_id = fields.get('product_id')
+        if product_id is None:
+            inserts.append(fields)
+        elif product_id in existing:
+            updates.setdefault(tuple(field for field in INSERT_FIELDS if field in fields), []).append(fields)
+        else:
+            errors.append((line_number, f'Unknown product_id {product_id}'))
+
+    if inserts:
+        # executemany() sends this as a single multi-row INSERT
+        cursor.executemany(f"""
+            INSERT INTO Product ({', '.join(FIELDS[field] for field in INSERT_FIELDS)})
+            VALUES ({', '.join(['%s'] * len(INSERT_FIELDS))})
+        """, [
+            [fields.get(field, INSERT_DEFAULTS.get(field)) for field in INSERT_FIELDS]
+            for fields in inserts
+        ])
+
+    for shape, shape_rows in updates.items():
+        # Every row exists and is locked, so only the UPDATE branch runs;
+        # name and price are sent anyway because strict mode rejects an
+        # INSERT that leaves NOT NULL columns without a value
+        columns = ['product_id'] + sorted(set(shape) | {'name', 'price'})
+        assignments = ', '.join(f'{FIELDS[field]} = VALUES({FIELDS[field]})' for field in shape)
+        cursor.executemany(f"""
+            INSERT INTO Product ({', '.join(FIELDS[field] for field in columns)})
+            VALUES ({', '.join(['%s'] * len(columns))})
+            ON DUPLICATE KEY UPDATE {assignments}
+        """, [
+            [fields.get(field, '' if field == 'name' else 0) for field in columns]
+            for fields in shape_rows
+        ])
+
+    updated_ids = sorted({fields['product_id'] for shape_rows in updates.values() for fields in shape_rows})
+    return len(inserts), updated_ids, errors
+
+
+def import_products(connection, rows, chunk_size=CHUNK_ROWS, dry_run=False, log=None):
+    """Validate and upsert products from read_rows() output, one transaction per chunk
+
+    Each chunk is written with one multi-row INSERT for new products and
+    one INSERT ... ON DUPLICATE KEY UPDATE per set of updated fields, with
+    the store counters and content versions bumped in the same
+    transaction. If a chunk is rejected by the database its rows are
+    retried one by one so the report names the bad ones. With dry_run
+    every chunk is rolled back instead of committed.
+
+    Returns a report: rows read, inserted, updated, failed, errors
+    ([{'line', 'error'}], at most MAX_REPORTED_ERRORS) and chunks.
+    """
+    report = {'rows': 0, 'inserted': 0, 'updated': 0, 'failed': 0, 'errors': [], 'chunks': 0, 'dry_run': dry_run}
+
+    def fail(line_number, message):
+        report['failed'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'line': line_number, 'error': message})
+
+    def flush(chunk):
+        cursor = connection.cursor()
+        try:
+            try:
+                results = [_write_chunk(cursor, chunk)]
+            except (MySQLdb.DataError, MySQLdb.IntegrityError):
+                connection.rollback()
+                results = []
+                for line_number, fields in chunk:
+                    try:
+                        results.append(_write_chunk(cursor, [(line_number, fields)]))
+                    except (MySQLdb.DataError, MySQLdb.IntegrityError) as e:
+                        fail(line_number, e.args[-1] if e.args else str(e))
+
+            inserted = sum(result[0] for result in results)
+            updated_ids = sorted({product_id for result in results for product_id in result[1]})
+            if inserted or updated_ids:
+                bump_stats(cursor, Products=inserted)
+                # Rows may add, rename or recategorise products
+                bump_versions(cursor, updated_ids, catalog=True)
+            if dry_run:
+                connection.rollback()
+            else:
+                connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+        for result in results:
+            for line_number, message in result[2]:
+                fail(line_number, message)
+        report['inserted'] += inserted
+        report['updated'] += len(updated_ids)
+        report['chunks'] += 1
+        if log:
+            log(f"Chunk {report['chunks']}: {report['rows']} rows read, {report['inserted']} inserted, "
+                f"{report['updated']} updated, {report['failed']} failed")
+
+    chunk = []
+    for line_number, raw in rows:
+        report['rows'] += 1
+        try:
+            if isinstance(raw, RowError):
+                raise raw
+            chunk.append((line_number, validate_row(raw)))
+        except RowError as e:
+            fail(line_number, str(e))
+            continue
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+    return report
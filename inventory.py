@@ -0,0 +1,77 @@
+class InsufficientStock(Exception):
+    """Raised when a reservation cannot be met; nothing has been changed
+
+    `shortages` lists {'product_id', 'requested', 'available'} for every
+    line that could not be filled (available is 0 for missing products).
+    """
+
+    def __init__(self, shortages):
+        super().__init__('Insufficient stock')
+        self.shortages = shortages
+
+
+def reserve_stock(cursor, lines):
+    """Lock, check and decrement stock for an order in the caller's transaction
+
+    lines -- {product_id: quantity}
+
+    Rows are locked in ProductID order, so concurrent checkouts always take
+    their locks in the same sequence and cannot deadlock each other. The
+    decrement itself is conditional on stock, so even without the locks an
+    oversell fails instead of going negative.
+
+    Returns {product_id: current unit price}. Raises InsufficientStock.
+    """
+    lines = {int(product_id): int(quantity) for product_id, quantity in lines.items()}
+    if any(quantity <= 0 for quantity in lines.values()):
+        raise ValueError('Quantities must be positive')
+
+    product_ids = sorted(lines)
+    placeholders = ', '.join(['%s'] * len(product_ids))
+
+    # One round-trip for current price and stock of every line, locking the rows
+    cursor.execute(f"""
+        SELECT ProductID, Price, Quantity
+        FROM Product
+        WHERE ProductID IN ({placeholders})
+        ORDER BY ProductID
+        FOR UPDATE
+    """, product_ids)
+    current = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+    shortages = []
+    for product_id in product_ids:
+        available = current[product_id][1] if product_id in current else 0
+        if available < lines[product_id]:
+            shortages.append({'product_id': product_id, 'requested': lines[product_id], 'available': available})
+    if shortages:
+        raise InsufficientStock(shortages)
+
+    # Single set-based decrement; every row must still have enough stock
+    case = ' '.join(['WHEN %s THEN %s'] * len(product_ids))
+    case_params = [value for product_id in product_ids for value in (product_id, lines[product_id])]
+    cursor.execute(f"""
+        UPDATE Product
+        SET Quantity = Quantity - (CASE ProductID {case} END)
+        WHERE ProductID IN ({placeholders})
+          AND Quantity >= (CASE ProductID {case} END)
+    """, case_params + product_ids + case_params)
+
+    if cursor.rowcount != len(product_ids):
+        raise InsufficientStock([
+            {'product_id': product_id, 'requested': lines[product_id], 'available': None}
+            for product_id in product_ids
+        ])
+
+    return {product_id: current[product_id][0] for product_id in product_ids}
+
+
+def insert_order_items(cursor, order_id, lines, prices):
+    """Insert all order items with one multi-row INSERT"""
+    cursor.executemany("""
+        INSERT INTO OrderItem (OrderID, ProductID, Quantity, Price)
+        VALUES (%s, %s, %s, %s)
+    """, [
+        (order_id, product_id, quantity, prices[product_id])
+        for product_id, quantity in sorted(lines.items())
+    ])
@@ -0,0 +1,270 @@
+import json
+import multiprocessing
+import os
+import socket
+import time
+import traceback
+from datetime import datetime
+
+import MySQLdb
+
+DEFAULT_MAX_ATTEMPTS = 5
+MAX_BACKOFF = 3600
+
+# A Running job whose worker has been silent this long is assumed lost
+STALE_AFTER = 300
+
+# Longest wait between attempts to reconnect, or to restart a dead worker
+MAX_RESTART_DELAY = 60
+
+# A worker that ran at least this long before dying is restarted at once
+HEALTHY_RUN = 60
+
+# Seconds between work_pool's checks on its worker processes
+SUPERVISE_INTERVAL = 1.0
+
+
+def enqueue(cursor, kind, payload, delay=0, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Queue a job inside the caller's transaction; returns its JobID
+
+    The job only becomes visible to workers when the caller commits, so it
+    runs if and only if the write that caused it is durable.
+    """
+    cursor.execute("""
+        INSERT INTO Job (Kind, Payload, MaxAttempts, RunAt)
+        VALUES (%s, %s, %s, NOW() + INTERVAL %s SECOND)
+    """, (kind, json.dumps(payload, separators=(',', ':')), max_attempts, delay))
+    return cursor.lastrowid
+
+
+def first_run(cursor, kind, key):
+    """Mark the effects of `kind` for `key` as applied; False if they already were
+
+    Call it first in a handler whose writes are not idempotent and return
+    when it is False. Jobs are delivered at least once (see requeue_stale),
+    and the marker commits or rolls back with the handler's writes, so
+    those writes are applied exactly once. A second run waits on the
+    first's marker until that one commits.
+    """
+    cursor.execute("""
+        INSERT IGNORE INTO JobEffect (Kind, EffectKey)
+        VALUES (%s, %s)
+    """, (kind, str(key)))
+    return cursor.rowcount == 1
+
+
+def backoff(attempts):
+    """Seconds to wait before retry number `attempts` (exponential, capped)"""
+    return min(2 ** attempts, MAX_BACKOFF)
+
+
+def claim_jobs(connection, worker_id, limit=10):
+    """Mark up to `limit` due jobs as Running for this worker and return them
+
+    SKIP LOCKED lets several workers poll the queue at once without
+    blocking on, or double-claiming, each other's rows.
+    """
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT JobID, Kind, Payload, Attempts, MaxAttempts
+        FROM Job
+        WHERE Status = 'Pending' AND RunAt <= NOW()
+        ORDER BY RunAt, JobID
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    """, (limit,))
+    rows = cursor.fetchall()
+
+    if rows:
+        placeholders = ', '.join(['%s'] * len(rows))
+        cursor.execute(f"""
+            UPDATE Job
+            SET Status = 'Running', Attempts = Attempts + 1, LockedBy = %s, LockedAt = NOW()
+            WHERE JobID IN ({placeholders})
+        """, [worker_id] + [row[0] for row in rows])
+    connection.commit()
+    cursor.close()
+
+    return [
+        {'id': row[0], 'kind': row[1], 'payload': json.loads(row[2]),
+         'attempts': row[3] + 1, 'max_attempts': row[4]}
+        for row in rows
+    ]
+
+
+def run_job(connection, handlers, job):
+    """Run one claimed job; returns its new status
+
+    The handler's writes and the Done marker commit together, so a job that
+    succeeds is never run again. On failure the handler's writes are rolled
+    back and the job is retried with backoff, or dead-lettered once it has
+    used all its attempts.
+    """
+    cursor = connection.cursor()
+    try:
+        handler = handlers.get(job['kind'])
+        if handler is None:
+            raise LookupError(f"No handler for job kind '{job['kind']}'")
+        handler(cursor, job['payload'])
+        cursor.execute("""
+            UPDATE Job SET Status = 'Done', CompletedAt = NOW(), LockedBy = NULL, LastError = NULL
+            WHERE JobID = %s
+        """, (job['id'],))
+        connection.commit()
+        return 'Done'
+    except Exception:
+        connection.rollback()
+        error = traceback.format_exc(limit=5)
+        if job['attempts'] >= job['max_attempts']:
+            cursor.execute("""
+                UPDATE Job SET Status = 'Dead', LockedBy = NULL, LastError = %s
+                WHERE JobID = %s
+            """, (error, job['id']))
+            status = 'Dead'
+        else:
+            cursor.execute("""
+                UPDATE Job
+                SET Status = 'Pending', LockedBy = NULL, LastError = %s,
+                    RunAt = NOW() + INTERVAL %s SECOND
+                WHERE JobID = %s
+            """, (error, backoff(job['attempts']), job['id']))
+            status = 'Pending'
+        connection.commit()
+        return status
+    finally:
+        cursor.close()
+
+
+def requeue_stale(cursor, stale_after=STALE_AFTER):
+    """Return jobs held by workers that died mid-run to the queue; returns the count"""
+    cursor.execute("""
+        UPDATE Job SET Status = 'Pending', LockedBy = NULL
+        WHERE Status = 'Running' AND LockedAt < NOW() - INTERVAL %s SECOND
+    """, (stale_after,))
+    return cursor.rowcount
+
+
+def retry_dead(cursor, job_ids=None):
+    """Give dead-lettered jobs a fresh set of attempts; returns the count"""
+    query = """
+        UPDATE Job SET Status = 'Pending', Attempts = 0, RunAt = NOW()
+        WHERE Status = 'Dead'
+    """
+    params = []
+    if job_ids:
+        query += f" AND JobID IN ({', '.join(['%s'] * len(job_ids))})"
+        params = list(job_ids)
+    cursor.execute(query, params)
+    return cursor.rowcount
+
+
+def purge_done(cursor, older_than_days=7):
+    """Delete finished jobs, and effect markers, older than `older_than_days`; returns the job count"""
+    cursor.execute("""
+        DELETE FROM Job WHERE Status = 'Done' AND CompletedAt < NOW() - INTERVAL %s DAY
+    """, (older_than_days,))
+    purged = cursor.rowcount
+    # A job that old can no longer be run again
+    cursor.execute("""
+        DELETE FROM JobEffect WHERE CreatedAt < NOW() - INTERVAL %s DAY
+    """, (older_than_days,))
+    return purged
+
+
+def queue_stats(cursor):
+    """Queue depth per status plus the age in seconds of the oldest due job"""
+    cursor.execute("SELECT Status, COUNT(*) FROM Job GROUP BY Status")
+    stats = {'Pending': 0, 'Running': 0, 'Done': 0, 'Dead': 0}
+    stats.update({row[0]: row[1] for row in cursor.fetchall()})
+
+    cursor.execute("SELECT MIN(RunAt) FROM Job WHERE Status = 'Pending' AND RunAt <= NOW()")
+    oldest = cursor.fetchone()[0]
+    stats['oldest_pending_seconds'] = (datetime.now() - oldest).total_seconds() if oldest else 0
+    return stats
+
+
+def work(connect, handlers, worker_id=None, batch_size=10, poll_interval=1.0, once=False, log=print):
+    """Claim and run jobs until stopped (or until the queue is empty if `once`)
+
+    connect -- zero-argument callable returning a new DB-API connection
+
+    A lost database connection is reopened with backoff. A job that was
+    running when it dropped stays Running until requeue_stale() hands it
+    back.
+    """
+    worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+    failures = 0
+    while True:
+        connection = None
+        try:
+            connection = connect()
+            while True:
+                jobs = claim_jobs(connection, worker_id, batch_size)
+                failures = 0
+                for job in jobs:
+                    status = run_job(connection, handlers, job)
+                    if status != 'Done':
+                        log(f"[{worker_id}] job {job['id']} ({job['kind']}) failed, now {status}")
+                if not jobs:
+                    if once:
+                        return
+                    # Idle: pick up anything a crashed worker left behind
+                    cursor = connection.cursor()
+                    requeue_stale(cursor)
+                    connection.commit()
+                    cursor.close()
+                    time.sleep(poll_interval)
+        except MySQLdb.OperationalError as e:
+            failures += 1
+            delay = min(backoff(failures), MAX_RESTART_DELAY)
+            log(f"[{worker_id}] database connection lost ({e}), reconnecting in {delay}s")
+            time.sleep(delay)
+        finally:
+            if connection is not None:
+                _close_quietly(connection)
+
+
+def _close_quietly(connection):
+    try:
+        connection.close()
+    except MySQLdb.Error:
+        # Already closed by the server
+        pass
+
+
+def work_pool(connect, handlers, processes=2, **options):
+    """Run `processes` worker processes, each with its own connection, until interrupted
+
+    `connect` and `handlers` are passed to the children, so they must be
+    picklable (module-level functions, functools.partial of them). A
+    worker that exits is restarted, with backoff if it keeps dying soon
+    after starting.
+    """
+    log = options.get('log', print)
+    workers = [None] * processes
+    started = [0.0] * processes
+    failures = [0] * processes
+    restart_at = [0.0] * processes
+    try:
+        while True:
+            now = time.monotonic()
+            for index, worker in enumerate(workers):
+                if worker is not None:
+                    if worker.is_alive():
+                        continue
+                    failures[index] = 0 if now - started[index] >= HEALTHY_RUN else failures[index] + 1
+                    delay = min(backoff(failures[index]), MAX_RESTART_DELAY) if failures[index] else 0
+                    restart_at[index] = now + delay
+                    log(f"Job worker {worker.pid} exited with code {worker.exitcode}, restarting in {delay}s")
+                    workers[index] = None
+                if now >= restart_at[index]:
+                    worker = multiprocessing.Process(target=work, args=(connect, handlers), kwargs=options,
+                                                     daemon=True)
+                    worker.start()
+                    workers[index] = worker
+                    started[index] = now
+            time.sleep(SUPERVISE_INTERVAL)
+    except KeyboardInterrupt:
+        for worker in workers:
+            if worker is not None:
+                worker.terminate()
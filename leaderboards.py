@@ -0,0 +1,244 @@
+import bisect
+import heapq
+import threading
+import time
+from datetime import date, timedelta
+
+# Board name -> days of OrderItem sales it covers (None: all time, from Product.Demand)
+WINDOWS = {'all': None, '7d': 7, '30d': 30}
+
+# SalesBucket rows older than the longest window are no longer needed
+BUCKET_RETENTION_DAYS = max(days for days in WINDOWS.values() if days)
+
+# Entries kept per board
+TOP_K = 20
+
+# Buckets are polled from slightly before the last poll, so an order
+# committed after its bucket's UpdatedAt was stamped is not missed; the
+# totals it re-reads are absolute, so seeing a change twice is harmless
+POLL_OVERLAP_SECONDS = 60
+
+PRODUCT_COLUMNS = ('ProductID', 'ProductName', 'Category', 'Price', 'ImageURL', 'Rating', 'Quantity')
+
+
+def record_sales(cursor, order_id):
+    """Add an order's quantities to today's SalesBucket counters, in the caller's transaction"""
+    cursor.execute("""
+        INSERT INTO SalesBucket (Day, ProductID, Units)
+        SELECT DATE(o.OrderDate), oi.ProductID, oi.Quantity
+        FROM OrderItem oi
+        JOIN `Order` o ON oi.OrderID = o.OrderID
+        WHERE oi.OrderID = %s
+        ON DUPLICATE KEY UPDATE Units = SalesBucket.Units + VALUES(Units)
+    """, (order_id,))
+
+
+def purge_buckets(cursor, days=BUCKET_RETENTION_DAYS):
+    """Delete buckets older than every window; returns the number removed"""
+    cursor.execute("DELETE FROM SalesBucket WHERE Day < CURDATE() - INTERVAL %s DAY", (days,))
+    return cursor.rowcount
+
+
+def load_totals(cursor, since=None):
+    """Current totals for the leaderboards (`cursor` is a DictCursor)
+
+    since -- only products whose buckets changed after this time; None
+             loads every product
+
+    Returns (day, watermark, products, totals): the database's date and
+    time when the read started, {ProductID: row} and
+    {window: {ProductID: units}}. Totals are summed in SQL, nothing is
+    sorted.
+    """
+    cursor.execute("SELECT CURDATE() AS Today, NOW(6) AS Now")
+    row = cursor.fetchone()
+    day, watermark = row['Today'], row['Now']
+
+    if since is None:
+        product_filter, params = '', []
+        cursor.execute(f"SELECT {', '.join(PRODUCT_COLUMNS)}, Demand FROM Product WHERE Demand > 0")
+    else:
+        cursor.execute("SELECT DISTINCT ProductID FROM SalesBucket WHERE UpdatedAt > %s", (since,))
+        params = [row['ProductID'] for row in cursor.fetchall()]
+        if not params:
+            return day, watermark, {}, {window: {} for window in WINDOWS}
+        placeholders = ', '.join(['%s'] * len(params))
+        product_filter = f"AND ProductID IN ({placeholders})"
+        cursor.execute(f"""
+            SELECT {', '.join(PRODUCT_COLUMNS)}, Demand FROM Product
+            WHERE ProductID IN ({placeholders})
+        """, params)
+    products = {row['ProductID']: row for row in cursor.fetchall()}
+    totals = {'all': {product_id: row.pop('Demand') for product_id, row in products.items()}}
+
+    windowed = [(window, days) for window, days in WINDOWS.items() if days]
+    sums = ', '.join(
+        f"SUM(CASE WHEN Day > CURDATE() - INTERVAL {days} DAY THEN Units ELSE 0 END) AS `{window}`"
+        for window, days in windowed
+    )
+    cursor.execute(f"""
+        SELECT ProductID, {sums} FROM SalesBucket
+        WHERE Day > CURDATE() - INTERVAL %s DAY {product_filter}
+        GROUP BY ProductID
+    """, [BUCKET_RETENTION_DAYS, *params])
+    rows = cursor.fetchall()
+    for window, _ in windowed:
+        totals[window] = {row['ProductID']: int(row[window] or 0) for row in rows}
+
+    # Products sold in a window without any all-time Demand recorded
+    missing = sorted({row['ProductID'] for row in rows} - set(products))
+    if missing:
+        cursor.execute(f"""
+            SELECT {', '.join(PRODUCT_COLUMNS)} FROM Product
+            WHERE ProductID IN ({', '.join(['%s'] * len(missing))})
+        """, missing)
+        products.update((row['ProductID'], row) for row in cursor.fetchall())
+    for window_totals in totals.values():
+        for product_id in [product_id for product_id in window_totals if product_id not in products]:
+            del window_totals[product_id]
+    return day, watermark, products, totals
+
+
+class TopK:
+    """The K best-selling products of one board, best first
+
+    Entries are kept sorted as (-units, ProductID), so ties go to the lower
+    ProductID. Updates are O(K) and assume units only grow between
+    rebuilds, which holds for the counters (rolling windows shrink only
+    when the day changes, and that triggers a rebuild).
+    """
+
+    def __init__(self, k, totals=()):
+        self.k = k
+        self._entries = heapq.nsmallest(k, ((-units, product_id) for product_id, units in totals if units > 0))
+
+    def update(self, product_id, units):
+        entries = self._entries
+        for index, (_, entry_id) in enumerate(entries):
+            if entry_id == product_id:
+                del entries[index]
+                break
+        if units > 0:
+            bisect.insort(entries, (-units, product_id))
+            del entries[self.k:]
+
+    def __iter__(self):
+        for negative_units, product_id in self._entries:
+            yield product_id, -negative_units
+
+
+class Leaderboards:
+    """In-memory best-seller boards, overall and per category, for every window
+
+    A full rebuild reads every product's totals (at startup, every max_age
+    seconds and when the date changes); in between, refresh() re-reads only
+    the products whose buckets changed and updates the boards in O(K) per
+    product. Reads never touch the database or sort the catalog.
+    """
+
+    def __init__(self, k=TOP_K, max_age=600, poll_interval=30):
+        self.k = k
+        self.max_age = max_age
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._boards = {}  # (window, category or None) -> TopK
+        self._products = {}  # ProductID -> product row
+        self._day = None  # database date the windows were computed for
+        self._built_on = None  # local date of the last rebuild
+        self._watermark = None
+        self._built_at = None
+        self._polled_at = None
+
+    def is_stale(self):
+        """True if the boards were never built, are older than max_age or are from another day"""
+        return (self._built_at is None or time.monotonic() - self._built_at > self.max_age
+                or self._built_on != date.today())
+
+    def expire(self):
+        """Rebuild on the next refresh(), e.g. after products were renamed or recategorised"""
+        with self._lock:
+            if self._built_at is not None:
+                self._built_at = float('-inf')
+
+    def refresh(self, load):
+        """Rebuild or poll from `load(since)` (load_totals with a cursor) when due
+
+        Only one thread refreshes at a time; once the boards exist, other
+        threads keep reading the current ones instead of waiting.
+        """
+        due_poll = self._polled_at is None or time.monotonic() - self._polled_at > self.poll_interval
+        if not self.is_stale() and not due_poll:
+            return
+        if not self._refresh_lock.acquire(blocking=self._built_at is None):
+            return
+        try:
+            if self.is_stale():
+                self.rebuild(*load(None))
+            elif self._polled_at is None or time.monotonic() - self._polled_at > self.poll_interval:
+                self.apply(*load(self._watermark - timedelta(seconds=POLL_OVERLAP_SECONDS)))
+        finally:
+            self._refresh_lock.release()
+
+    def rebuild(self, day, watermark, products, totals):
+        """Replace every board with the top K of `totals`"""
+        boards = {}
+        for window, window_totals in totals.items():
+            boards[window, None] = TopK(self.k, window_totals.items())
+            by_category = {}
+            for product_id, units in window_totals.items():
+                by_category.setdefault(products[product_id]['Category'], []).append((product_id, units))
+            for category, category_totals in by_category.items():
+                boards[window, category] = TopK(self.k, category_totals)
+
+        with self._lock:
+            self._boards = boards
+            self._products = products
+            self._day = day
+            self._built_on = date.today()
+            self._watermark = watermark
+            self._built_at = self._polled_at = time.monotonic()
+
+    def apply(self, day, watermark, products, totals):
+        """Update the boards with fresh totals for the products that changed"""
+        if day != self._day:
+            # Rolling windows moved; only a rebuild can drop expired sales
+            self.expire()
+            return
+        with self._lock:
+            for product_id, row in products.items():
+                known = self._products.get(product_id)
+                if known is not None and known['Category'] != row['Category']:
+                    # A move between categories could leave a gap; rebuild instead
+                    self._built_at = float('-inf')
+                self._products[product_id] = row
+                for window, window_totals in totals.items():
+                    units = window_totals.get(product_id, 0)
+                    for key in ((window, None), (window, row['Category'])):
+                        board = self._boards.get(key)
+                        if board is None:
+                            board = self._boards[key] = TopK(self.k)
+                        board.update(product_id, units)
+            self._watermark = watermark
+            self._polled_at = time.monotonic()
+
+    def top(self, window='7d', category=None, limit=None):
+        """Best sellers of a board: product rows with `Units` and `Rank`, best first"""
+        if window not in WINDOWS:
+            raise ValueError(f"Unknown window '{window}'")
+        with self._lock:
+            board = self._boards.get((window, category or None))
+            if board is None:
+                return []
+            entries = list(board)[:limit or self.k]
+            return [
+                dict(self._products[product_id], Units=units, Rank=rank)
+                for rank, (product_id, units) in enumerate(entries, 1)
+            ]
+
+    def categories(self, window='all'):
+        """Categories with at least one sale in `window`"""
+        with self._lock:
+            return sorted(category for board_window, category in self._boards
+                          if board_window == window and category is not None)
@@ -0,0 +1,244 @@
+import bisect
+import re
+import threading
+import time
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Upper bounds of the queries-per-request histogram buckets
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_VALUES_LIST_RE = re.compile(r'(\(\?(?:, \?)*\))(?:\s*,\s*\1)+')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """Reduce a statement to its shape so repeats of one query group together
+
+    Literals and placeholders become ?, IN (...) lists and multi-row
+    VALUES collapse to a single (...), whitespace is squeezed.
+    """
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    sql = _STRING_RE.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _WHITESPACE_RE.sub(' ', sql).strip()
+    sql = _IN_LIST_RE.sub('(...)', sql)
+    return _VALUES_LIST_RE.sub(r'\1', sql)
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observed values"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestStats:
+    """Database and template work done while serving one request"""
+
+    __slots__ = ('started', 'queries', 'sql_seconds', 'rows', 'templates', 'render_seconds', 'render_started',
+                 'status')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.rows = 0
+        self.templates = 0
+        self.render_seconds = 0.0
+        self.render_started = None
+        self.status = None
+
+
+class MetricsRegistry:
+    """Thread-safe per-process request metrics in Prometheus text format
+
+    Requests only touch the shared state once, when they finish, so the
+    cost per query is a couple of perf_counter() calls.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = {}  # (route, method, status) -> count
+        self._routes = {}  # route -> per-route totals and histograms
+        self.slow_queries = 0
+
+    def _route(self, route):
+        # Caller must hold the lock
+        entry = self._routes.get(route)
+        if entry is None:
+            entry = self._routes[route] = {
+                'duration': Histogram(LATENCY_BUCKETS),
+                'sql': Histogram(LATENCY_BUCKETS),
+                'render': Histogram(LATENCY_BUCKETS),
+                'queries': Histogram(QUERY_COUNT_BUCKETS),
+                'rows': 0,
+            }
+        return entry
+
+    def record_request(self, route, method, stats):
+        """Fold one finished request into the totals"""
+        duration = time.perf_counter() - stats.started
+        key = (route, method, str(stats.status or 0))
+        with self._lock:
+            self._requests[key] = self._requests.get(key, 0) + 1
+            entry = self._route(route)
+            entry['duration'].observe(duration)
+            entry['sql'].observe(stats.sql_seconds)
+            entry['queries'].observe(stats.queries)
+            entry['rows'] += stats.rows
+            if stats.templates:
+                entry['render'].observe(stats.render_seconds)
+
+    def record_slow_query(self):
+        with self._lock:
+            self.slow_queries += 1
+
+    def render(self, gauges=None):
+        """Prometheus exposition text; `gauges` adds {name: (help, value)} samples"""
+        lines = []
+        with self._lock:
+            lines += [
+                '# HELP http_requests_total Requests served, by route, method and status',
+                '# TYPE http_requests_total counter',
+            ]
+            for (route, method, status), count in sorted(self._requests.items()):
+                lines.append(f'http_requests_total{{route="{_escape(route)}",method="{method}",status="{status}"}} {count}')
+
+            histograms = (
+                ('http_request_duration_seconds', 'duration', 'Request latency'),
+                ('db_request_query_seconds', 'sql', 'Time spent in SQL per request'),
+                ('db_request_queries', 'queries', 'SQL statements per request'),
+                ('template_render_seconds', 'render', 'Template rendering time per request'),
+            )
+            for name, field, help_text in histograms:
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for route, entry in sorted(self._routes.items()):
+                    histogram = entry[field]
+                    if histogram.count:
+                        lines += _histogram_lines(name, f'route="{_escape(route)}"', histogram)
+
+            lines += ['# HELP db_rows_fetched_total Rows fetched from the database', '# TYPE db_rows_fetched_total counter']
+            for route, entry in sorted(self._routes.items()):
+                lines.append(f'db_rows_fetched_total{{route="{_escape(route)}"}} {entry["rows"]}')
+
+            lines += [
+                '# HELP db_slow_queries_total Statements slower than the slow query threshold',
+                '# TYPE db_slow_queries_total counter',
+                f'db_slow_queries_total {self.slow_queries}',
+            ]
+
+        for name, (help_text, value) in sorted((gauges or {}).items()):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} gauge', f'{name} {value}']
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _histogram_lines(name, labels, histogram):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_sum{{{labels}}} {histogram.sum:.6f}')
+    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+    return lines
+
+
+class InstrumentedCursor:
+    """Cursor wrapper that times statements and counts fetched rows
+
+    on_query(sql, seconds, rows) is called after every execute() and
+    executemany(); fetch time (which is where server-side cursors do their
+    reading) is added to the request's SQL time as well.
+    """
+
+    def __init__(self, cursor, stats, on_query):
+        self._cursor = cursor
+        self._stats = stats
+        self._on_query = on_query
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(query, args)
+        finally:
+            self._finish(query, started)
+
+    def executemany(self, query, args):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, args)
+        finally:
+            self._finish(query, started)
+
+    def _finish(self, query, started):
+        seconds = time.perf_counter() - started
+        self._stats.queries += 1
+        self._stats.sql_seconds += seconds
+        self._on_query(query, seconds, self._cursor.rowcount)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._stats.sql_seconds += time.perf_counter() - started
+        if row is not None:
+            self._stats.rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany()
+        self._stats.sql_seconds += time.perf_counter() - started
+        self._stats.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._stats.sql_seconds += time.perf_counter() - started
+        self._stats.rows += len(rows)
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    """Connection wrapper whose cursors report to a RequestStats"""
+
+    def __init__(self, connection, stats, on_query):
+        self._connection = connection
+        self._stats = stats
+        self._on_query = on_query
+
+    def cursor(self, *args):
+        return InstrumentedCursor(self._connection.cursor(*args), self._stats, self._on_query)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
@@ -0,0 +1,173 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(values):
+    """Encode sort-key values as an opaque URL-safe cursor"""
+    encoded = []
+    for value in values:
+        if isinstance(value, datetime):
+            value = {'dt': value.isoformat()}
+        elif isinstance(value, date):
+            value = {'d': value.isoformat()}
+        encoded.append(value)
+    raw = json.dumps(encoded, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a cursor from encode_cursor(), or None if it is malformed"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(values, list):
+        return None
+
+    decoded = []
+    for value in values:
+        if isinstance(value, dict):
+            try:
+                if 'dt' in value:
+                    value = datetime.fromisoformat(value['dt'])
+                elif 'd' in value:
+                    value = date.fromisoformat(value['d'])
+                else:
+                    return None
+            except (TypeError, ValueError):
+                return None
+        decoded.append(value)
+    return decoded
+
+
+class PageRequest:
+    """Requested page: rows after or before a cursor, at most `size` of them"""
+
+    def __init__(self, after=None, before=None, size=DEFAULT_PAGE_SIZE):
+        self.after = after
+        self.before = before if after is None else None
+        self.size = size
+
+    @classmethod
+    def from_args(cls, args, default_size=DEFAULT_PAGE_SIZE):
+        """Build from ?after=, ?before= and ?limit= query arguments"""
+        try:
+            size = int(args.get('limit', default_size))
+        except (TypeError, ValueError):
+            size = default_size
+        size = max(1, min(size, MAX_PAGE_SIZE))
+        return cls(decode_cursor(args.get('after')), decode_cursor(args.get('before')), size)
+
+    def cache_key(self):
+        return (
+            tuple(self.after) if self.after is not None else None,
+            tuple(self.before) if self.before is not None else None,
+            self.size,
+        )
+
+
+class Page:
+    """One page of rows plus the cursors of its neighbours"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+    def cursors(self):
+        return {'next_cursor': self.next_cursor, 'prev_cursor': self.prev_cursor}
+
+
+def _keyset_condition(columns, values, op):
+    # (a, b) > (x, y)  ==>  (a > x) OR (a = x AND b > y), which MySQL can
+    # answer with a range scan on a matching composite index
+    clauses = []
+    params = []
+    for position, column in enumerate(columns):
+        parts = [f'{previous} = %s' for previous in columns[:position]]
+        parts.append(f'{column} {op} %s')
+        clauses.append('(' + ' AND '.join(parts) + ')')
+        params.extend(values[:position + 1])
+    return '(' + ' OR '.join(clauses) + ')', params
+
+
+def fetch_page(cursor, query, params, order, page, descending=False, suffix=''):
+    """Run `query` for one keyset page of dict rows
+
+    query      -- SELECT ending in a WHERE clause (use WHERE 1=1 if unfiltered)
+    order      -- [(sql_column, row_key), ...] that together form a unique sort key
+    descending -- sort direction of the whole key
+    suffix     -- SQL placed before ORDER BY, e.g. a GROUP BY clause
+    """
+    columns = [column for column, _ in order]
+    keys = [key for _, key in order]
+    backwards = page.before is not None
+    boundary = page.before if backwards else page.after
+    params = list(params)
+
+    if boundary is not None and len(boundary) == len(columns):
+        op = '<' if descending != backwards else '>'
+        condition, condition_params = _keyset_condition(columns, boundary, op)
+        query += ' AND ' + condition
+        params.extend(condition_params)
+    else:
+        boundary = None
+        backwards = False
+
+    direction = 'DESC' if descending != backwards else 'ASC'
+    query += f" {suffix} ORDER BY {', '.join(f'{column} {direction}' for column in columns)} LIMIT %s"
+    params.append(page.size + 1)
+
+    cursor.execute(query, params)
+    rows = list(cursor.fetchall())
+    has_more = len(rows) > page.size
+    rows = rows[:page.size]
+    if backwards:
+        rows.reverse()
+
+    def key_of(row):
+        return encode_cursor([row[key] for key in keys])
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if backwards:
+            prev_cursor = key_of(rows[0]) if has_more else None
+            next_cursor = key_of(rows[-1])
+        else:
+            next_cursor = key_of(rows[-1]) if has_more else None
+            prev_cursor = key_of(rows[0]) if boundary is not None else None
+    return Page(rows, next_cursor, prev_cursor)
+
+
+def slice_page(ranked, page):
+    """Page through an already ordered in-memory list, using positions as cursors"""
+    if page.before and isinstance(page.before[0], int):
+        end = max(0, page.before[0])
+        start = max(0, end - page.size)
+    elif page.after and isinstance(page.after[0], int):
+        start = page.after[0] + 1
+        end = start + page.size
+    else:
+        start, end = 0, page.size
+
+    items = ranked[start:end]
+    next_cursor = encode_cursor([end - 1]) if items and end < len(ranked) else None
+    prev_cursor = encode_cursor([start]) if items and start > 0 else None
+    return Page(items, next_cursor, prev_cursor)
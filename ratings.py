@@ -0,0 +1,89 @@
+STAR_COLUMNS = ['Stars1', 'Stars2', 'Stars3', 'Stars4', 'Stars5']
+AGGREGATE_COLUMNS = ['RatingSum', 'RatingCount'] + STAR_COLUMNS
+
+# Product.Rating is a copy of the average kept for the catalog listings
+SYNC_PRODUCT_RATING = """
+    UPDATE Product p
+    JOIN ProductRating pr ON p.ProductID = pr.ProductID
+    SET p.Rating = CASE WHEN pr.RatingCount > 0 THEN ROUND(pr.RatingSum / pr.RatingCount, 2) ELSE 0 END
+"""
+
+
+def apply_rating(cursor, product_id, added=None, removed=None):
+    """Adjust a product's aggregate inside the caller's transaction
+
+    Insert: added=rating. Delete: removed=rating. Edit: both.
+    """
+    deltas = dict.fromkeys(AGGREGATE_COLUMNS, 0)
+    for rating, sign in ((added, 1), (removed, -1)):
+        if rating is None:
+            continue
+        rating = int(rating)
+        deltas['RatingSum'] += sign * rating
+        deltas['RatingCount'] += sign
+        deltas[STAR_COLUMNS[rating - 1]] += sign
+    if not any(deltas.values()):
+        return
+
+    assignments = ', '.join(f'{column} = {column} + VALUES({column})' for column in AGGREGATE_COLUMNS)
+    cursor.execute(f"""
+        INSERT INTO ProductRating (ProductID, {', '.join(AGGREGATE_COLUMNS)})
+        VALUES (%s, {', '.join(['%s'] * len(AGGREGATE_COLUMNS))})
+        ON DUPLICATE KEY UPDATE {assignments}
+    """, [product_id] + list(deltas.values()))
+    cursor.execute(SYNC_PRODUCT_RATING + " WHERE p.ProductID = %s", (product_id,))
+
+
+def read_rating(cursor, product_id):
+    """Average, count and star distribution for one product from its aggregate"""
+    cursor.execute(f"""
+        SELECT {', '.join(AGGREGATE_COLUMNS)} FROM ProductRating WHERE ProductID = %s
+    """, (product_id,))
+    row = cursor.fetchone() or (0,) * len(AGGREGATE_COLUMNS)
+    rating_sum, rating_count = row[0], row[1]
+    return {
+        'avg_rating': round(rating_sum / rating_count, 1) if rating_count else 0,
+        'review_count': rating_count,
+        'distribution': {str(stars): count for stars, count in enumerate(row[2:], start=1)}
+    }
+
+
+def backfill_ratings(connection, batch_size=500, log=print):
+    """Recompute every product's aggregate from Review, one ProductID range per transaction
+
+    Each batch is a short transaction of its own, so it can run while the
+    store is live. Returns the number of products processed.
+    """
+    cursor = connection.cursor()
+    star_sums = ', '.join(f'COALESCE(SUM(r.Rating = {stars}), 0)' for stars in range(1, 6))
+    assignments = ', '.join(f'{column} = VALUES({column})' for column in AGGREGATE_COLUMNS)
+
+    last_id = 0
+    processed = 0
+    while True:
+        cursor.execute("""
+            SELECT ProductID FROM Product WHERE ProductID > %s ORDER BY ProductID LIMIT %s
+        """, (last_id, batch_size))
+        product_ids = [row[0] for row in cursor.fetchall()]
+        if not product_ids:
+            break
+        first_id, last_id = product_ids[0], product_ids[-1]
+
+        # Products without reviews get an all-zero row from the LEFT JOIN
+        cursor.execute(f"""
+            INSERT INTO ProductRating (ProductID, {', '.join(AGGREGATE_COLUMNS)})
+            SELECT p.ProductID, COALESCE(SUM(r.Rating), 0), COUNT(r.ReviewID), {star_sums}
+            FROM Product p
+            LEFT JOIN Review r ON r.ProductID = p.ProductID
+            WHERE p.ProductID BETWEEN %s AND %s
+            GROUP BY p.ProductID
+            ON DUPLICATE KEY UPDATE {assignments}
+        """, (first_id, last_id))
+        cursor.execute(SYNC_PRODUCT_RATING + " WHERE p.ProductID BETWEEN %s AND %s", (first_id, last_id))
+        connection.commit()
+
+        processed += len(product_ids)
+        log(f"Backfilled ratings for {processed} product(s)")
+
+    cursor.close()
+    return processed
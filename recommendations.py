@@ -0,0 +1,279 @@
+import math
+from collections import Counter
+
+from validators import bump_versions
+
+# Optional accelerator: NumPy and SciPy compute the similarities with sparse
+# matrix products. Without them the co-purchases are counted in Python and
+# the neighbour lists are identical.
+try:
+    import numpy
+    from scipy import sparse
+except ImportError:
+    numpy = sparse = None
+
+# Neighbours stored per product (ProductNeighbour.Position is a TINYINT)
+TOP_K = 10
+
+# Products need this many shared buyers to be listed as neighbours
+MIN_CO_PURCHASES = 1
+
+# Products whose lists are computed and written per transaction
+BLOCK_PRODUCTS = 1000
+
+
+class PurchaseMatrix:
+    """Binary customer x product purchase matrix
+
+    pairs         -- (customer id, product id) for every product a customer bought
+    buyer_counts  -- {product id: buyers} over all customers; defaults to the
+                     counts in `pairs`, pass it when `pairs` is only the
+                     customers relevant to the products being computed
+    """
+
+    def __init__(self, pairs, buyer_counts=None):
+        baskets = {}
+        for customer_id, product_id in pairs:
+            baskets.setdefault(customer_id, set()).add(product_id)
+        self.baskets = baskets
+        self.buyers = {}
+        for customer_id, products in baskets.items():
+            for product_id in products:
+                self.buyers.setdefault(product_id, []).append(customer_id)
+        self.buyer_counts = buyer_counts or {product_id: len(customers) for product_id, customers in self.buyers.items()}
+        self.products = sorted(set(self.buyers) | set(self.buyer_counts))
+
+        if sparse is not None:
+            self._column = {product_id: column for column, product_id in enumerate(self.products)}
+            rows, columns = [], []
+            for row, products in enumerate(baskets.values()):
+                rows.extend([row] * len(products))
+                columns.extend(self._column[product_id] for product_id in products)
+            self._matrix = sparse.csc_matrix(
+                (numpy.ones(len(rows)), (rows, columns)), shape=(len(baskets), len(self.products))
+            )
+            self._ids = numpy.array(self.products, dtype=numpy.int64)
+            self._counts = numpy.array([self.buyer_counts.get(product_id, 0) for product_id in self.products],
+                                       dtype=numpy.float64)
+
+    def neighbours(self, product_ids, k=TOP_K, min_co_purchases=MIN_CO_PURCHASES):
+        """{product id: [(neighbour id, score, co-purchases)]}, best first
+
+        Score is the cosine similarity of the two products' buyer sets:
+        shared buyers / sqrt(buyers of one * buyers of the other). Ties go
+        to the lower ProductID.
+        """
+        known = [product_id for product_id in product_ids if product_id in self.buyers]
+        result = {product_id: [] for product_id in product_ids}
+        if known:
+            compute = self._neighbours_sparse if sparse is not None else self._neighbours_python
+            result.update(compute(known, k, min_co_purchases))
+        return result
+
+    def _neighbours_python(self, product_ids, k, min_co_purchases):
+        result = {}
+        for product_id in product_ids:
+            shared = Counter()
+            for customer_id in self.buyers[product_id]:
+                shared.update(self.baskets[customer_id])
+            del shared[product_id]
+            own = self.buyer_counts[product_id]
+            scored = [
+                (count / math.sqrt(own * self.buyer_counts[other]), other, count)
+                for other, count in shared.items() if count >= min_co_purchases
+            ]
+            scored.sort(key=lambda item: (-item[0], item[1]))
+            result[product_id] = [(other, score, count) for score, other, count in scored[:k]]
+        return result
+
+    def _neighbours_sparse(self, product_ids, k, min_co_purchases):
+        columns = numpy.array([self._column[product_id] for product_id in product_ids])
+        # Shared buyers of each requested product with every product
+        shared = (self._matrix[:, columns].T.tocsr() @ self._matrix.tocsr()).tocsr()
+        shared.sort_indices()
+        lengths = numpy.diff(shared.indptr)
+        own = numpy.repeat(self._counts[columns], lengths)
+        scores = shared.data / numpy.sqrt(own * self._counts[shared.indices])
+
+        result = {}
+        for row, product_id in enumerate(product_ids):
+            start, end = shared.indptr[row], shared.indptr[row + 1]
+            others = shared.indices[start:end]
+            counts = shared.data[start:end]
+            row_scores = scores[start:end]
+            keep = (others != columns[row]) & (counts >= min_co_purchases)
+            others, counts, row_scores = others[keep], counts[keep], row_scores[keep]
+            if len(others) > k:
+                # Everything scoring at least the k-th best, ties included
+                threshold = numpy.partition(row_scores, len(row_scores) - k)[len(row_scores) - k]
+                keep = row_scores >= threshold
+                others, counts, row_scores = others[keep], counts[keep], row_scores[keep]
+            order = numpy.lexsort((self._ids[others], -row_scores))[:k]
+            result[product_id] = [
+                (int(self._ids[others[i]]), float(row_scores[i]), int(counts[i])) for i in order
+            ]
+        return result
+
+
+def record_purchases(cursor, order_id):
+    """Bring an order's share of its customer's Ranking rows up to date
+
+    An order counts unless it is cancelled. OrderPurchaseState records
+    whether it is counted, so running this twice changes nothing and a
+    cancellation takes back exactly what was added. The order is locked
+    while it is read. The caller commits. Returns True if Ranking changed.
+    """
+    cursor.execute("""
+        SELECT o.OrderStatus, s.OrderID IS NOT NULL
+        FROM `Order` o
+        LEFT JOIN OrderPurchaseState s ON o.OrderID = s.OrderID
+        WHERE o.OrderID = %s
+        FOR UPDATE
+    """, (order_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return False
+    counts = row[0] != 'Cancelled'
+    if counts == bool(row[1]):
+        return False
+
+    cursor.execute("""
+        INSERT INTO Ranking (CustomerID, ProductID, Quantity)
+        SELECT o.CustomerID, oi.ProductID, %s * oi.Quantity
+        FROM OrderItem oi
+        JOIN `Order` o ON oi.OrderID = o.OrderID
+        WHERE oi.OrderID = %s
+        ON DUPLICATE KEY UPDATE Quantity = Ranking.Quantity + VALUES(Quantity)
+    """, (1 if counts else -1, order_id))
+    if counts:
+        cursor.execute("INSERT INTO OrderPurchaseState (OrderID) VALUES (%s)", (order_id,))
+    else:
+        cursor.execute("DELETE FROM OrderPurchaseState WHERE OrderID = %s", (order_id,))
+    # Every product this customer bought now has different shared buyers,
+    # including the ones the order took them out of
+    cursor.execute("""
+        INSERT INTO RecommendationStale (ProductID)
+        SELECT r.ProductID
+        FROM Ranking r
+        JOIN `Order` o ON r.CustomerID = o.CustomerID
+        WHERE o.OrderID = %s
+        ON DUPLICATE KEY UPDATE MarkedAt = CURRENT_TIMESTAMP(6)
+    """, (order_id,))
+    return True
+
+
+def _load_matrix(cursor, product_ids=None):
+    """PurchaseMatrix of every buyer, or only the buyers of `product_ids`"""
+    if product_ids is None:
+        cursor.execute("SELECT CustomerID, ProductID FROM Ranking WHERE Quantity > 0")
+        return PurchaseMatrix(cursor.fetchall())
+
+    cursor.execute(f"""
+        SELECT r.CustomerID, r.ProductID
+        FROM Ranking r
+        JOIN (
+            SELECT DISTINCT CustomerID FROM Ranking
+            WHERE ProductID IN ({', '.join(['%s'] * len(product_ids))}) AND Quantity > 0
+        ) b ON r.CustomerID = b.CustomerID
+        WHERE r.Quantity > 0
+    """, product_ids)
+    pairs = cursor.fetchall()
+    cursor.execute("SELECT ProductID, COUNT(*) FROM Ranking WHERE Quantity > 0 GROUP BY ProductID")
+    return PurchaseMatrix(pairs, dict(cursor.fetchall()))
+
+
+def _write_neighbours(cursor, neighbours):
+    """Replace the stored lists of a block of products; returns the ids whose list changed"""
+    product_ids = sorted(neighbours)
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    cursor.execute(f"""
+        SELECT ProductID, NeighbourID FROM ProductNeighbour
+        WHERE ProductID IN ({placeholders})
+        ORDER BY ProductID, Position
+    """, product_ids)
+    stored = {}
+    for product_id, other in cursor.fetchall():
+        stored.setdefault(product_id, []).append(other)
+    changed = [
+        product_id for product_id in product_ids
+        if stored.get(product_id, []) != [other for other, _, _ in neighbours[product_id]]
+    ]
+    cursor.execute(f"""
+        DELETE FROM ProductNeighbour
+        WHERE ProductID IN ({placeholders})
+    """, product_ids)
+    rows = [
+        (product_id, position, other, score, count)
+        for product_id in product_ids
+        for position, (other, score, count) in enumerate(neighbours[product_id], 1)
+    ]
+    if rows:
+        cursor.executemany("""
+            INSERT INTO ProductNeighbour (ProductID, Position, NeighbourID, Score, CoPurchases)
+            VALUES (%s, %s, %s, %s, %s)
+        """, rows)
+    # Product pages embed the list; only the catalog listing is unaffected
+    bump_versions(cursor, changed)
+    return changed
+
+
+def refresh_neighbours(connection, full=False, k=TOP_K, log=None):
+    """Recompute neighbour lists for stale products, or for every product if `full`
+
+    An incremental refresh only loads the baskets of the stale products'
+    buyers. Lists of other products still shift slightly as buyer counts
+    grow; a periodic full refresh picks that up. Lists are written
+    BLOCK_PRODUCTS at a time, one transaction each, and stale marks made
+    while the refresh runs are kept for the next one. Returns the number
+    of products refreshed.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT NOW(6)")
+        started = cursor.fetchone()[0]
+        if full:
+            matrix = _load_matrix(cursor)
+            targets = matrix.products
+        else:
+            cursor.execute("SELECT ProductID FROM RecommendationStale WHERE MarkedAt <= %s ORDER BY ProductID",
+                           (started,))
+            targets = [row[0] for row in cursor.fetchall()]
+            if not targets:
+                return 0
+            matrix = _load_matrix(cursor, targets)
+
+        for start in range(0, len(targets), BLOCK_PRODUCTS):
+            block = targets[start:start + BLOCK_PRODUCTS]
+            changed = _write_neighbours(cursor, matrix.neighbours(block, k))
+            connection.commit()
+            if log:
+                log(f"Refreshed {start + len(block)} of {len(targets)} product(s), {len(changed)} list(s) changed")
+
+        if full:
+            # Products nobody has bought any more
+            cursor.execute("""
+                DELETE FROM ProductNeighbour
+                WHERE ProductID NOT IN (SELECT ProductID FROM Ranking WHERE Quantity > 0)
+            """)
+        cursor.execute("DELETE FROM RecommendationStale WHERE MarkedAt <= %s", (started,))
+        connection.commit()
+        return len(targets)
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def load_neighbours(cursor, product_id, limit=TOP_K):
+    """Stored neighbours of a product, best first (`cursor` is a DictCursor)"""
+    cursor.execute("""
+        SELECT p.ProductID, p.ProductName, p.Category, p.Price, p.ImageURL, p.Rating,
+               n.Score, n.CoPurchases
+        FROM ProductNeighbour n
+        JOIN Product p ON n.NeighbourID = p.ProductID
+        WHERE n.ProductID = %s
+        ORDER BY n.Position
+        LIMIT %s
+    """, (product_id, limit))
+    return list(cursor.fetchall())
@@ -0,0 +1,175 @@
+import heapq
+import re
+
+from dispatch import CLOSED_STATUSES, order_location, parse_address
+
+# Minutes assumed between two areas the adjacency table cannot connect
+SAME_DISTRICT_MINUTES = 30
+OTHER_DISTRICT_MINUTES = 90
+
+# 2-opt passes over the stop order; each pass is O(stops^2)
+MAX_IMPROVEMENT_PASSES = 20
+
+_DIGITS_RE = re.compile(r'(\d+)')
+
+
+class AreaGraph:
+    """Travel minutes between areas, from the AreaAdjacency table
+
+    Neighbouring areas are edges; any other pair costs the shortest chain
+    of edges, computed on demand and remembered per source area.
+    """
+
+    def __init__(self, edges):
+        self._neighbours = {}
+        for area_a, area_b, minutes in edges:
+            area_a, area_b = area_a.strip().lower(), area_b.strip().lower()
+            for source, target in ((area_a, area_b), (area_b, area_a)):
+                neighbours = self._neighbours.setdefault(source, {})
+                neighbours[target] = min(minutes, neighbours.get(target, minutes))
+        self._shortest = {}  # source area -> {area: minutes}
+
+    def distances_from(self, source):
+        """Shortest travel minutes from `source` to every reachable area"""
+        distances = self._shortest.get(source)
+        if distances is None:
+            distances = {source: 0}
+            queue = [(0, source)]
+            while queue:
+                minutes, area = heapq.heappop(queue)
+                if minutes > distances.get(area, minutes):
+                    continue
+                for neighbour, step in self._neighbours.get(area, {}).items():
+                    total = minutes + step
+                    if total < distances.get(neighbour, total + 1):
+                        distances[neighbour] = total
+                        heapq.heappush(queue, (total, neighbour))
+            self._shortest[source] = distances
+        return distances
+
+    def minutes(self, a, b):
+        """Travel minutes between two (area, district) locations"""
+        if a == b:
+            return 0
+        if a[0] is not None and b[0] is not None:
+            known = self.distances_from(a[0]).get(b[0])
+            if known is not None:
+                return known
+        return SAME_DISTRICT_MINUTES if a[1] == b[1] else OTHER_DISTRICT_MINUTES
+
+
+def load_area_graph(cursor):
+    """AreaGraph of the AreaAdjacency table (`cursor` is a DictCursor)"""
+    cursor.execute("SELECT AreaA, AreaB, Minutes FROM AreaAdjacency")
+    return AreaGraph([(row['AreaA'], row['AreaB'], row['Minutes']) for row in cursor.fetchall()])
+
+
+def load_open_orders(cursor, rider_id):
+    """A rider's undelivered orders and home (area, district) (`cursor` is a DictCursor)"""
+    closed = ', '.join(['%s'] * len(CLOSED_STATUSES))
+    cursor.execute(f"""
+        SELECT o.OrderID, o.OrderStatus, o.TotalAmount, o.PaymentMethod, o.PaymentStatus,
+               o.DeliveryAddress, c.Name, c.Number, c.Road, c.Area, c.City, c.District
+        FROM `Order` o
+        JOIN Customer c ON o.CustomerID = c.CustomerID
+        WHERE o.DeliveryManID = %s AND o.OrderStatus NOT IN ({closed})
+        ORDER BY o.OrderID
+    """, [rider_id, *CLOSED_STATUSES])
+    orders = list(cursor.fetchall())
+
+    cursor.execute("SELECT Address FROM DeliveryMan WHERE DeliveryManID = %s", (rider_id,))
+    row = cursor.fetchone()
+    home = parse_address(row['Address']) if row else (None, None)
+    return orders, home
+
+
+def _road_key(order):
+    # Natural order, so 'Road 9' comes before 'Road 10'
+    road = (order['DeliveryAddress'] or '').split(',')[0].strip() or order['Road'] or ''
+    return [int(part) if part.isdigit() else part for part in _DIGITS_RE.split(road.lower())], order['OrderID']
+
+
+def _order_stops(locations, start, graph):
+    """Visiting order of `locations` starting from `start`
+
+    Nearest neighbour gives a first tour, then 2-opt reverses segments
+    while that shortens the (open) path.
+    """
+    remaining = list(locations)
+    path = []
+    current = start
+    while remaining:
+        nearest = min(remaining, key=lambda location: (graph.minutes(current, location), str(location)))
+        remaining.remove(nearest)
+        path.append(nearest)
+        current = nearest
+
+    points = [start] + path
+    n = len(points)
+    cost = [[graph.minutes(a, b) for b in points] for a in points]
+    order = list(range(n))
+
+    for _ in range(MAX_IMPROVEMENT_PASSES):
+        improved = False
+        for i in range(1, n - 1):
+            for j in range(i + 1, n):
+                a, b = order[i - 1], order[i]
+                c = order[j]
+                d = order[j + 1] if j + 1 < n else None
+                before = cost[a][b] + (cost[c][d] if d is not None else 0)
+                after = cost[a][c] + (cost[b][d] if d is not None else 0)
+                if after < before:
+                    order[i:j + 1] = reversed(order[i:j + 1])
+                    improved = True
+        if not improved:
+            break
+
+    return [points[index] for index in order[1:]]
+
+
+def plan_route(orders, home, graph):
+    """Group open orders into one stop per area and order the stops
+
+    orders -- dict rows from load_open_orders()
+    home   -- (area, district) the run starts from
+
+    Returns {'stops': [...], 'total_minutes', 'order_count'}; each stop has
+    its area, district, city, minutes from the previous stop and its orders
+    in road order.
+    """
+    stops = {}
+    for order in orders:
+        location = order_location(order['DeliveryAddress'], order['Area'], order['District'])
+        stops.setdefault(location, []).append(order)
+
+    start = home if home != (None, None) else next(iter(sorted(stops, key=str)), home)
+    path = _order_stops(sorted(stops, key=str), start, graph)
+
+    planned = []
+    total = 0
+    previous = start
+    for location in path:
+        minutes = graph.minutes(previous, location)
+        total += minutes
+        previous = location
+        stop_orders = sorted(stops[location], key=_road_key)
+        planned.append({
+            'area': location[0].title() if location[0] else None,
+            'district': location[1].title() if location[1] else None,
+            'city': stop_orders[0]['City'],
+            'minutes_from_previous': minutes,
+            'orders': [
+                {
+                    'order_id': order['OrderID'],
+                    'status': order['OrderStatus'],
+                    'customer': order['Name'],
+                    'phone': order['Number'],
+                    'address': order['DeliveryAddress'],
+                    'total': order['TotalAmount'],
+                    'payment_method': order['PaymentMethod'],
+                    'payment_status': order['PaymentStatus'],
+                }
+                for order in stop_orders
+            ],
+        })
+    return {'stops': planned, 'total_minutes': total, 'order_count': len(orders)}
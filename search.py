@@ -0,0 +1,230 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+import time
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+STOPWORDS = frozenset({
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is',
+    'it', 'of', 'on', 'or', 'the', 'to', 'with',
+})
+
+# Relative weight of a term occurrence in each indexed Product column
+FIELD_WEIGHTS = {
+    'ProductName': 3.0,
+    'Category': 2.0,
+    'Embroidery': 1.5,
+    'Description': 1.0,
+}
+
+INDEXED_COLUMNS = ('ProductID',) + tuple(FIELD_WEIGHTS)
+
+
+def tokenize(text):
+    """Lowercase word tokens of `text`, without stopwords"""
+    if not text:
+        return []
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def _weighted_terms(row):
+    terms = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        for token in tokenize(row.get(field)):
+            terms[token] = terms.get(token, 0.0) + weight
+    return terms
+
+
+class SearchIndex:
+    """In-memory inverted index over the searchable Product columns
+
+    Queries match every token (AND); the last token also matches as a
+    prefix so results update while the user types. Documents are ranked by
+    a TF-IDF score using the per-field weights above, ties broken by name.
+    """
+
+    def __init__(self, max_age=300, max_expansions=64, prefix_discount=0.7):
+        self.max_age = max_age
+        self.max_expansions = max_expansions
+        self.prefix_discount = prefix_discount
+
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._postings = {}  # term -> {product_id: weighted term frequency}
+        self._doc_terms = {}  # product_id -> {term: weighted term frequency}
+        self._names = {}  # product_id -> lowercase name, for tie-breaking
+        self._vocabulary = []  # sorted terms, for prefix lookups
+        self._built_at = None
+        self._journal = None  # writes seen while a rebuild is in progress
+
+    @property
+    def size(self):
+        return len(self._doc_terms)
+
+    def is_stale(self):
+        """True if the index was never built or is older than max_age"""
+        return self._built_at is None or time.monotonic() - self._built_at > self.max_age
+
+    def expire(self):
+        """Mark the index stale so the next refresh() rebuilds it
+
+        Cheaper than one upsert() per row after a bulk write; searches keep
+        using the current contents until the rebuild is done.
+        """
+        with self._lock:
+            if self._built_at is not None:
+                self._built_at = float('-inf')
+
+    def refresh(self, load_rows):
+        """Rebuild from `load_rows()` if stale
+
+        Only one thread rebuilds at a time; once the index exists, other
+        threads keep searching the current copy instead of waiting.
+        """
+        if not self.is_stale():
+            return
+        if not self._rebuild_lock.acquire(blocking=self._built_at is None):
+            return
+        try:
+            if self.is_stale():
+                # Journal from before the rows are read, not just while indexing
+                self._start_journal()
+                try:
+                    self.rebuild(load_rows())
+                except Exception:
+                    with self._lock:
+                        self._journal = None
+                    raise
+        finally:
+            self._rebuild_lock.release()
+
+    def rebuild(self, rows):
+        """Replace the index contents with `rows` (dicts with INDEXED_COLUMNS)
+
+        Writes applied through upsert()/remove() while the rows are being
+        indexed are replayed on top, so none are lost to the swap.
+        """
+        self._start_journal()
+
+        postings, doc_terms, names = {}, {}, {}
+        for row in rows:
+            product_id = row['ProductID']
+            terms = _weighted_terms(row)
+            doc_terms[product_id] = terms
+            names[product_id] = (row.get('ProductName') or '').lower()
+            for term, weight in terms.items():
+                postings.setdefault(term, {})[product_id] = weight
+
+        with self._lock:
+            journal, self._journal = self._journal, None
+            self._postings = postings
+            self._doc_terms = doc_terms
+            self._names = names
+            self._vocabulary = sorted(postings)
+            for product_id, row in journal:
+                self._remove(product_id)
+                if row is not None:
+                    self._add(product_id, row)
+            self._built_at = time.monotonic()
+
+    def _start_journal(self):
+        with self._lock:
+            if self._journal is None:
+                self._journal = []
+
+    def upsert(self, product_id, row):
+        """Index (or re-index) one product"""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append((product_id, row))
+            self._remove(product_id)
+            self._add(product_id, row)
+
+    def remove(self, product_id):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append((product_id, None))
+            self._remove(product_id)
+
+    def search(self, query, limit=None):
+        """Product IDs matching `query`, best match first"""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            total_docs = len(self._doc_terms) or 1
+            token_scores = []
+            for position, token in enumerate(tokens):
+                prefix = position == len(tokens) - 1
+                scores = self._score_token(token, total_docs, prefix)
+                if not scores:
+                    return []
+                token_scores.append(scores)
+
+            # Intersect starting from the most selective token
+            token_scores.sort(key=len)
+            ranked = dict(token_scores[0])
+            for scores in token_scores[1:]:
+                ranked = {doc: score + scores[doc] for doc, score in ranked.items() if doc in scores}
+                if not ranked:
+                    return []
+
+            names = self._names
+            key = lambda doc: (-ranked[doc], names.get(doc, ''), doc)
+            if limit is not None and limit < len(ranked):
+                return heapq.nsmallest(limit, ranked, key=key)
+            return sorted(ranked, key=key)
+
+    def _score_token(self, token, total_docs, prefix):
+        # Caller must hold the lock
+        terms = [(token, 1.0)] if token in self._postings else []
+        if prefix:
+            start = bisect.bisect_left(self._vocabulary, token)
+            for term in self._vocabulary[start:start + self.max_expansions + 1]:
+                if not term.startswith(token):
+                    break
+                if term != token:
+                    terms.append((term, self.prefix_discount))
+
+        scores = {}
+        for term, factor in terms:
+            docs = self._postings[term]
+            idf = math.log(1 + total_docs / len(docs))
+            for doc, weight in docs.items():
+                score = factor * idf * (1 + math.log(weight))
+                if score > scores.get(doc, 0.0):
+                    scores[doc] = score
+        return scores
+
+    def _add(self, product_id, row):
+        # Caller must hold the lock
+        terms = _weighted_terms(row)
+        self._doc_terms[product_id] = terms
+        self._names[product_id] = (row.get('ProductName') or '').lower()
+        for term, weight in terms.items():
+            docs = self._postings.get(term)
+            if docs is None:
+                docs = self._postings[term] = {}
+                bisect.insort(self._vocabulary, term)
+            docs[product_id] = weight
+
+    def _remove(self, product_id):
+        # Caller must hold the lock
+        terms = self._doc_terms.pop(product_id, None)
+        self._names.pop(product_id, None)
+        if not terms:
+            return
+        for term in terms:
+            docs = self._postings.get(term)
+            if docs is None:
+                continue
+            docs.pop(product_id, None)
+            if not docs:
+                del self._postings[term]
+                index = bisect.bisect_left(self._vocabulary, term)
+                if index < len(self._vocabulary) and self._vocabulary[index] == term:
+                    del self._vocabulary[index]
@@ -2,10 +2,10 @@
 
 // Update cart count in navigation
 function updateCartCount() {
-    fetch('/api/cart/get')
+    fetch('/api/cart/count')
         .then(response => response.json())
-        .then(cart => {
-            const count = Object.keys(cart).length;
+        .then(data => {
+            const count = data.count || 0;
             const cartCountElement = document.getElementById('cartCount');
             if (cartCountElement) {
                 cartCountElement.textContent = count;
@@ -0,0 +1,102 @@
+import random
+from datetime import datetime, timedelta
+
+# StoreStats column -> query that recomputes it from the base tables
+STATS_QUERIES = {
+    'Customers': "SELECT COUNT(*) FROM Customer",
+    'Products': "SELECT COUNT(*) FROM Product",
+    'Orders': "SELECT COUNT(*) FROM `Order`",
+    'ActiveDeliveryMen': "SELECT COUNT(*) FROM DeliveryMan WHERE Status = 'Active'",
+    'Revenue': "SELECT COALESCE(SUM(TotalAmount), 0) FROM `Order` WHERE OrderStatus = 'Complete'",
+}
+
+# StoreStatsSlot rows the deltas are spread over; concurrent writers only
+# wait on each other when they pick the same slot
+STATS_SLOTS = 16
+
+
+def bump_stats(cursor, **deltas):
+    """Apply counter deltas inside the caller's transaction
+
+    e.g. bump_stats(cursor, Orders=1) right after inserting an order, so the
+    counter commits (or rolls back) together with the write it describes.
+    The deltas go to a random StoreStatsSlot row rather than StoreStats.
+    """
+    deltas = {column: delta for column, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    unknown = set(deltas) - set(STATS_QUERIES)
+    if unknown:
+        raise ValueError(f"Unknown stats columns: {', '.join(sorted(unknown))}")
+
+    columns = ', '.join(deltas)
+    placeholders = ', '.join(['%s'] * len(deltas))
+    assignments = ', '.join(f'{column} = {column} + VALUES({column})' for column in deltas)
+    cursor.execute(f"""
+        INSERT INTO StoreStatsSlot (Slot, {columns})
+        VALUES (%s, {placeholders})
+        ON DUPLICATE KEY UPDATE {assignments}
+    """, [random.randrange(STATS_SLOTS), *deltas.values()])
+
+
+def reconcile_stats(cursor):
+    """Recompute every counter from the base tables, correcting any drift
+
+    Call it at the start of a transaction: the counts must come from a
+    snapshot taken after the locks below. Returns the corrected values.
+    The caller commits.
+    """
+    # Lock the rows before counting: in-flight writers that already bumped a
+    # slot commit first, and the counts' snapshot (opened by the first plain
+    # read below) includes them; later ones wait for our commit
+    cursor.execute("SELECT StatsID FROM StoreStats WHERE StatsID = 1 FOR UPDATE")
+    cursor.fetchall()
+    cursor.execute("SELECT Slot FROM StoreStatsSlot FOR UPDATE")
+    cursor.fetchall()
+
+    values = {}
+    for column, query in STATS_QUERIES.items():
+        cursor.execute(query)
+        values[column] = cursor.fetchone()[0]
+
+    columns = ', '.join(values)
+    placeholders = ', '.join(['%s'] * len(values))
+    assignments = ', '.join(f'{column} = VALUES({column})' for column in values)
+    cursor.execute(f"""
+        INSERT INTO StoreStats (StatsID, {columns}, ReconciledAt)
+        VALUES (1, {placeholders}, NOW())
+        ON DUPLICATE KEY UPDATE {assignments}, ReconciledAt = VALUES(ReconciledAt)
+    """, list(values.values()))
+    # The counts include every delta so far
+    cursor.execute(f"UPDATE StoreStatsSlot SET {', '.join(f'{column} = 0' for column in values)}")
+    return values
+
+
+def read_stats(cursor, max_age=None):
+    """Read the counters, reconciling first if they are older than `max_age` seconds
+
+    Returns (values, reconciled) where `reconciled` tells the caller a
+    commit is needed. Reconciling rolls back the caller's transaction
+    first, so read the stats before making any writes.
+    """
+    sums = ', '.join(f'(SELECT COALESCE(SUM({column}), 0) FROM StoreStatsSlot)' for column in STATS_QUERIES)
+    cursor.execute(f"SELECT {', '.join(STATS_QUERIES)}, ReconciledAt, {sums} FROM StoreStats WHERE StatsID = 1")
+    row = cursor.fetchone()
+
+    count = len(STATS_QUERIES)
+    reconciled_at = row[count] if row is not None else None
+    stale = reconciled_at is None
+    if not stale and max_age is not None:
+        stale = reconciled_at < datetime.now() - timedelta(seconds=max_age)
+    if stale:
+        # The SELECT above opened a snapshot that misses deltas committed
+        # since; counting from it and then zeroing the slots would lose them
+        cursor.connection.rollback()
+        return reconcile_stats(cursor), True
+
+    return {column: row[i] + row[count + 1 + i] for i, column in enumerate(STATS_QUERIES)}, False
+
+
+def revenue_delta(old_status, new_status, amount):
+    """Change in completed-order revenue when an order moves between statuses"""
+    return (new_status == 'Complete') * amount - (old_status == 'Complete') * amount
@@ -0,0 +1,184 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from delivery_sync import EventConflict, _apply, parse_event, sync_events
+
+NOW = datetime(2024, 3, 5, 12, 0)
+RIDER = 7
+
+
+def state(status='Pending', payment='Pending', method='Cash on Delivery'):
+    return {'status': status, 'payment': payment, 'method': method, 'delivery_status': None}
+
+
+class SyncCursor:
+    """Answers sync_events' two lookups and records its writes
+
+    orders -- {OrderID: (DeliveryManID, OrderStatus, PaymentStatus, PaymentMethod,
+               last applied status event, last applied payment event)}
+    """
+
+    def __init__(self, orders, synced=()):
+        self.orders = orders
+        self.synced = list(synced)
+        self.rows = []
+        self.statements = []
+        self.events = []
+
+    def execute(self, sql, params=()):
+        self.statements.append(' '.join(sql.split()))
+        if 'SELECT EventID, Result FROM DeliveryEvent' in sql:
+            self.rows = self.synced
+        elif 'FROM `Order` o' in sql:
+            self.rows = [
+                (order_id, rider, status, payment, method, 100, last_status, last_payment)
+                for order_id, (rider, status, payment, method, last_status, last_payment) in sorted(self.orders.items())
+                if order_id in params
+            ]
+
+    def executemany(self, sql, rows):
+        if 'INSERT INTO DeliveryEvent' in sql:
+            self.events.extend(rows)
+
+    def fetchall(self):
+        return self.rows
+
+
+def event(event_id, order_id=1, minutes=0, **value):
+    at = (datetime.now(timezone.utc) - timedelta(minutes=60 - minutes)).isoformat()
+    return {'event_id': event_id, 'order_id': order_id, 'at': at, **value}
+
+
+def by_id(results):
+    return {result['event_id']: result for result in results}
+
+
+def test_parse_event_iso_and_epoch_times():
+    iso = parse_event({'event_id': 'a', 'order_id': '3', 'at': '2024-03-05T17:30:00.123456+05:30',
+                       'order_status': 'Delivered'}, NOW)
+    assert iso == {'event_id': 'a', 'order_id': 3, 'kind': 'status', 'value': 'Delivered',
+                   'at': datetime(2024, 3, 5, 12, 0, 0, 123000)}
+
+    epoch = parse_event({'event_id': 'b', 'order_id': 3, 'at': 1709639999500, 'payment_status': 'Paid'}, NOW)
+    assert epoch['kind'] == 'payment'
+    assert epoch['at'] == datetime(2024, 3, 5, 11, 59, 59, 500000)
+
+    naive = parse_event({'event_id': 'c', 'order_id': 3, 'at': '2024-03-05T11:00:00', 'payment_status': 'Paid'}, NOW)
+    assert naive['at'] == datetime(2024, 3, 5, 11, 0)
+
+
+@pytest.mark.parametrize('raw, error', [
+    ('nope', 'object'),
+    ({'order_id': 1, 'at': 0, 'order_status': 'Delivered'}, 'event_id'),
+    ({'event_id': 'x' * 65, 'order_id': 1, 'at': 0, 'order_status': 'Delivered'}, 'event_id'),
+    ({'event_id': 'a', 'order_id': 'one', 'at': 0, 'order_status': 'Delivered'}, 'order_id'),
+    ({'event_id': 'a', 'order_id': 1, 'at': 0}, 'exactly one'),
+    ({'event_id': 'a', 'order_id': 1, 'at': 0, 'order_status': 'Delivered', 'payment_status': 'Paid'}, 'exactly one'),
+    ({'event_id': 'a', 'order_id': 1, 'at': 0, 'order_status': 'Cancelled'}, 'status must be'),
+    ({'event_id': 'a', 'order_id': 1, 'at': 'yesterday', 'payment_status': 'Paid'}, 'ISO 8601'),
+    ({'event_id': 'a', 'order_id': 1, 'at': True, 'payment_status': 'Paid'}, 'ISO 8601'),
+])
+def test_parse_event_rejects(raw, error):
+    with pytest.raises(ValueError, match=error):
+        parse_event(raw, NOW)
+
+
+def test_clock_skew():
+    def at(minutes):
+        return {'event_id': 'a', 'order_id': 1, 'at': (NOW + timedelta(minutes=minutes)).isoformat(),
+                'order_status': 'Delivered'}
+
+    assert parse_event(at(4), NOW)['at'] == NOW + timedelta(minutes=4)
+    with pytest.raises(ValueError, match='future'):
+        parse_event(at(6), NOW)
+
+
+def test_prepaid_delivery_completes_the_order():
+    order = state(method='Online Payment')
+    _apply(order, 'status', 'Delivered')
+    assert (order['status'], order['payment'], order['delivery_status']) == ('Complete', 'Paid', 'Delivered')
+
+
+def test_cash_order_completes_once_delivered_and_paid():
+    order = state()
+    _apply(order, 'status', 'Delivered')
+    assert (order['status'], order['payment']) == ('Delivered', 'Pending')
+    _apply(order, 'payment', 'Paid')
+    assert order['status'] == 'Complete'
+
+    paid_first = state()
+    _apply(paid_first, 'payment', 'Paid')
+    _apply(paid_first, 'status', 'Delivered')
+    assert paid_first['status'] == 'Complete'
+
+
+def test_conflicts():
+    with pytest.raises(EventConflict, match='cancelled'):
+        _apply(state(status='Cancelled'), 'status', 'Delivered')
+    with pytest.raises(EventConflict, match='cancelled'):
+        _apply(state(status='Cancelled'), 'payment', 'Paid')
+    with pytest.raises(EventConflict, match='complete'):
+        _apply(state(status='Complete', payment='Paid'), 'status', 'Pending')
+    with pytest.raises(EventConflict, match='complete'):
+        _apply(state(status='Complete', payment='Paid'), 'payment', 'Pending')
+    # Repeating what already happened is not a conflict
+    complete = state(status='Complete', payment='Paid')
+    _apply(complete, 'status', 'Delivered')
+    _apply(complete, 'payment', 'Paid')
+    assert complete['status'] == 'Complete'
+
+
+def test_events_apply_in_time_order():
+    cursor = SyncCursor({1: (RIDER, 'Pending', 'Pending', 'Cash on Delivery', None, None)})
+    results = sync_events(cursor, RIDER, [
+        event('paid', minutes=20, payment_status='Paid'),
+        event('delivered', minutes=10, order_status='Delivered'),
+    ])
+    assert [result['result'] for result in results] == ['applied', 'applied']
+    assert results[0]['order_status'] == 'Complete'
+    assert [row[1] for row in cursor.events] == ['delivered', 'paid']
+
+
+def test_event_older_than_last_applied_is_stale():
+    last = (datetime.now(timezone.utc) - timedelta(minutes=30)).replace(tzinfo=None)
+    cursor = SyncCursor({1: (RIDER, 'Delivered', 'Pending', 'Cash on Delivery', last, None)})
+    results = by_id(sync_events(cursor, RIDER, [
+        event('old', minutes=10, order_status='Pending'),
+        event('new', minutes=40, payment_status='Paid'),
+    ]))
+    assert results['old']['result'] == 'stale'
+    assert results['new']['result'] == 'applied'
+    assert results['new']['order_status'] == 'Complete'
+    assert ('old', 'stale') in [(row[1], row[6]) for row in cursor.events]
+
+
+def test_duplicates_within_and_across_batches():
+    cursor = SyncCursor({1: (RIDER, 'Pending', 'Pending', 'Cash on Delivery', None, None)},
+                        synced=[('before', 'applied')])
+    results = sync_events(cursor, RIDER, [
+        event('before', order_status='Delivered'),
+        event('twice', minutes=5, order_status='Delivered'),
+        event('twice', minutes=6, order_status='Delivered'),
+    ])
+    assert [(result['event_id'], result['result']) for result in results] == [
+        ('before', 'duplicate'), ('twice', 'applied'), ('twice', 'duplicate'),
+    ]
+    assert results[0]['original'] == 'applied'
+    assert [row[1] for row in cursor.events] == ['twice']
+
+
+def test_cancelled_order_conflicts_and_other_riders_orders_are_rejected():
+    cursor = SyncCursor({
+        1: (RIDER, 'Cancelled', 'Pending', 'Cash on Delivery', None, None),
+        2: (RIDER + 1, 'Pending', 'Pending', 'Cash on Delivery', None, None),
+    })
+    results = by_id(sync_events(cursor, RIDER, [
+        event('cancelled', order_id=1, order_status='Delivered'),
+        event('not-mine', order_id=2, order_status='Delivered'),
+        {'event_id': 'bad', 'order_id': 1},
+    ]))
+    assert (results['cancelled']['result'], results['cancelled']['order_status']) == ('conflict', 'Cancelled')
+    assert results['not-mine']['result'] == 'rejected'
+    assert results['bad']['result'] == 'rejected'
+    assert not any(statement.startswith('UPDATE `Order`') for statement in cursor.statements)
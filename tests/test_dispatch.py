@@ -0,0 +1,81 @@
+from dispatch import AFFINITY_SLACK, VEHICLE_CAPACITY, Rider, order_location, parse_address, plan_assignments
+
+HOME_DHANMONDI = 'Road 2, Dhanmondi, Dhaka, Dhaka'
+HOME_UTTARA = 'Road 9, Uttara, Dhaka, Dhaka'
+
+
+def test_parse_address():
+    assert parse_address('Road 1, Dhanmondi, Dhaka, Dhaka. Phone: 0170') == ('dhanmondi', 'dhaka')
+    assert parse_address('Mirpur, Dhaka') == ('mirpur', 'dhaka')
+    assert parse_address('Gulshan') == ('gulshan', None)
+    assert parse_address(None) == (None, None)
+
+
+def test_order_location_falls_back_to_customer_profile():
+    assert order_location('Gulshan', 'Banani', ' Dhaka ') == ('gulshan', 'dhaka')
+    assert order_location('', ' ', None) == (None, None)
+
+
+def test_least_loaded_rider_wins_without_affinity():
+    busy = Rider(1, 'Bicycle', 4, HOME_UTTARA)
+    idle = Rider(2, 'Bicycle', 0, HOME_UTTARA)
+    plan = plan_assignments([(10, 'mirpur', 'chittagong')], [busy, idle])
+    assert plan.assignments == [(10, 2)]
+
+
+def test_ties_go_to_the_lower_rider_id():
+    riders = [Rider(rider_id, 'Bicycle', 0, None) for rider_id in (3, 1, 2)]
+    plan = plan_assignments([(10, None, None), (11, None, None), (12, None, None)], riders)
+    assert plan.assignments == [(10, 1), (11, 2), (12, 3)]
+
+
+def test_area_affinity_within_slack():
+    local = Rider(1, 'Bicycle', 3, HOME_DHANMONDI)
+    idle = Rider(2, 'Bicycle', 0, HOME_UTTARA)
+    assert local.ratio <= AFFINITY_SLACK
+    plan = plan_assignments([(10, 'dhanmondi', 'dhaka')], [local, idle])
+    assert plan.assignments == [(10, 1)]
+
+
+def test_area_affinity_beyond_slack_goes_to_least_loaded():
+    local = Rider(1, 'Bicycle', 5, HOME_DHANMONDI)
+    idle = Rider(2, 'Bicycle', 0, 'Road 9, Uttara, Dhaka, Gazipur')
+    assert local.ratio > AFFINITY_SLACK
+    plan = plan_assignments([(10, 'dhanmondi', 'narayanganj')], [local, idle])
+    assert plan.assignments == [(10, 2)]
+
+
+def test_district_affinity_when_nobody_works_the_area():
+    same_district = Rider(1, 'Bicycle', 2, HOME_UTTARA)
+    idle = Rider(2, 'Bicycle', 0, 'Road 3, Agrabad, Chattogram, Chattogram')
+    plan = plan_assignments([(10, 'mirpur', 'dhaka')], [same_district, idle])
+    assert plan.assignments == [(10, 1)]
+
+
+def test_assigned_area_attracts_later_orders():
+    riders = [Rider(1, 'Car', 0, None), Rider(2, 'Car', 0, None)]
+    plan = plan_assignments([(10, 'banani', 'dhaka'), (11, 'gulshan', 'dhaka'), (12, 'banani', 'dhaka')],
+                            riders)
+    assert dict(plan.assignments)[12] == dict(plan.assignments)[10]
+
+
+def test_full_rider_is_skipped():
+    capacity = VEHICLE_CAPACITY['Bicycle']
+    full = Rider(1, 'Bicycle', capacity, HOME_DHANMONDI)
+    other = Rider(2, 'Bicycle', capacity - 1, HOME_UTTARA)
+    plan = plan_assignments([(10, 'dhanmondi', 'dhaka'), (11, 'dhanmondi', 'dhaka')], [full, other])
+    assert plan.assignments == [(10, 2)]
+    assert plan.unassigned == [11]
+    assert full.load == capacity and other.load == capacity
+    assert plan.to_dict()['riders'] == [
+        {'delivery_man_id': 2, 'new_orders': 1, 'open_orders': capacity, 'capacity': capacity}
+    ]
+
+
+def test_capacity_is_never_exceeded():
+    riders = [Rider(1, 'Bicycle', 0, HOME_DHANMONDI), Rider(2, 'Motorcycle', 0, HOME_UTTARA)]
+    orders = [(order_id, 'dhanmondi', 'dhaka') for order_id in range(40)]
+    plan = plan_assignments(orders, riders)
+    assert len(plan.assignments) == VEHICLE_CAPACITY['Bicycle'] + VEHICLE_CAPACITY['Motorcycle']
+    assert all(rider.load <= rider.capacity for rider in riders)
+    assert plan.unassigned == list(range(len(plan.assignments), 40))
@@ -0,0 +1,86 @@
+import pytest
+
+MySQLdb = pytest.importorskip('MySQLdb')
+
+import jobs  # noqa: E402
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeProcess:
+    """Stand-in for multiprocessing.Process that dies after `lives` liveness checks"""
+
+    started = []
+    lives = 1
+
+    def __init__(self, target, args, kwargs, daemon):
+        self.pid = len(FakeProcess.started) + 1
+        self.exitcode = None
+        self.checks = 0
+
+    def start(self):
+        FakeProcess.started.append(self)
+
+    def is_alive(self):
+        self.checks += 1
+        if self.checks > FakeProcess.lives:
+            self.exitcode = 1
+            return False
+        return True
+
+    def terminate(self):
+        pass
+
+
+def stop_after(ticks, monkeypatch, clock):
+    """Make the pool's sleep advance `clock` and interrupt it after `ticks` sleeps"""
+    def sleep(seconds):
+        clock[0] += seconds
+        if clock[0] >= ticks:
+            raise KeyboardInterrupt
+    monkeypatch.setattr(jobs.time, 'sleep', sleep)
+    monkeypatch.setattr(jobs.time, 'monotonic', lambda: clock[0])
+
+
+def test_worker_reconnects_after_connection_loss(monkeypatch):
+    connections, sleeps = [], []
+
+    def connect():
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    def claim_jobs(connection, worker_id, limit):
+        if len(connections) == 1:
+            raise MySQLdb.OperationalError(2006, 'MySQL server has gone away')
+        return []
+
+    monkeypatch.setattr(jobs, 'claim_jobs', claim_jobs)
+    monkeypatch.setattr(jobs.time, 'sleep', sleeps.append)
+    jobs.work(connect, {}, worker_id='test', once=True, log=lambda message: None)
+    assert len(connections) == 2
+    assert all(connection.closed for connection in connections)
+    assert sleeps == [jobs.backoff(1)]
+
+
+def test_pool_restarts_dead_workers(monkeypatch):
+    FakeProcess.started, FakeProcess.lives = [], 1
+    monkeypatch.setattr(jobs.multiprocessing, 'Process', FakeProcess)
+    stop_after(5, monkeypatch, [0.0])
+    jobs.work_pool(lambda: None, {}, processes=2, log=lambda message: None)
+    # Both workers die on every second check and keep being replaced
+    assert len(FakeProcess.started) > 2
+
+
+def test_pool_backs_off_workers_that_die_at_once(monkeypatch):
+    FakeProcess.started, FakeProcess.lives = [], 0
+    monkeypatch.setattr(jobs.multiprocessing, 'Process', FakeProcess)
+    stop_after(10, monkeypatch, [0.0])
+    jobs.work_pool(lambda: None, {}, processes=1, log=lambda message: None)
+    # Restarted after 2s, then 4s: starts at 0, 3 and 8
+    assert len(FakeProcess.started) == 3
@@ -0,0 +1,59 @@
+from datetime import date, datetime
+
+from leaderboards import Leaderboards, TopK
+
+DAY = date(2024, 3, 5)
+
+
+def product(product_id, category):
+    return {'ProductID': product_id, 'ProductName': f'Product {product_id}', 'Category': category}
+
+
+PRODUCTS = {1: product(1, 'Saree'), 2: product(2, 'Saree'), 3: product(3, 'Kurti'), 4: product(4, 'Kurti')}
+
+
+def test_topk_keeps_the_best_k_ties_to_lower_id():
+    board = TopK(3, [(5, 10), (2, 30), (9, 10), (1, 10), (7, 0)])
+    assert list(board) == [(2, 30), (1, 10), (5, 10)]
+
+
+def test_topk_update_moves_and_truncates():
+    board = TopK(3, [(1, 10), (2, 20), (3, 30)])
+    board.update(4, 25)
+    assert list(board) == [(3, 30), (4, 25), (2, 20)]
+    board.update(2, 40)
+    assert list(board) == [(2, 40), (3, 30), (4, 25)]
+    board.update(5, 25)
+    assert list(board) == [(2, 40), (3, 30), (4, 25)]
+    board.update(1, 25)
+    assert list(board) == [(2, 40), (3, 30), (1, 25)]
+    board.update(3, 0)
+    assert list(board) == [(2, 40), (1, 25)]
+
+
+def test_boards_overall_and_per_category():
+    boards = Leaderboards(k=2)
+    boards.rebuild(DAY, datetime(2024, 3, 5, 12), dict(PRODUCTS), {
+        'all': {1: 5, 2: 9, 3: 7, 4: 1}, '7d': {3: 2}, '30d': {},
+    })
+    assert [(row['ProductID'], row['Units'], row['Rank']) for row in boards.top('all')] == [(2, 9, 1), (3, 7, 2)]
+    assert [row['ProductID'] for row in boards.top('all', 'Kurti')] == [3, 4]
+    assert [row['ProductID'] for row in boards.top('7d', 'Saree')] == []
+    assert boards.top('all', limit=1)[0]['ProductName'] == 'Product 2'
+    assert boards.categories() == ['Kurti', 'Saree']
+
+
+def test_apply_updates_changed_products():
+    boards = Leaderboards(k=2)
+    boards.rebuild(DAY, datetime(2024, 3, 5, 12), dict(PRODUCTS), {'all': {1: 5, 2: 9}, '7d': {}, '30d': {}})
+    boards.apply(DAY, datetime(2024, 3, 5, 12, 1), {1: PRODUCTS[1]}, {'all': {1: 12}, '7d': {1: 3}, '30d': {1: 3}})
+    assert [row['ProductID'] for row in boards.top('all')] == [1, 2]
+    assert [row['ProductID'] for row in boards.top('7d', 'Saree')] == [1]
+    assert not boards.is_stale()
+
+
+def test_apply_on_a_new_day_forces_a_rebuild():
+    boards = Leaderboards(k=2)
+    boards.rebuild(DAY, datetime(2024, 3, 5, 12), dict(PRODUCTS), {'all': {1: 5}, '7d': {}, '30d': {}})
+    boards.apply(date(2024, 3, 6), datetime(2024, 3, 6, 0, 1), {}, {'all': {}, '7d': {}, '30d': {}})
+    assert boards.is_stale()
@@ -0,0 +1,61 @@
+import pytest
+
+pytest.importorskip('MySQLdb')
+
+from database.migrate import Migration, MIGRATIONS_DIR, split_clauses, without_existing_indexes  # noqa: E402
+
+
+class IndexCursor:
+    """Cursor answering the information_schema.STATISTICS lookup with fixed index names"""
+
+    def __init__(self, indexes):
+        self.indexes = indexes
+        self.tables = []
+
+    def execute(self, sql, params=()):
+        self.tables.append(params[0])
+
+    def fetchall(self):
+        return [(name,) for name in self.indexes]
+
+
+ALTER = """ALTER TABLE `Order`
+    ADD INDEX idx_order_customer_date (CustomerID, OrderDate, OrderID),
+    ADD INDEX idx_order_date (OrderDate, OrderID),
+    ALGORITHM=INPLACE, LOCK=NONE"""
+
+
+def test_split_clauses_keeps_column_lists_together():
+    assert split_clauses("ADD INDEX a (x, y), ADD INDEX b (z), LOCK=NONE") == [
+        'ADD INDEX a (x, y)', 'ADD INDEX b (z)', 'LOCK=NONE'
+    ]
+
+
+def test_only_existing_index_is_dropped_from_alter():
+    cursor = IndexCursor(['PRIMARY', 'idx_order_date'])
+    statement, skipped = without_existing_indexes(cursor, ALTER)
+    assert skipped == ['idx_order_date']
+    assert statement == ("ALTER TABLE `Order` ADD INDEX idx_order_customer_date (CustomerID, OrderDate, OrderID), "
+                         "ALGORITHM=INPLACE, LOCK=NONE")
+    assert cursor.tables == ['Order']
+
+
+def test_alter_with_every_index_present_is_skipped():
+    cursor = IndexCursor(['idx_order_customer_date', 'idx_order_date'])
+    assert without_existing_indexes(cursor, ALTER) == (None, ['idx_order_customer_date', 'idx_order_date'])
+
+
+def test_statements_without_indexes_are_untouched():
+    cursor = IndexCursor(['PRIMARY'])
+    statement = "CREATE TABLE IF NOT EXISTS T (ID INT PRIMARY KEY)"
+    assert without_existing_indexes(cursor, statement) == (statement, [])
+    assert without_existing_indexes(cursor, ALTER) == (ALTER, [])
+    assert cursor.tables == ['Order']
+
+
+def test_repair_migration_covers_every_query_index():
+    def indexes(name):
+        migration = Migration(0, name, f'{MIGRATIONS_DIR}/{name}.sql')
+        return [split_clauses(statement) for statement in migration.statements()]
+
+    assert indexes('0013_repair_query_indexes') == indexes('0002_query_indexes')
@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip('MySQLdb')
+
+from app import attach_order_items  # noqa: E402
+
+
+class CountingCursor:
+    """Cursor that counts execute() calls and returns two items per requested order"""
+
+    def __init__(self):
+        self.executed = 0
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        self.executed += 1
+        self._rows = [
+            {'OrderID': order_id, 'ProductID': product_id, 'Quantity': 1}
+            for order_id in params for product_id in (1, 2)
+        ]
+
+    def fetchall(self):
+        return self._rows
+
+
+def orders(count):
+    return [{'OrderID': order_id} for order_id in range(1, count + 1)]
+
+
+def test_query_count_does_not_grow_with_orders():
+    one, many = CountingCursor(), CountingCursor()
+    attach_order_items(one, orders(1))
+    attach_order_items(many, orders(50))
+    assert one.executed == many.executed == 1
+
+
+def test_items_attached_to_their_orders():
+    attached = attach_order_items(CountingCursor(), orders(3))
+    for order in attached:
+        assert [item['OrderID'] for item in order['order_items']] == [order['OrderID']] * 2
+
+
+def test_no_orders_no_query():
+    cursor = CountingCursor()
+    assert attach_order_items(cursor, []) == []
+    assert cursor.executed == 0
@@ -0,0 +1,93 @@
+import base64
+from datetime import date, datetime
+
+from pagination import MAX_PAGE_SIZE, PageRequest, decode_cursor, encode_cursor, fetch_page, slice_page
+
+
+class RecordingCursor:
+    """Cursor that records the query and returns the given rows"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.sql = self.params = None
+
+    def execute(self, sql, params):
+        self.sql, self.params = sql, params
+
+    def fetchall(self):
+        return self.rows
+
+
+def test_cursor_round_trip():
+    values = ['Silk Saree', 7, datetime(2024, 3, 5, 10, 30), date(2024, 3, 5), None]
+    assert decode_cursor(encode_cursor(values)) == values
+
+
+def test_invalid_cursors_decode_to_none():
+    token = encode_cursor(['Silk Saree', 7])
+    assert decode_cursor(None) is None
+    assert decode_cursor('') is None
+    assert decode_cursor('not base64 !!') is None
+    assert decode_cursor(token[:-3]) is None
+    assert decode_cursor(base64.urlsafe_b64encode(b'{"a": 1}').decode()) is None
+    assert decode_cursor(base64.urlsafe_b64encode(b'[{"x": 1}]').decode()) is None
+    assert decode_cursor(base64.urlsafe_b64encode(b'[{"dt": "yesterday"}]').decode()) is None
+
+
+def test_page_request_from_args():
+    page = PageRequest.from_args({'after': encode_cursor(['a', 1]), 'before': encode_cursor(['b', 2]),
+                                  'limit': '1000'})
+    assert page.after == ['a', 1]
+    assert page.before is None
+    assert page.size == MAX_PAGE_SIZE
+    assert PageRequest.from_args({'limit': 'lots', 'after': 'garbage'}).after is None
+    assert PageRequest.from_args({'limit': '0'}).size == 1
+
+
+def test_fetch_page_after_cursor():
+    rows = [{'Name': name, 'ID': i} for i, name in enumerate('bcd', 2)]
+    cursor = RecordingCursor(rows)
+    page = fetch_page(cursor, "SELECT * FROM T WHERE 1=1", [], [('Name', 'Name'), ('ID', 'ID')],
+                      PageRequest(after=['a', 1], size=2))
+    assert '((Name > %s) OR (Name = %s AND ID > %s))' in cursor.sql
+    assert cursor.sql.endswith('ORDER BY Name ASC, ID ASC LIMIT %s')
+    assert cursor.params == ['a', 'a', 1, 3]
+    assert [row['ID'] for row in page] == [2, 3]
+    assert decode_cursor(page.next_cursor) == ['c', 3]
+    assert decode_cursor(page.prev_cursor) == ['b', 2]
+
+
+def test_fetch_page_before_cursor_reads_backwards():
+    cursor = RecordingCursor([{'ID': 4}, {'ID': 3}])
+    page = fetch_page(cursor, "SELECT * FROM T WHERE 1=1", [], [('ID', 'ID')], PageRequest(before=[5], size=2))
+    assert cursor.sql.endswith('ORDER BY ID DESC LIMIT %s')
+    assert [row['ID'] for row in page] == [3, 4]
+    assert page.prev_cursor is None
+    assert decode_cursor(page.next_cursor) == [4]
+
+
+def test_fetch_page_ignores_cursor_of_wrong_shape():
+    cursor = RecordingCursor([])
+    page = fetch_page(cursor, "SELECT * FROM T WHERE 1=1", [], [('Name', 'Name'), ('ID', 'ID')],
+                      PageRequest(after=['tampered'], size=2))
+    assert 'Name >' not in cursor.sql
+    assert not page and page.next_cursor is None and page.prev_cursor is None
+
+
+def test_slice_page():
+    ranked = list(range(10, 17))
+    first = slice_page(ranked, PageRequest(size=3))
+    assert first.items == [10, 11, 12] and first.prev_cursor is None
+
+    second = slice_page(ranked, PageRequest(after=decode_cursor(first.next_cursor), size=3))
+    assert second.items == [13, 14, 15]
+
+    back = slice_page(ranked, PageRequest(before=decode_cursor(second.prev_cursor), size=3))
+    assert back.items == [10, 11, 12]
+
+    last = slice_page(ranked, PageRequest(after=decode_cursor(second.next_cursor), size=3))
+    assert last.items == [16] and last.next_cursor is None
+
+    # A tampered cursor that is not a position starts from the top
+    assert slice_page(ranked, PageRequest(after=['x'], size=3)).items == [10, 11, 12]
+    assert slice_page(ranked, PageRequest(after=[100], size=3)).items == []
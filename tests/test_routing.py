@@ -0,0 +1,80 @@
+import random
+
+import routing
+from routing import OTHER_DISTRICT_MINUTES, SAME_DISTRICT_MINUTES, AreaGraph, plan_route
+
+GRAPH = AreaGraph([
+    ('Dhanmondi', 'Mohammadpur', 10),
+    ('mohammadpur', 'mirpur', 15),
+    ('Dhanmondi', 'Mirpur', 40),
+    ('Mirpur', 'Uttara', 25),
+    ('dhanmondi', 'mohammadpur', 12),
+])
+
+
+def order(order_id, address, city='Dhaka'):
+    return {
+        'OrderID': order_id, 'OrderStatus': 'Pending', 'TotalAmount': 100, 'PaymentMethod': 'Cash on Delivery',
+        'PaymentStatus': 'Pending', 'DeliveryAddress': address, 'Name': 'Customer', 'Number': '0170',
+        'Road': None, 'Area': None, 'City': city, 'District': None,
+    }
+
+
+def path_minutes(graph, start, path):
+    return sum(graph.minutes(a, b) for a, b in zip([start] + path, path))
+
+
+def test_shortest_paths():
+    distances = GRAPH.distances_from('dhanmondi')
+    # The shorter of the duplicate edges, and the chain beats the direct edge
+    assert distances == {'dhanmondi': 0, 'mohammadpur': 10, 'mirpur': 25, 'uttara': 50}
+    assert GRAPH.distances_from('uttara')['dhanmondi'] == 50
+
+
+def test_minutes_falls_back_to_district():
+    assert GRAPH.minutes(('mirpur', 'dhaka'), ('mirpur', 'dhaka')) == 0
+    assert GRAPH.minutes(('dhanmondi', 'dhaka'), ('uttara', 'dhaka')) == 50
+    assert GRAPH.minutes(('dhanmondi', 'dhaka'), ('gulshan', 'dhaka')) == SAME_DISTRICT_MINUTES
+    assert GRAPH.minutes((None, 'dhaka'), ('gulshan', 'gazipur')) == OTHER_DISTRICT_MINUTES
+
+
+def test_two_opt_never_lengthens_the_route(monkeypatch):
+    rng = random.Random(7)
+    areas = [f'area{index}' for index in range(12)]
+    for _ in range(20):
+        graph = AreaGraph([(a, b, rng.randint(1, 60)) for a in areas for b in areas if a < b and rng.random() < 0.4])
+        locations = [(area, 'dhaka') for area in rng.sample(areas, 8)]
+        start = (areas[0], 'dhaka')
+        improved = routing._order_stops(locations, start, graph)
+        with monkeypatch.context() as patch:
+            patch.setattr(routing, 'MAX_IMPROVEMENT_PASSES', 0)
+            greedy = routing._order_stops(locations, start, graph)
+        assert sorted(improved) == sorted(locations)
+        assert path_minutes(graph, start, improved) <= path_minutes(graph, start, greedy)
+
+
+def test_no_orders():
+    assert plan_route([], ('dhanmondi', 'dhaka'), GRAPH) == {'stops': [], 'total_minutes': 0, 'order_count': 0}
+
+
+def test_one_stop_orders_in_road_order():
+    orders = [order(1, 'Road 10, Mirpur, Dhaka, Dhaka'), order(2, 'Road 9, Mirpur, Dhaka, Dhaka')]
+    plan = plan_route(orders, ('dhanmondi', 'dhaka'), GRAPH)
+    assert plan['order_count'] == 2
+    assert plan['total_minutes'] == 25
+    [stop] = plan['stops']
+    assert (stop['area'], stop['district'], stop['minutes_from_previous']) == ('Mirpur', 'Dhaka', 25)
+    assert [entry['order_id'] for entry in stop['orders']] == [2, 1]
+
+
+def test_stops_follow_the_graph():
+    orders = [order(1, 'Road 1, Uttara, Dhaka, Dhaka'), order(2, 'Road 1, Mohammadpur, Dhaka, Dhaka'),
+              order(3, 'Road 1, Mirpur, Dhaka, Dhaka')]
+    plan = plan_route(orders, ('dhanmondi', 'dhaka'), GRAPH)
+    assert [stop['area'] for stop in plan['stops']] == ['Mohammadpur', 'Mirpur', 'Uttara']
+    assert plan['total_minutes'] == 50
+
+
+def test_without_home_the_run_starts_at_a_stop():
+    plan = plan_route([order(1, 'Road 1, Mirpur, Dhaka, Dhaka')], (None, None), GRAPH)
+    assert plan['stops'][0]['minutes_from_previous'] == 0
@@ -0,0 +1,74 @@
+from search import SearchIndex, tokenize
+
+ROWS = [
+    {'ProductID': 1, 'ProductName': 'Silk Saree', 'Category': 'Saree', 'Embroidery': None,
+     'Description': 'Festive red saree'},
+    {'ProductID': 2, 'ProductName': 'Cotton Kurti', 'Category': 'Kurti', 'Embroidery': None,
+     'Description': 'Light kurti with silk trim'},
+    {'ProductID': 3, 'ProductName': 'Silky Panjabi', 'Category': 'Panjabi', 'Embroidery': 'Hand',
+     'Description': 'Soft cotton panjabi'},
+    {'ProductID': 4, 'ProductName': 'Linens Set', 'Category': 'Home', 'Embroidery': None,
+     'Description': None},
+    {'ProductID': 5, 'ProductName': 'Linen Shirt', 'Category': 'Shirt', 'Embroidery': None,
+     'Description': None},
+]
+
+
+def index(rows=ROWS):
+    search_index = SearchIndex()
+    search_index.rebuild(rows)
+    return search_index
+
+
+def test_tokenize_drops_stopwords_and_case():
+    assert tokenize('The Silk and COTTON') == ['silk', 'cotton']
+    assert tokenize(None) == []
+
+
+def test_name_match_outranks_description_match():
+    assert index().search('cotton') == [2, 3]
+
+
+def test_all_tokens_must_match():
+    assert index().search('cotton kurti') == [2]
+    assert index().search('silk panjabi') == []
+    assert index().search('of the') == []
+
+
+def test_last_token_matches_as_prefix():
+    search_index = index()
+    assert sorted(search_index.search('sil')) == [1, 2, 3]
+    assert 3 in search_index.search('silk')
+    # An exact match beats an equally rare prefix match
+    assert search_index.search('linen') == [5, 4]
+    # Only the last token expands
+    assert search_index.search('sil saree') == []
+
+
+def test_limit_keeps_the_best():
+    assert index().search('cotton', limit=1) == [2]
+
+
+def test_upsert_and_remove():
+    search_index = index()
+    search_index.upsert(6, {'ProductID': 6, 'ProductName': 'Denim Jacket', 'Category': 'Jacket'})
+    search_index.remove(1)
+    assert search_index.search('denim') == [6]
+    assert 1 not in search_index.search('silk')
+    assert search_index.size == 5
+
+
+def test_writes_during_rebuild_are_replayed():
+    search_index = index()
+    search_index.expire()
+
+    def load_rows():
+        # Admin writes that land after the rows were read
+        search_index.upsert(6, {'ProductID': 6, 'ProductName': 'Denim Jacket', 'Category': 'Jacket'})
+        search_index.remove(2)
+        return ROWS
+
+    search_index.refresh(load_rows)
+    assert search_index.search('denim') == [6]
+    assert search_index.search('kurti') == []
+    assert not search_index.is_stale()
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+from stats import STATS_QUERIES, read_stats
+
+
+class Connection:
+    def __init__(self, log):
+        self.log = log
+
+    def rollback(self):
+        self.log.append('ROLLBACK')
+
+
+class RecordingCursor:
+    """Cursor that logs statements and answers the StoreStats read with a fixed row"""
+
+    def __init__(self, reconciled_at):
+        self.log = []
+        self.connection = Connection(self.log)
+        self.row = [0] * len(STATS_QUERIES) + [reconciled_at] + [0] * len(STATS_QUERIES)
+
+    def execute(self, sql, params=()):
+        self.log.append(' '.join(sql.split()))
+
+    def fetchone(self):
+        return self.row if len(self.log) == 1 else (0,)
+
+    def fetchall(self):
+        return []
+
+
+def test_reconcile_starts_a_fresh_transaction():
+    cursor = RecordingCursor(datetime.now() - timedelta(hours=2))
+    values, reconciled = read_stats(cursor, max_age=60)
+    assert reconciled
+    assert cursor.log[1] == 'ROLLBACK'
+    assert cursor.log[2].endswith('FOR UPDATE')
+    assert cursor.log[-1].startswith('UPDATE StoreStatsSlot')
+
+
+def test_fresh_counters_are_read_without_reconciling():
+    cursor = RecordingCursor(datetime.now())
+    values, reconciled = read_stats(cursor, max_age=60)
+    assert not reconciled
+    assert 'ROLLBACK' not in cursor.log
+    assert set(values) == set(STATS_QUERIES)
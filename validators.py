@@ -0,0 +1,66 @@
+import hashlib
+from datetime import datetime
+
+CATALOG_SCOPE = 'catalog'
+
+
+def product_scope(product_id):
+    return f'product:{int(product_id)}'
+
+
+def bump_versions(cursor, product_ids=(), catalog=False):
+    """Advance the versions of the given products (and the catalog) in the caller's transaction
+
+    Call it from every write that changes what a catalog response shows.
+    Pass catalog=True only when the write changes which products a listing
+    holds or their order (add, delete, rename, recategorise): the catalog
+    row is shared by every writer, and bumping it evicts every cached
+    listing in every process. Rows are upserted in sorted scope order so
+    concurrent writers lock them in the same sequence.
+    """
+    scopes = sorted({product_scope(product_id) for product_id in product_ids} |
+                    ({CATALOG_SCOPE} if catalog else set()))
+    if not scopes:
+        return
+    cursor.execute(f"""
+        INSERT INTO ContentVersion (Scope, Version, ModifiedAt)
+        VALUES {', '.join(['(%s, 1, NOW())'] * len(scopes))}
+        ON DUPLICATE KEY UPDATE Version = Version + 1, ModifiedAt = NOW()
+    """, scopes)
+
+
+def bump_all_versions(cursor):
+    """Advance the catalog and every product version, after a bulk rewrite"""
+    cursor.execute("""
+        INSERT INTO ContentVersion (Scope, Version, ModifiedAt)
+        SELECT CONCAT('product:', ProductID), 1, NOW() FROM Product
+        ON DUPLICATE KEY UPDATE Version = Version + 1, ModifiedAt = NOW()
+    """)
+    bump_versions(cursor, catalog=True)
+
+
+def read_versions(cursor, scopes):
+    """{scope: (version, modified_at)}; scopes never bumped read as (0, None)"""
+    scopes = list(scopes)
+    cursor.execute(f"""
+        SELECT Scope, Version, ModifiedAt FROM ContentVersion
+        WHERE Scope IN ({', '.join(['%s'] * len(scopes))})
+    """, scopes)
+    found = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+    return {scope: found.get(scope, (0, None)) for scope in scopes}
+
+
+def make_etag(versions, *variant):
+    """Strong entity tag for a response built from `versions`
+
+    `variant` carries whatever else the body depends on (URL, viewer,
+    release), so two different bodies never share a tag.
+    """
+    key = repr((sorted((scope, version) for scope, (version, _) in versions.items()), variant))
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def last_modified(versions):
+    """Latest modification time among `versions`, or None if none were ever bumped"""
+    times = [modified for _, modified in versions.values() if isinstance(modified, datetime)]
+    return max(times) if times else None